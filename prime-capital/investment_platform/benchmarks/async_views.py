@@ -0,0 +1,86 @@
+"""
+Compares dashboard-style page latency between the WSGI (sync views) and the
+ASGI (async views) deployments under concurrent load.
+
+Start both servers against the same database, e.g.
+
+    python manage.py runserver 8000 --noreload
+    ASYNC_VIEWS=1 uvicorn investment_platform.asgi:application --port 8001 --workers 2
+
+then run
+
+    python benchmarks/async_views.py --user alice --password secret \
+        --target wsgi=http://127.0.0.1:8000 --target asgi=http://127.0.0.1:8001
+"""
+import argparse
+import re
+import statistics
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+
+PAGES = ['/dashboard/', '/referrals/', '/transactions/']
+
+
+def login(base_url, username, password):
+    """Logs in and returns an opener carrying the session cookie."""
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+    page = opener.open(base_url + '/login/').read().decode()
+    token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', page).group(1)
+    data = urllib.parse.urlencode({
+        'username': username, 'password': password, 'csrfmiddlewaretoken': token,
+    }).encode()
+    request = urllib.request.Request(base_url + '/login/', data=data, headers={'Referer': base_url + '/login/'})
+    opener.open(request).read()
+    return opener
+
+
+def timed_get(opener, url):
+    start = time.perf_counter()
+    with opener.open(url) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+    return samples[index]
+
+
+def run(base_url, opener, requests_per_page, concurrency):
+    results = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for page in PAGES:
+            url = base_url + page
+            timed_get(opener, url)  # warm up
+            start = time.perf_counter()
+            samples = list(pool.map(lambda _: timed_get(opener, url), range(requests_per_page)))
+            elapsed = time.perf_counter() - start
+            results[page] = (samples, elapsed)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', action='append', required=True, help='name=base_url, may be repeated')
+    parser.add_argument('--user', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--requests', type=int, default=200, help='requests per page')
+    parser.add_argument('--concurrency', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'target':<8} {'page':<16} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} {'req/s':>8}")
+    for target in args.target:
+        name, base_url = target.split('=', 1)
+        base_url = base_url.rstrip('/')
+        opener = login(base_url, args.user, args.password)
+        for page, (samples, elapsed) in run(base_url, opener, args.requests, args.concurrency).items():
+            print(f"{name:<8} {page:<16} {percentile(samples, 50) * 1000:>8.1f} {percentile(samples, 95) * 1000:>8.1f} "
+                  f"{statistics.mean(samples) * 1000:>8.1f} {len(samples) / elapsed:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+"""
+Runs scripted user journeys against the site under a rising concurrency ramp and
+reports per-endpoint latency percentiles, throughput and error rate.
+
+Let the script migrate and seed a fresh database in a temporary directory, start
+`manage.py runserver` on it and stop it afterwards:
+
+    python benchmarks/loadtest.py --serve --users 200 --ramp 1,5,10,20 --stage-seconds 30
+
+or point it at a server you started yourself on a database seeded with
+`manage.py seed_loadtest`, with rate limiting off so the login storm isn't
+throttled and email going nowhere:
+
+    DATABASE_PATH=/tmp/lt.sqlite3 python manage.py migrate
+    DATABASE_PATH=/tmp/lt.sqlite3 python manage.py seed_loadtest --users 200
+    DATABASE_PATH=/tmp/lt.sqlite3 ALLOWED_HOSTS=127.0.0.1 RATELIMIT_ENABLED=0 \
+        EMAIL_BACKEND=django.core.mail.backends.dummy.EmailBackend \
+        gunicorn investment_platform.wsgi -w 4 -b 127.0.0.1:8000
+    python benchmarks/loadtest.py --base-url http://127.0.0.1:8000 --users 200
+
+Journeys, picked at random in proportion to --mix:
+    browse    log in, dashboard, transactions, log out
+    withdraw  log in, withdrawal page, request a withdrawal of 1 USDT
+    register  registration form, register a new user, log in as them
+    approve   admin logs in, lists pending withdrawals, approves up to ten
+
+Each ramp stage runs its number of concurrent journeys for --stage-seconds. Results
+are saved as JSON under benchmarks/results/ named by commit; --compare FILE prints
+each endpoint's p95 against an earlier run.
+"""
+import argparse
+import http.cookiejar
+import itertools
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+PREFIX = 'loadtest'
+PASSWORD = 'loadtest-password'
+TIMEOUT = 30
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Redirects are recorded as responses, not followed into the next page.
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)  # endpoint -> [(seconds, status, ok)]
+        self.lock = threading.Lock()
+
+    def add(self, endpoint, seconds, status, ok):
+        with self.lock:
+            self.samples[endpoint].append((seconds, status, ok))
+
+
+class Client:
+    """
+    One visitor: a cookie jar and timed requests recorded per endpoint name.
+    """
+
+    def __init__(self, base_url, recorder, deadline):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.deadline = deadline
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), NoRedirect)
+
+    def csrf_token(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == 'csrftoken'), '')
+
+    def request(self, endpoint, path, data=None, expect=(200,), check=None):
+        """
+        Makes a request and records it; returns the body, or None on failure. Raises
+        StopIteration once the stage is over, ending the journey.
+        """
+        if time.monotonic() > self.deadline:
+            raise StopIteration
+        url = self.base_url + path
+        body = None
+        if data is not None:
+            data = urllib.parse.urlencode({'csrfmiddlewaretoken': self.csrf_token(), **data}, doseq=True).encode()
+        request = urllib.request.Request(url, data=data, headers={'Referer': url})
+        start = time.perf_counter()
+        try:
+            with self.opener.open(request, timeout=TIMEOUT) as response:
+                status, body = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, body = e.code, e.read()
+        except OSError as e:
+            status = type(e).__name__
+        elapsed = time.perf_counter() - start
+        ok = status in expect and (check is None or check(body))
+        self.recorder.add(endpoint, elapsed, status, ok)
+        return body if ok else None
+
+    def login(self, username, password=PASSWORD):
+        self.request('GET /login/', '/login/')
+        return self.request('POST /login/', '/login/', {'username': username, 'password': password}, expect=(302,))
+
+
+def browse(client, options):
+    if client.login(f'{PREFIX}-{random.randint(1, options.users)}') is None:
+        return
+    client.request('GET /dashboard/', '/dashboard/')
+    client.request('GET /transactions/', '/transactions/')
+    client.request('GET /logout/', '/logout/', expect=(200, 302))
+
+
+def withdraw(client, options):
+    user = random.randint(1, options.users)
+    if client.login(f'{PREFIX}-{user}') is None:
+        return
+    client.request('GET /request-withdrawal/', '/request-withdrawal/')
+    client.request(
+        'POST /request-withdrawal/', '/request-withdrawal/',
+        {'amount': '1', 'currency': 'USDT', 'to_address': f'0x{user:040x}'},
+        # A rejected request re-renders the form with its errors.
+        check=lambda body: b'errorlist' not in body,
+    )
+
+
+_registrations = itertools.count()
+
+
+def register(client, options):
+    username = f'{PREFIX}-r{os.getpid()}-{int(time.time())}-{next(_registrations)}'
+    password = 'Lt-register-2024!'
+    client.request('GET /register/', '/register/')
+    registered = client.request('POST /register/', '/register/', {
+        'username': username, 'password1': password, 'password2': password, 'email': f'{username}@example.com',
+        'first_name': 'Load', 'last_name': 'Test', 'referral_code': '',
+    }, expect=(302,))
+    if registered is not None:
+        client.login(username, password)
+
+
+def approve(client, options):
+    client.request('GET /admin/login/', '/admin/login/')
+    logged_in = client.request('POST /admin/login/', '/admin/login/', {
+        'username': f'{PREFIX}-admin', 'password': PASSWORD, 'next': '/admin/',
+    }, expect=(302,))
+    if logged_in is None:
+        return
+    changelist = '/admin/investments/withdrawalrequest/'
+    page = client.request('GET admin pending withdrawals', changelist + '?status__exact=pending')
+    if page is None:
+        return
+    ids = re.findall(rb'name="_selected_action" value="(\d+)"', page)[:10]
+    if ids:
+        client.request('POST admin approve', changelist + '?status__exact=pending', {
+            'action': 'approve_withdrawal', '_selected_action': [i.decode() for i in ids], 'index': 0,
+        }, expect=(302,))
+
+
+JOURNEYS = {'browse': browse, 'withdraw': withdraw, 'register': register, 'approve': approve}
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+    return samples[index]
+
+
+def run_stage(base_url, concurrency, seconds, mix, options):
+    recorder = Recorder()
+    deadline = time.monotonic() + seconds
+    journeys, weights = zip(*mix.items())
+    completed = []
+
+    def visitor():
+        count = 0
+        while time.monotonic() < deadline:
+            journey = JOURNEYS[random.choices(journeys, weights)[0]]
+            try:
+                journey(Client(base_url, recorder, deadline), options)
+                count += 1
+            except StopIteration:
+                break
+        completed.append(count)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(visitor)
+    elapsed = time.perf_counter() - start
+
+    endpoints = {}
+    for endpoint, samples in sorted(recorder.samples.items()):
+        latencies = [seconds for seconds, _, _ in samples]
+        errors = Counter(str(status) for _, status, ok in samples if not ok)
+        endpoints[endpoint] = {
+            'requests': len(samples),
+            'throughput': len(samples) / elapsed,
+            'error_rate': sum(errors.values()) / len(samples),
+            'errors': dict(errors),
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+        }
+    return {'concurrency': concurrency, 'seconds': elapsed, 'journeys': sum(completed), 'endpoints': endpoints}
+
+
+def print_stage(stage):
+    print(f"\nconcurrency {stage['concurrency']}: {stage['journeys']} journeys in {stage['seconds']:.0f}s")
+    print(f"{'endpoint':<32} {'requests':>8} {'req/s':>7} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for endpoint, s in stage['endpoints'].items():
+        errors = ', '.join(f'{status} x{count}' for status, count in s['errors'].items())
+        print(f"{endpoint:<32} {s['requests']:>8} {s['throughput']:>7.1f} {s['error_rate']:>6.1%} "
+              f"{s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f}  {errors}")
+
+
+def compare(previous, stages):
+    print(f"\np95 against {previous['commit']} ({previous['started_at']}):")
+    before = {stage['concurrency']: stage['endpoints'] for stage in previous['stages']}
+    for stage in stages:
+        for endpoint, s in stage['endpoints'].items():
+            old = before.get(stage['concurrency'], {}).get(endpoint)
+            if old:
+                change = (s['p95_ms'] - old['p95_ms']) / old['p95_ms'] if old['p95_ms'] else 0
+                print(f"  c={stage['concurrency']:<4} {endpoint:<32} {old['p95_ms']:>8.1f} -> {s['p95_ms']:>8.1f} ms "
+                      f"({change:+.0%})")
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return commit + ('-dirty' if dirty else '')
+
+
+def serve(directory, users, port):
+    """
+    Migrates and seeds a database in directory and starts runserver on it. Returns
+    the server process.
+    """
+    env = dict(
+        os.environ,
+        DATABASE_PATH=os.path.join(directory, 'db.sqlite3'),
+        ARCHIVE_DATABASE_PATH=os.path.join(directory, 'archive.sqlite3'),
+        ALLOWED_HOSTS='127.0.0.1,localhost',
+        RATELIMIT_ENABLED='0',
+        EMAIL_BACKEND='django.core.mail.backends.dummy.EmailBackend',
+    )
+    manage = [sys.executable, 'manage.py']
+    for command in (['migrate', '-v0'], ['migrate', '--database', 'archive', '-v0'],
+                    ['seed_loadtest', '--users', str(users), '--prefix', PREFIX, '--password', PASSWORD]):
+        subprocess.run(manage + command, cwd=ROOT, env=env, check=True)
+    server = subprocess.Popen(manage + ['runserver', f'127.0.0.1:{port}', '--noreload'], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/login/', timeout=1).read()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    sys.exit('runserver did not start')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--serve', action='store_true', help='Seed a temporary database and start runserver on it.')
+    parser.add_argument('--port', type=int, default=8765, help='Port for --serve.')
+    parser.add_argument('--users', type=int, default=200, help='Seeded users (loadtest-1..N).')
+    parser.add_argument('--ramp', default='1,5,10,20', help='Concurrency of each stage.')
+    parser.add_argument('--stage-seconds', type=float, default=30)
+    parser.add_argument('--mix', default='browse=6,withdraw=2,register=1,approve=1',
+                        help='Journey weights, e.g. browse=1 for a login storm.')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/loadtest-<commit>-<time>.json).')
+    parser.add_argument('--compare', help='Earlier results file to compare p95 latencies with.')
+    options = parser.parse_args()
+
+    mix = {name: float(weight) for name, weight in (item.split('=') for item in options.mix.split(','))}
+    unknown = set(mix) - set(JOURNEYS)
+    if unknown:
+        parser.error(f"unknown journey {', '.join(sorted(unknown))}")
+    ramp = [int(c) for c in options.ramp.split(',')]
+
+    server = None
+    with tempfile.TemporaryDirectory() as directory:
+        base_url = options.base_url.rstrip('/')
+        if options.serve:
+            server = serve(directory, options.users, options.port)
+            base_url = f'http://127.0.0.1:{options.port}'
+        started_at = datetime.now(timezone.utc)
+        try:
+            stages = []
+            for concurrency in ramp:
+                stage = run_stage(base_url, concurrency, options.stage_seconds, mix, options)
+                print_stage(stage)
+                stages.append(stage)
+        finally:
+            if server:
+                server.terminate()
+                server.wait()
+
+    commit = git_commit()
+    result = {
+        'commit': commit,
+        'started_at': started_at.isoformat(timespec='seconds'),
+        'base_url': base_url,
+        'served': options.serve,
+        'users': options.users,
+        'mix': mix,
+        'stages': stages,
+    }
+    output = options.output or os.path.join(
+        RESULTS_DIR, f"loadtest-{commit}-{started_at:%Y%m%dT%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f'\nResults saved to {output}')
+
+    if options.compare:
+        with open(options.compare) as f:
+            compare(json.load(f), stages)
+
+
+if __name__ == '__main__':
+    main()
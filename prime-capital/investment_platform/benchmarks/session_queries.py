@@ -0,0 +1,59 @@
+"""
+Counts database queries per authenticated request for each session engine.
+
+Runs against a throwaway test database, so it is safe to run anywhere:
+
+    python benchmarks/session_queries.py
+    CACHE_BACKEND=memcached python benchmarks/session_queries.py   # with `manage.py cache_standin` running
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'investment_platform.settings')
+
+import django
+
+django.setup()
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+
+PAGES = ['/dashboard/', '/referrals/', '/transactions/', '/accounts/profile/']
+REQUESTS = 20
+
+
+def measure(engine):
+    with override_settings(SESSION_ENGINE=engine, ALLOWED_HOSTS=['testserver']):
+        client = Client()
+        client.login(username='bench', password='bench-password')
+        # The first request after login may still write the session.
+        client.get(PAGES[0])
+        with CaptureQueriesContext(connection) as queries:
+            for i in range(REQUESTS):
+                client.get(PAGES[i % len(PAGES)])
+    total = len(queries)
+    session = sum('django_session' in query['sql'] for query in queries)
+    return total / REQUESTS, session / REQUESTS
+
+
+def main():
+    from investments.models import CustomUser
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        CustomUser.objects.create_user('bench', 'bench@example.com', 'bench-password')
+        print(f"cache backend: {settings.CACHES['default']['BACKEND']}")
+        print(f"{'session engine':<16} {'queries/req':>12} {'session/req':>12}")
+        for name, engine in settings.SESSION_ENGINES.items():
+            total, session = measure(engine)
+            print(f'{name:<16} {total:>12.2f} {session:>12.2f}')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
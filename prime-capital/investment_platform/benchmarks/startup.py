@@ -0,0 +1,150 @@
+"""
+Measures the cold-start time of the entry points that pay it on every worker
+recycle or cron run: the WSGI application (up to its URLconf being loaded, as on
+the first request), a manage.py command and tasks.py. Exits non-zero if any of
+them is over its time budget or imports a module that is meant to stay lazy.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 10 --slowest 20
+    python benchmarks/startup.py --budget wsgi=500 --budget tasks=400
+
+Each entry point is started --runs times in a fresh interpreter, alternating with
+a bare interpreter that only imports Django. The budget (milliseconds) is for the
+entry point's own cost: its fastest run less the bare interpreter's fastest run.
+Noise from a slow or busy machine only ever adds time, so the fastest runs are the
+stable measure, and a single median or wall time would make the gate flap. The
+median wall time is reported alongside. One extra run under `python -X importtime`
+gives the time spent importing, split by top-level package. The budgets leave about
+half again the measured cost as headroom; the LAZY check doesn't depend on machine
+speed at all, so it's the one to rely on in CI.
+"""
+import argparse
+import os
+from collections import Counter
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    'wsgi': ['-c', 'from investment_platform.wsgi import application\n'
+                   'from django.urls import get_resolver\n'
+                   'get_resolver().url_patterns'],
+    'manage': ['manage.py', 'check'],
+    'tasks': ['-c', 'import tasks'],
+}
+
+# What every entry point pays before any of this project's code runs.
+BASELINE = ['-c', 'import django']
+
+# Milliseconds over BASELINE; measured at about 400 (wsgi), 470 (manage) and 390 (tasks).
+BUDGETS = {'wsgi': 600, 'manage': 700, 'tasks': 600}
+
+# Modules that must only be imported by the code paths that use them.
+LAZY = {
+    'wsgi': ['requests', 'numpy'],
+    'manage': ['requests', 'numpy'],
+    'tasks': ['requests', 'numpy'],
+}
+
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+
+def run(args, importtime=False):
+    command = [sys.executable, *(['-X', 'importtime'] if importtime else []), *args]
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode:
+        sys.exit(f"{' '.join(args)} failed:\n{result.stderr}")
+    return elapsed, result.stderr
+
+
+def parse_importtime(output):
+    """
+    Returns [(module, self us, cumulative us, top-level import it was loaded under)]
+    in import order.
+    """
+    rows = []
+    for line in output.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    # importtime prints a module after the modules it imported, so a module's
+    # top-level ancestor is the next row at depth 0.
+    modules = []
+    root = None
+    for module, self_us, cumulative_us, depth in reversed(rows):
+        if depth == 0:
+            root = module
+        modules.append((module, self_us, cumulative_us, root))
+    modules.reverse()
+    return modules
+
+
+def measure(name, runs):
+    """
+    Returns (median wall time, fastest time over BASELINE's fastest, modules), times
+    in ms.
+    """
+    args = TARGETS[name]
+    # Warm the bytecode and filesystem caches.
+    run(BASELINE)
+    run(args)
+    baselines, walls = [], []
+    for _ in range(runs):
+        baselines.append(run(BASELINE)[0])
+        walls.append(run(args)[0])
+    modules = parse_importtime(run(args, importtime=True)[1])
+    return statistics.median(walls) * 1000, (min(walls) - min(baselines)) * 1000, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('targets', nargs='*', metavar='TARGET', help=f"Default: {', '.join(TARGETS)}.")
+    parser.add_argument('--runs', type=int, default=9)
+    parser.add_argument('--slowest', type=int, default=10, help='Packages to list per target.')
+    parser.add_argument('--budget', action='append', default=[], metavar='TARGET=MS',
+                        help='Override a time budget.')
+    args = parser.parse_args()
+    unknown = set(args.targets) - set(TARGETS)
+    if unknown:
+        parser.error(f"unknown target {', '.join(sorted(unknown))}")
+
+    budgets = dict(BUDGETS)
+    for override in args.budget:
+        name, _, ms = override.partition('=')
+        budgets[name] = float(ms)
+
+    failures = []
+    for name in args.targets or TARGETS:
+        wall, overhead, modules = measure(name, args.runs)
+        imports = sum(self_us for _, self_us, _, _ in modules) / 1000
+        status = 'ok' if overhead <= budgets[name] else 'OVER BUDGET'
+        print(f'{name}: {wall:.0f} ms, {overhead:.0f} ms over bare Django (budget {budgets[name]:.0f} ms), '
+              f'{imports:.0f} ms importing; {status}')
+        if overhead > budgets[name]:
+            failures.append(f'{name} took {overhead:.0f} ms over bare Django')
+
+        by_package = Counter()
+        for module, self_us, _, _ in modules:
+            by_package[module.partition('.')[0]] += self_us
+        for package, self_us in by_package.most_common(args.slowest):
+            print(f'    {self_us / 1000:8.1f} ms  {package}')
+
+        loaded = {module: root for module, _, _, root in modules}
+        for module in LAZY.get(name, []):
+            if module in loaded:
+                print(f'    {module} is imported at startup (via {loaded[module]})')
+                failures.append(f'{name} imports {module}')
+
+    if failures:
+        sys.exit('Startup budget exceeded: ' + '; '.join(failures))
+
+
+if __name__ == '__main__':
+    main()
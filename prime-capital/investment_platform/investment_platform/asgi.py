@@ -3,6 +3,11 @@ ASGI config for investment_platform project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+To serve the async views, run it under an ASGI server with ASYNC_VIEWS enabled:
+
+    ASYNC_VIEWS=1 gunicorn investment_platform.asgi:application \
+        -k uvicorn.workers.UvicornWorker --workers 2
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
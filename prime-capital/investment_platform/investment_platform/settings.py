@@ -26,7 +26,7 @@ SECRET_KEY = 'django-insecure-s6^y9m-cqyt@dw1014jg$(=bs!c3yxcnw$&pzcl_v545b2ea&h
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = False
 
-ALLOWED_HOSTS = ['donald001.pythonanywhere.com']
+ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', 'donald001.pythonanywhere.com').split(',')
 
 
 # Application definition
@@ -70,6 +70,13 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'investment_platform.wsgi.application'
+ASGI_APPLICATION = 'investment_platform.asgi.application'
+
+# Serve the dashboard-style pages with async views that run their queries
+# concurrently, and the live account event stream. Only enable it when running
+# under an ASGI server, e.g.
+#   gunicorn investment_platform.asgi:application -k uvicorn.workers.UvicornWorker
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', '') == '1'
 
 
 # Database
@@ -78,11 +85,58 @@ WSGI_APPLICATION = 'investment_platform.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('DATABASE_PATH', BASE_DIR / 'db.sqlite3'),
+    },
+    # Cold ledger rows moved out of the hot tables by `manage.py archive_ledger`.
+    # Create its tables with `python manage.py migrate --database archive`.
+    'archive': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('ARCHIVE_DATABASE_PATH', BASE_DIR / 'archive.sqlite3'),
+    },
+}
+
+DATABASE_ROUTERS = ['investments.routers.ArchiveRouter']
+
+# Transactions, earnings, settled withdrawals and processed-transaction records
+# older than this are archived.
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 180))
+
+
+# Cache
+# CACHE_BACKEND picks one of CACHE_BACKENDS; CACHE_LOCATION overrides its default
+# location (a directory for 'file', host:port for 'memcached', a URL for 'redis').
+# `python manage.py cache_standin` serves the memcached protocol locally for tests.
+
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'prime-capital'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', os.path.join(BASE_DIR, 'cache')),
+    'memcached': ('django.core.cache.backends.memcached.PyMemcacheCache', '127.0.0.1:11211'),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379'),
+}
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.environ.get('CACHE_LOCATION') or CACHE_BACKENDS[CACHE_BACKEND][1],
+        'KEY_PREFIX': 'prime-capital',
     }
 }
 
 
+# Sessions
+# cached_db keeps the database as the source of truth but serves reads from the
+# cache; signed_cookies keeps sessions out of the database altogether.
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_ENGINES[os.environ.get('SESSION_BACKEND', 'cached_db')]
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -127,6 +181,14 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Uploads are served by investments.views.protected_media after an access check, so
+# the front server must not map MEDIA_URL to MEDIA_ROOT itself. MEDIA_SENDFILE hands
+# the transfer back to it: 'x-accel-redirect' for nginx, with MEDIA_INTERNAL_URL an
+# internal location aliasing MEDIA_ROOT, or 'x-sendfile' for Apache mod_xsendfile.
+# Left empty, Django streams the file.
+MEDIA_SENDFILE = os.environ.get('MEDIA_SENDFILE', '')
+MEDIA_INTERNAL_URL = os.environ.get('MEDIA_INTERNAL_URL', '/protected-media/')
+
 
 
 # Default primary key field type
@@ -136,7 +198,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'investments.CustomUser'
 
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = 'smtp.elasticemail.com'
 EMAIL_PORT = '2525'
 EMAIL_USE_TLS = True
@@ -159,3 +221,46 @@ ETHERSCAN_API_KEY = 'KGTIYARPXW7RF2JSRN16ZW3ZP6JUQP55UK'
 # USDT Wallet Address
 USDT_WALLET_ADDRESS = '0x4e2d95a6ac5d9c8e6d035e080ad0b12b9da27ef6'
 
+# Public marketing pages (full-page cache and pre-rendering)
+# Bump DEPLOY_VERSION on deploy to invalidate every cached page.
+PUBLIC_PAGE_VERSION = os.environ.get('DEPLOY_VERSION', '')
+PUBLIC_PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+PUBLIC_PAGE_MAX_AGE = 60 * 5
+PRERENDER_ROOT = os.path.join(BASE_DIR, 'prerendered')
+
+# Rate limits for views that hash passwords, send email or store uploads; see
+# investments.ratelimit. Counters live in the default cache, so use a shared cache
+# backend (memcached or redis) when running several processes.
+RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', '1') == '1'
+# request.META key holding the client address, e.g. 'HTTP_X_REAL_IP' behind a proxy.
+RATELIMIT_IP_HEADER = os.environ.get('RATELIMIT_IP_HEADER', 'REMOTE_ADDR')
+RATELIMITS = {
+    'login': {'rate': '10/m', 'key': 'ip', 'methods': ['POST']},
+    'register': {'rate': '5/h', 'key': 'ip', 'methods': ['POST']},
+    'password_reset': {'rate': '5/h', 'key': 'ip', 'methods': ['POST']},
+    'submit_verification': {'rate': '5/h', 'key': 'user', 'methods': ['POST']},
+    'verification_status': {'rate': '5/h', 'key': 'user'},
+}
+
+# Live account events. Other processes (tasks.py) multicast them to the ASGI
+# workers on this host through PUSH_BUS (group:port on loopback); empty disables it.
+PUSH_BUS = os.environ.get('PUSH_BUS', '239.255.77.77:8765')
+PUSH_KEEPALIVE = 25
+
+# Payout manifests written by `manage.py payout_manifest`
+PAYOUT_MANIFEST_ROOT = os.path.join(BASE_DIR, 'payouts')
+
+# Ledger events relayed downstream by `manage.py relay_outbox` (investments.outbox).
+# OUTBOX_SINKS is comma-separated name=target pairs; a target is a directory for
+# rotating JSONL files, tcp://host:port or an http(s):// URL.
+OUTBOX_SINKS = dict(
+    sink.split('=', 1)
+    for sink in os.environ.get('OUTBOX_SINKS', 'files=' + os.path.join(BASE_DIR, 'outbox')).split(',')
+    if sink
+)
+OUTBOX_FILE_BYTES = int(os.environ.get('OUTBOX_FILE_BYTES', 64 * 1024 * 1024))
+
+# Pending withdrawals scored (investments.risk) below this can be approved in bulk
+# from the admin. Scores run from 0 to 100.
+WITHDRAWAL_LOW_RISK_BELOW = float(os.environ.get('WITHDRAWAL_LOW_RISK_BELOW', 20))
+
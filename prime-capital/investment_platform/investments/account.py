@@ -0,0 +1,74 @@
+from django.db.models import Sum
+
+from .earnings import matured_earnings, matured_uncredited
+from .models import (
+    ArchivedEarning, ArchivedTransaction, ArchivedWithdrawal, ReferralCommission, Transaction, UserBalance,
+    UserEarning, UserInvestment, WithdrawalRequest,
+)
+from .money import Money
+
+RECENT_ACTIVITY = 10
+
+
+def account_etag(user):
+    # An investment maturing changes the balance without writing anything, so the
+    # number of matured, uncredited investments is part of the version.
+    return f'"{user.pk}.{user.data_version}.{matured_uncredited(user.pk).count()}"'
+
+
+def account_snapshot(user):
+    """
+    Returns the user's balance, totals and recent activity for the account API.
+    """
+    balance = UserBalance.objects.filter(user=user).first()
+    matured = matured_earnings(user.pk)
+    current = (balance.balance if balance else Money(0)) + matured
+    held = balance.held if balance else Money(0)
+
+    def total(*querysets):
+        return sum((queryset.aggregate(total=Sum('amount'))['total'] or Money(0) for queryset in querysets),
+                   Money(0)).decimal
+
+    activity = [
+        {'type': 'deposit', 'date': row.transaction_date, 'amount': row.amount.decimal, 'status': row.status}
+        for row in Transaction.objects.filter(user=user, transaction_type='deposit')
+        .order_by('-transaction_date')[:RECENT_ACTIVITY]
+    ] + [
+        {'type': 'earning', 'date': row.earning_date, 'amount': row.amount.decimal, 'status': 'credited'}
+        for row in UserEarning.objects.filter(user=user).order_by('-earning_date')[:RECENT_ACTIVITY]
+    ] + [
+        {'type': 'earning', 'date': row.matures_at, 'amount': row.earning.decimal, 'status': 'matured'}
+        for row in matured_uncredited(user.pk).order_by('-matures_at')[:RECENT_ACTIVITY]
+    ] + [
+        {'type': 'withdrawal', 'date': row.created_at, 'amount': row.amount.decimal, 'status': row.status}
+        for row in WithdrawalRequest.objects.filter(user=user).order_by('-created_at')[:RECENT_ACTIVITY]
+    ]
+    activity.sort(key=lambda entry: entry['date'], reverse=True)
+
+    return {
+        'version': user.data_version,
+        'balance': {
+            'balance': current.decimal,
+            'held': held.decimal,
+            'available': (current - held).decimal,
+            'matured_earnings': matured.decimal,
+            'currency': 'USDT',
+        },
+        'summary': {
+            'total_deposits': total(
+                Transaction.objects.filter(user=user, transaction_type='deposit'),
+                ArchivedTransaction.objects.filter(user_id=user.pk, transaction_type='deposit'),
+            ),
+            'total_earnings': total(
+                UserEarning.objects.filter(user=user),
+                ArchivedEarning.objects.filter(user_id=user.pk),
+            ) + matured.decimal,
+            'total_referral_commissions': total(ReferralCommission.objects.filter(user=user)),
+            'total_withdrawals': total(
+                WithdrawalRequest.objects.filter(user=user, status='completed'),
+                ArchivedWithdrawal.objects.filter(user_id=user.pk, status='completed'),
+            ),
+            'open_investments': UserInvestment.objects.filter(user=user, earnings_calculated=False).count(),
+        },
+        'recent_activity': activity[:RECENT_ACTIVITY],
+    }
@@ -1,18 +1,54 @@
-from django.contrib import admin
-from django.utils import timezone
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
 from .models import InvestmentPackage, Transaction, UserInvestment, UserBalance, UserEarning, WithdrawalRequest, Referral, ReferralCommission, CustomUser
 from .notifications import notify_user_of_withdrawal_request
+from .withdrawals import TRANSITIONS, available_balance, create_withdrawal, transition_withdrawal
 from django.contrib.auth.admin import UserAdmin
-from .models import IdentityVerification
+from django.template.response import TemplateResponse
+from django.urls import path
+from .models import ArchivedEarning, ArchivedTransaction, ArchivedWithdrawal, IdentityVerification
+from .models import UserWallet, normalize_address
+from .paginators import ApproximateCountPaginator
+from .search import search_condition
+
+
+class IndexedSearchMixin:
+    """
+    Answers changelist and autocomplete searches from the full-text indexes in
+    investments.search. search_indexes lists (index, lookup of the indexed row's id)
+    pairs; search_fields are still used when the indexes can't answer.
+    """
+    search_indexes = []
+
+    def get_search_results(self, request, queryset, search_term):
+        condition = search_condition(self.search_indexes, search_term, queryset.db)
+        if condition is None:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(condition), False
+
+
+class LargeTableAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    """
+    Base admin for tables expected to grow to millions of rows: no COUNT(*) per page,
+    and indexed search where search_indexes are set. Don't set date_hierarchy here:
+    its drill-down scans the whole table for distinct dates. Put the indexed date
+    field in list_filter instead, which filters by date ranges.
+    """
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(CustomUser)
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(IndexedSearchMixin, UserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'is_staff')
     list_filter = ('is_staff', 'is_superuser', 'is_active', 'groups')
-    search_fields = ('username', 'first_name', 'last_name', 'email')
+    search_fields = ('username', 'first_name', 'last_name', 'email', 'profile__usdt_erc20_wallet_address')
+    search_indexes = [('user', 'pk')]
     ordering = ('username',)
     filter_horizontal = ('groups', 'user_permissions',)
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(InvestmentPackage)
@@ -21,70 +57,204 @@ class InvestmentPackageAdmin(admin.ModelAdmin):
     list_filter = ['currency']
     search_fields = ['name']
 
+    def get_urls(self):
+        return [
+            path('projection/', self.admin_site.admin_view(self.projection_view), name='investments_projection'),
+        ] + super().get_urls()
+
+    def projection_view(self, request):
+        """
+        Earnings owed on open investments over the next 24/48/72 hours, with what-if
+        rates and durations per package taken from the query string.
+        """
+        from .projections import OpenBook, payout_schedule, project
+
+        book = OpenBook.load()
+        packages = InvestmentPackage.objects.order_by('pk')
+        overrides = {}
+        for package in packages:
+            rate = request.GET.get(f'rate_{package.pk}')
+            duration = request.GET.get(f'duration_{package.pk}')
+            try:
+                if rate or duration:
+                    overrides[package.pk] = {
+                        'interest_rate': float(rate) if rate else None,
+                        'duration': int(duration) if duration else None,
+                    }
+            except ValueError:
+                messages.error(request, f"Ignoring invalid what-if values for {package.name}.")
+
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Earnings projection',
+            'opts': self.model._meta,
+            'packages': [
+                (package, request.GET.get(f'rate_{package.pk}', ''), request.GET.get(f'duration_{package.pk}', ''))
+                for package in packages
+            ],
+            'projection': project(book, overrides=overrides),
+            'schedule': payout_schedule(book, bucket_hours=6, overrides=overrides),
+        }
+        return TemplateResponse(request, 'admin/investments/projection_report.html', context)
+
 
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
+class TransactionAdmin(LargeTableAdmin):
     list_display = ['user', 'amount', 'currency', 'status', 'transaction_type', 'transaction_date']
-    list_filter = ['transaction_type', 'currency', 'status']
+    list_filter = ['transaction_type', 'currency', 'status', 'transaction_date']
+    list_select_related = ['user']
     search_fields = ['user__username', 'tx_hash']
+    search_indexes = [('user', 'user_id'), ('transaction', 'pk')]
+    autocomplete_fields = ['user', 'withdrawal_request']
 
 
 @admin.register(UserInvestment)
-class UserInvestmentAdmin(admin.ModelAdmin):
-    list_display = ['user', 'package', 'amount_invested', 'investment_date', 'earnings_calculated']
-    list_filter = ['package']
+class UserInvestmentAdmin(LargeTableAdmin):
+    list_display = ['user', 'package', 'amount_invested', 'investment_date', 'matures_at', 'earnings_calculated']
+    list_filter = ['package', 'investment_date']
+    list_select_related = ['user', 'package']
     search_fields = ['user__username']
+    search_indexes = [('user', 'user_id')]
+    autocomplete_fields = ['user', 'package']
 
 
 @admin.register(UserBalance)
-class UserBalanceAdmin(admin.ModelAdmin):
+class UserBalanceAdmin(LargeTableAdmin):
     list_display = ['user', 'balance']
+    list_select_related = ['user']
     search_fields = ['user__username']
+    search_indexes = [('user', 'user_id')]
+    autocomplete_fields = ['user']
 
 
 @admin.register(UserEarning)
-class UserEarningAdmin(admin.ModelAdmin):
+class UserEarningAdmin(LargeTableAdmin):
     list_display = ['user', 'amount', 'earning_date', 'from_investment']
+    list_filter = ['earning_date']
+    list_select_related = ['user', 'from_investment__user', 'from_investment__package']
     search_fields = ['user__username']
+    search_indexes = [('user', 'user_id')]
+    autocomplete_fields = ['user', 'from_investment']
+
+
+class WithdrawalRequestAdminForm(forms.ModelForm):
+    class Meta:
+        model = WithdrawalRequest
+        fields = '__all__'
+
+    def clean_status(self):
+        status = self.cleaned_data['status']
+        if self.instance.pk:
+            current = self.instance.status
+            if status != current and status not in TRANSITIONS[current]:
+                raise forms.ValidationError(f"A {current} withdrawal can't be moved to {status}.")
+        elif status != 'pending':
+            raise forms.ValidationError("New withdrawals must be pending.")
+        return status
+
+    def clean(self):
+        cleaned_data = super().clean()
+        user, amount = cleaned_data.get('user'), cleaned_data.get('amount')
+        if not self.instance.pk and user and amount is not None and amount > available_balance(user):
+            raise forms.ValidationError("Withdrawal amount exceeds available balance")
+        return cleaned_data
 
 
 @admin.register(WithdrawalRequest)
-class WithdrawalRequestAdmin(admin.ModelAdmin):
-    list_display = ['user', 'amount', 'currency', 'status', 'created_at', 'processed_at']
-    list_filter = ['status', 'currency']
-    search_fields = ['user__username']
-    actions = ['approve_withdrawal', 'reject_withdrawal']
+class WithdrawalRequestAdmin(LargeTableAdmin):
+    form = WithdrawalRequestAdminForm
+    list_display = [
+        'user', 'amount', 'currency', 'status', 'hold_status', 'payout_batch', 'risk_score', 'risk_factors',
+        'created_at', 'processed_at',
+    ]
+    list_filter = ['status', 'hold_status', 'currency', 'created_at']
+    list_select_related = ['user']
+    search_fields = ['user__username', 'to_address', 'payout_batch']
+    search_indexes = [('user', 'user_id'), ('withdrawal', 'pk')]
+    autocomplete_fields = ['user']
+    readonly_fields = ['hold_status', 'payout_batch', 'risk_score', 'risk_factors', 'risk_scored_at']
+    actions = ['approve_withdrawal', 'approve_low_risk', 'reject_withdrawal', 'complete_withdrawal', 'fail_withdrawal']
 
-    def approve_withdrawal(self, request, queryset):
-        for withdrawal in queryset.filter(status='pending'):
-            withdrawal.status = 'approved'
-            withdrawal.processed_at = timezone.now()
-            withdrawal.save()
+    def get_readonly_fields(self, request, obj=None):
+        # The held amount must keep matching the request once it exists.
+        if obj:
+            return self.readonly_fields + ['user', 'amount']
+        return self.readonly_fields
+
+    def save_model(self, request, obj, form, change):
+        # Status changes move money, so they go through the withdrawal service.
+        if not change:
+            create_withdrawal(obj)
+            return
+        new_status = obj.status
+        obj.status = form.initial['status']
+        super().save_model(request, obj, form, change)
+        if new_status != obj.status:
+            transition_withdrawal(obj, new_status)
+
+    def _transition(self, request, queryset, status):
+        for withdrawal in queryset:
+            try:
+                withdrawal = transition_withdrawal(withdrawal, status)
+            except ValueError as e:
+                self.message_user(request, f"{withdrawal}: {e}", level=messages.ERROR)
+                continue
             notify_user_of_withdrawal_request(withdrawal)
 
+    def approve_withdrawal(self, request, queryset):
+        self._transition(request, queryset.filter(status='pending'), 'approved')
+
+    def approve_low_risk(self, request, queryset):
+        # Scores come from `tasks.py --job risk`; unscored requests are left for review.
+        pending = queryset.filter(status='pending')
+        low_risk = pending.filter(risk_score__lt=settings.WITHDRAWAL_LOW_RISK_BELOW)
+        skipped = pending.count() - low_risk.count()
+        self._transition(request, low_risk, 'approved')
+        if skipped:
+            self.message_user(
+                request, f"Left {skipped} pending withdrawals unscored or scored "
+                f"{settings.WITHDRAWAL_LOW_RISK_BELOW:g} or more for review.", level=messages.WARNING,
+            )
+    approve_low_risk.short_description = "Approve selected withdrawals with a low risk score"
+
     def reject_withdrawal(self, request, queryset):
-        for withdrawal in queryset.filter(status='pending'):
-            withdrawal.status = 'rejected'
-            withdrawal.processed_at = timezone.now()
-            withdrawal.save()
-            notify_user_of_withdrawal_request(withdrawal)
+        self._transition(request, queryset.filter(status='pending'), 'rejected')
+
+    def complete_withdrawal(self, request, queryset):
+        self._transition(request, queryset.filter(status__in=['pending', 'approved']), 'completed')
+    complete_withdrawal.short_description = "Mark selected withdrawals as completed"
+
+    def fail_withdrawal(self, request, queryset):
+        self._transition(request, queryset.filter(status__in=['pending', 'approved']), 'failed')
+    fail_withdrawal.short_description = "Mark selected withdrawals as failed"
 
 
 @admin.register(Referral)
-class ReferralAdmin(admin.ModelAdmin):
+class ReferralAdmin(LargeTableAdmin):
     list_display = ['referred_by', 'referred_user', 'created_at']
+    list_filter = ['created_at']
+    list_select_related = ['referred_by', 'referred_user']
     search_fields = ['referred_by__username', 'referred_user__username']
+    search_indexes = [('user', 'referred_by_id'), ('user', 'referred_user_id')]
+    autocomplete_fields = ['referred_by', 'referred_user']
 
 
 @admin.register(ReferralCommission)
-class ReferralCommissionAdmin(admin.ModelAdmin):
+class ReferralCommissionAdmin(LargeTableAdmin):
     list_display = ['user', 'amount', 'created_at']
+    list_filter = ['created_at']
+    list_select_related = ['user']
     search_fields = ['user__username']
+    search_indexes = [('user', 'user_id')]
+    autocomplete_fields = ['user']
 
 
 @admin.register(IdentityVerification)
-class IdentityVerificationAdmin(admin.ModelAdmin):
+class IdentityVerificationAdmin(LargeTableAdmin):
     list_display = ['user', 'full_name', 'state', 'document_type', 'is_verified']
+    list_select_related = ['user']
+    search_fields = ['user__username', 'full_name']
+    autocomplete_fields = ['user']
     actions = ['approve_verification', 'reject_verification']
 
     def approve_verification(self, request, queryset):
@@ -94,3 +264,55 @@ class IdentityVerificationAdmin(admin.ModelAdmin):
     def reject_verification(self, request, queryset):
         queryset.update(is_verified=False)
     reject_verification.short_description = "Reject selected verifications"
+
+
+@admin.register(UserWallet)
+class UserWalletAdmin(LargeTableAdmin):
+    list_display = ['address', 'user', 'source', 'created_at']
+    list_filter = ['source']
+    list_select_related = ['user']
+    search_fields = ['address', 'user__username']
+    search_indexes = [('user', 'user_id')]
+    autocomplete_fields = ['user']
+
+    def get_search_results(self, request, queryset, search_term):
+        # A full address goes straight to the address index.
+        address = normalize_address(search_term)
+        if len(address) == 42 and address.startswith('0x'):
+            return queryset.filter(address=address), False
+        return super().get_search_results(request, queryset, search_term)
+
+
+class ArchiveAdmin(LargeTableAdmin):
+    """
+    Read-only view of an archive table (on the archive database). Rows can be narrowed
+    to one user with ?user__id__exact=<id> since users can't be joined across databases.
+    """
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedTransaction)
+class ArchivedTransactionAdmin(ArchiveAdmin):
+    list_display = ['id', 'user_id', 'amount', 'currency', 'status', 'transaction_type', 'transaction_date']
+    list_filter = ['transaction_type', 'status', 'transaction_date']
+    search_fields = ['=tx_hash']
+
+
+@admin.register(ArchivedEarning)
+class ArchivedEarningAdmin(ArchiveAdmin):
+    list_display = ['id', 'user_id', 'amount', 'earning_date', 'from_investment_id', 'package_id']
+    list_filter = ['earning_date']
+
+
+@admin.register(ArchivedWithdrawal)
+class ArchivedWithdrawalAdmin(ArchiveAdmin):
+    list_display = ['id', 'user_id', 'amount', 'currency', 'status', 'created_at', 'processed_at']
+    list_filter = ['status', 'processed_at']
@@ -1 +1,16 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
+
+def install_search_index(using, **kwargs):
+    from . import search
+
+    search.install(using)
+
+
+class InvestmentsConfig(AppConfig):
+    name = 'investments'
+
+    def ready(self):
+        # Table rebuilds during migrate drop the search triggers; put them back.
+        post_migrate.connect(install_search_index, sender=self)
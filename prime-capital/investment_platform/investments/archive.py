@@ -0,0 +1,132 @@
+"""
+Moves cold ledger rows from the hot tables to the archive database.
+
+Rows are copied to the archive (keeping their primary keys) and only then deleted
+from the hot table, one batch at a time. A batch interrupted between the two steps
+is simply copied again on the next run, so archiving can be stopped and resumed.
+"""
+import heapq
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    ArchivedEarning, ArchivedTransaction, ArchivedTxHash, ArchivedWithdrawal, ProcessedTransaction, Transaction,
+    UserEarning, WithdrawalRequest, bump_data_version, tx_digest,
+)
+from .routers import ARCHIVE_DATABASE
+
+SETTLED_WITHDRAWAL_STATUSES = ['completed', 'rejected', 'failed']
+
+
+def _archive_transaction(row):
+    return ArchivedTransaction(
+        id=row.pk, user_id=row.user_id, amount=row.amount, tx_hash=row.tx_hash, currency=row.currency,
+        status=row.status, transaction_type=row.transaction_type, transaction_date=row.transaction_date,
+        withdrawal_request_id=row.withdrawal_request_id,
+    )
+
+
+def _archive_earning(row):
+    return ArchivedEarning(
+        id=row.pk, user_id=row.user_id, amount=row.amount, earning_date=row.earning_date,
+        from_investment_id=row.from_investment_id, package_id=row.from_investment.package_id,
+    )
+
+
+def _archive_withdrawal(row):
+    return ArchivedWithdrawal(
+        id=row.pk, user_id=row.user_id, amount=row.amount, currency=row.currency, to_address=row.to_address,
+        status=row.status, created_at=row.created_at, processed_at=row.processed_at, admin_notes=row.admin_notes,
+        hold_status=row.hold_status, payout_batch=row.payout_batch,
+    )
+
+
+# table -> (hot queryset, date field, archived copy of a row or None, tx hash field or None)
+TABLES = {
+    'transactions': (lambda: Transaction.objects.all(), 'transaction_date', _archive_transaction, 'tx_hash'),
+    'earnings': (
+        lambda: UserEarning.objects.select_related('from_investment'), 'earning_date', _archive_earning, None,
+    ),
+    'withdrawals': (
+        lambda: WithdrawalRequest.objects.filter(status__in=SETTLED_WITHDRAWAL_STATUSES),
+        'processed_at', _archive_withdrawal, None,
+    ),
+    # Processed-transaction records are only kept as digests for dedupe.
+    'processed': (lambda: ProcessedTransaction.objects.all(), 'processed_at', None, 'tx_hash'),
+}
+
+
+def archive_cutoff(days=None):
+    return timezone.now() - timedelta(days=settings.ARCHIVE_AFTER_DAYS if days is None else days)
+
+
+def archive_batch(table, cutoff, batch_size=1000):
+    """
+    Moves up to batch_size rows older than cutoff from one hot table to the archive.
+    Returns the number of rows moved.
+    """
+    queryset, date_field, to_archive, hash_field = TABLES[table]
+    rows = list(queryset().filter(**{f'{date_field}__lt': cutoff}).order_by('pk')[:batch_size])
+    if not rows:
+        return 0
+
+    with transaction.atomic(using=ARCHIVE_DATABASE):
+        if to_archive is not None:
+            archived = [to_archive(row) for row in rows]
+            type(archived[0]).objects.bulk_create(archived, ignore_conflicts=True)
+        if hash_field is not None:
+            ArchivedTxHash.objects.bulk_create(
+                [ArchivedTxHash(digest=tx_digest(getattr(row, hash_field))) for row in rows], ignore_conflicts=True,
+            )
+
+    with transaction.atomic():
+        queryset().model.objects.filter(pk__in=[row.pk for row in rows]).delete()
+        # The rows drop out of the users' recent activity.
+        user_ids = {row.user_id for row in rows if hasattr(row, 'user_id')}
+        if user_ids:
+            bump_data_version(*user_ids)
+    return len(rows)
+
+
+def is_processed(tx_hash):
+    """
+    Returns True if a transaction hash has already been credited, whether its records
+    are still in the hot tables or have been archived.
+    """
+    return (
+        ProcessedTransaction.objects.filter(tx_hash=tx_hash).exists()
+        or Transaction.objects.filter(tx_hash=tx_hash).exists()
+        or ArchivedTxHash.objects.filter(digest=tx_digest(tx_hash)).exists()
+    )
+
+
+def statement(user_id, since=None, until=None):
+    """
+    Yields (date, kind, amount, reference) for all of a user's deposits, earnings and
+    withdrawals, hot and archived, in date order.
+    """
+    def dated(queryset, field):
+        if since is not None:
+            queryset = queryset.filter(**{f'{field}__gte': since})
+        if until is not None:
+            queryset = queryset.filter(**{f'{field}__lt': until})
+        return queryset.order_by(field)
+
+    sources = [
+        ((row.transaction_date, 'deposit', row.amount, row.tx_hash) for row in dated(
+            Transaction.objects.filter(user_id=user_id, transaction_type='deposit'), 'transaction_date')),
+        ((row.transaction_date, 'deposit', row.amount, row.tx_hash) for row in dated(
+            ArchivedTransaction.objects.filter(user_id=user_id, transaction_type='deposit'), 'transaction_date')),
+        ((row.earning_date, 'earning', row.amount, f'investment {row.from_investment_id}') for row in dated(
+            UserEarning.objects.filter(user_id=user_id), 'earning_date')),
+        ((row.earning_date, 'earning', row.amount, f'investment {row.from_investment_id}') for row in dated(
+            ArchivedEarning.objects.filter(user_id=user_id), 'earning_date')),
+        ((row.processed_at or row.created_at, 'withdrawal', -row.amount, row.to_address) for row in dated(
+            WithdrawalRequest.objects.filter(user_id=user_id, status='completed'), 'processed_at')),
+        ((row.processed_at or row.created_at, 'withdrawal', -row.amount, row.to_address) for row in dated(
+            ArchivedWithdrawal.objects.filter(user_id=user_id, status='completed'), 'processed_at')),
+    ]
+    return heapq.merge(*sources, key=lambda entry: entry[0])
@@ -0,0 +1,92 @@
+"""
+Earnings accrue lazily. An investment's earning is fixed when it is made and counts
+towards the user's balance from its maturity on: balances are read as the stored
+UserBalance plus matured_earnings(), one indexed aggregate over the user's
+uncredited investments. Crediting (a UserEarning, moving the amount into the stored
+balance) is deferred until the user withdraws, or until the settlement pass
+(calculate_user_earnings, run from tasks.py) gets to it, so that pass can run
+rarely.
+"""
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import Mod
+from django.utils import timezone
+
+from .models import UserEarning, UserInvestment
+from .money import Money
+from .push import publish
+
+
+def matured_uncredited(user_id, now=None):
+    """
+    Returns the user's investments that have matured but whose earnings haven't been
+    credited yet.
+    """
+    return UserInvestment.objects.filter(
+        user_id=user_id, earnings_calculated=False, matures_at__lte=now or timezone.now(),
+    )
+
+
+def matured_earnings(user_id, now=None):
+    """
+    Returns the total of the user's matured but uncredited earnings, which count
+    towards their balance on top of UserBalance.balance.
+    """
+    return matured_uncredited(user_id, now).aggregate(total=Sum('earning'))['total'] or Money(0)
+
+
+def credit_investment(investment):
+    """
+    Credits the earning of a matured investment exactly once.
+
+    Marking the investment as calculated is a conditional UPDATE in the same
+    transaction as the earning, so when several workers reach the same investment
+    only the first one credits it. Returns the UserEarning, or None if the
+    investment had already been credited.
+    """
+    with transaction.atomic():
+        claimed = UserInvestment.objects.filter(pk=investment.pk, earnings_calculated=False).update(
+            earnings_calculated=True
+        )
+        if not claimed:
+            return None
+        investment.earnings_calculated = True
+        earning = UserEarning.objects.create(
+            user_id=investment.user_id, amount=investment.earning, from_investment=investment,
+        )
+        publish(investment.user_id, 'earning_credited', amount=earning.amount, investment=investment.pk)
+    return earning
+
+
+def credit_matured(user_id, now=None):
+    """
+    Credits all of the user's matured earnings into their stored balance, e.g. before
+    reserving a withdrawal against it. Returns the number of investments credited.
+    """
+    return sum(credit_investment(investment) is not None for investment in matured_uncredited(user_id, now))
+
+
+def calculate_user_earnings(shard=0, shards=1, keep_alive=None, batch_size=500, now=None):
+    """
+    Settlement pass: credits the earnings of every matured investment whose user falls
+    in the given shard (user id modulo shards). Balances already include these
+    earnings, so this only needs to run often enough to keep the backlog of
+    uncredited investments small. keep_alive is called between batches and stops
+    the run when it returns False, e.g. when the shard's lease couldn't be renewed.
+    Returns the number of investments credited.
+    """
+    now = now or timezone.now()
+    investments = (
+        UserInvestment.objects.filter(earnings_calculated=False, matures_at__lte=now)
+        .annotate(user_shard=Mod('user_id', shards))
+        .filter(user_shard=shard)
+        .order_by('pk')
+    )
+
+    credited = 0
+    for i, investment in enumerate(investments.iterator(chunk_size=batch_size), 1):
+        if credit_investment(investment):
+            credited += 1
+        if i % batch_size == 0 and keep_alive is not None and not keep_alive():
+            break
+    return credited
@@ -1,6 +1,8 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
-from .models import CustomUser, Profile, WithdrawalRequest
+from .models import CustomUser, Profile, WithdrawalRequest, wallet_owner
+from .money import MoneyFormField
+from decimal import Decimal
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 import re
@@ -65,6 +67,10 @@ class ProfileForm(forms.ModelForm):
         usdt_address = self.cleaned_data['usdt_erc20_wallet_address']
         if usdt_address and not re.match(r'^0x[a-fA-F0-9]{40}$', usdt_address):
             raise forms.ValidationError("Invalid USDT ERC20 address.")
+        # Deposits from an address are credited to its one owner.
+        owner = wallet_owner(usdt_address) if usdt_address else None
+        if owner is not None and owner != self.instance.user_id:
+            raise forms.ValidationError("This wallet address is registered to another account.")
         return usdt_address
 
 
@@ -75,11 +81,13 @@ class CustomPasswordChangeForm(PasswordChangeForm):
 
 
 class WithdrawalRequestForm(forms.ModelForm):
+    # One micro-unit; zero and negative amounts would release money instead of holding it.
+    amount = MoneyFormField(min_value=Decimal('0.000001'), widget=forms.NumberInput(attrs={'class': 'form-control'}))
+
     class Meta:
         model = WithdrawalRequest
         fields = ['amount', 'currency', 'to_address']
         widgets = {
-            'amount': forms.NumberInput(attrs={'class': 'form-control'}),
             'currency': forms.Select(choices=[('USDT', 'USDT')], attrs={'class': 'form-select'}),
             'to_address': forms.TextInput(attrs={'class': 'form-control'}),
         }
@@ -0,0 +1,145 @@
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .archive import is_processed
+from .models import CustomUser, InvestmentPackage, ProcessedTransaction, Transaction, UserInvestment
+from .money import Money
+from .push import publish
+from .wallets import registry
+
+logger = logging.getLogger(__name__)
+
+
+def fetch_usdt_transactions(address):
+    """Fetch USDT transactions from Etherscan API."""
+    # Imported here: requests is slow to import and only live ingestion needs it.
+    import requests
+
+    try:
+        api_url = f"https://api.etherscan.io/api?module=account&action=tokentx&address={address}&contractaddress={settings.USDT_CONTRACT_ADDRESS}&page=1&offset=1000&sort=desc&apikey={settings.ETHERSCAN_API_KEY}"
+        response = requests.get(api_url)
+        response.raise_for_status()
+        return response.json().get('result', [])
+    except requests.RequestException as e:
+        logger.error(f"Error fetching USDT transactions from Etherscan: {e}")
+        return []
+
+
+def process_usdt_transactions(transactions, required_confirmations, dry_run=False):
+    """
+    Process USDT transactions.
+
+    Returns {outcome: [count, amount]} with outcomes 'credited', 'unconfirmed',
+    'duplicate' and 'unknown_sender'. With dry_run nothing is written, and
+    'credited' counts the transfers that would be credited.
+    """
+    summary = defaultdict(lambda: [0, Money(0)])
+    seen = set()
+    registry.refresh()
+    for tx in transactions:
+        tx_hash = tx.get('hash')
+        confirmations = int(tx.get('confirmations', 0))
+        if confirmations < required_confirmations:
+            logger.info(f"USDT transaction {tx_hash} has not reached required confirmations.")
+            outcome = 'unconfirmed'
+            if not dry_run:
+                notify_deposit_detected(tx, confirmations, required_confirmations)
+        elif tx_hash in seen or is_processed(tx_hash):
+            logger.info(f"Skipping transaction {tx_hash} as it has already been processed.")
+            outcome = 'duplicate'
+        elif (user := find_depositor(tx.get('from'))) is None:
+            outcome = 'unknown_sender'
+        elif dry_run or credit_deposit(tx, user):
+            outcome = 'credited'
+            seen.add(tx_hash)
+        else:
+            outcome = 'duplicate'
+        summary[outcome][0] += 1
+        summary[outcome][1] += transfer_amount(tx)
+    return dict(summary)
+
+
+def transfer_amount(tx):
+    # USDT has six decimals, so the on-chain value is already in micro-units.
+    return Money(int(tx.get('value', 0)))
+
+
+def notify_deposit_detected(tx, confirmations, required_confirmations):
+    user = find_depositor(tx.get('from'))
+    if user is not None:
+        publish(
+            user.pk, 'deposit_detected', tx_hash=tx.get('hash'), amount=transfer_amount(tx),
+            confirmations=confirmations, required_confirmations=required_confirmations,
+        )
+
+
+def find_depositor(sender_address):
+    """
+    Returns the user whose registered wallet sent a transfer, or None. Unknown
+    senders cost no query.
+    """
+    user_id = registry.user_id(sender_address)
+    return CustomUser.objects.filter(pk=user_id).first() if user_id is not None else None
+
+
+def credit_deposit(tx, user=None):
+    """
+    Records a deposit and its investment exactly once.
+
+    The ProcessedTransaction row is created in the same transaction as the deposit,
+    and its unique tx_hash makes a concurrent worker crediting the same transfer
+    fail and roll back. Returns the Transaction, or None if the sender is unknown or
+    the transfer was already credited.
+    """
+    tx_hash = tx.get('hash')
+    amount = transfer_amount(tx)
+    user = user or find_depositor(tx.get('from'))
+    if user is None:
+        # Left unprocessed so it's credited once the sender registers their wallet.
+        return None
+    try:
+        with transaction.atomic():
+            ProcessedTransaction.objects.create(tx_hash=tx_hash)
+            deposit = Transaction.objects.create(
+                user=user,
+                amount=amount,
+                currency='USDT',
+                status='confirmed',
+                transaction_type='deposit',
+                tx_hash=tx_hash,
+            )
+            investment = create_user_investment(user, amount)
+            publish(
+                user.pk, 'deposit_confirmed', tx_hash=tx_hash, amount=amount,
+                package=investment.package.name if investment else None,
+            )
+    except IntegrityError:
+        logger.info(f"Skipping transaction {tx_hash} as it was credited concurrently.")
+        return None
+    return deposit
+
+
+def create_user_investment(user, amount):
+    """Create an instance of the UserInvestment model."""
+    package = match_transaction_to_package(amount)
+    if package:
+        return UserInvestment.objects.create(
+            user=user,
+            package=package,
+            amount_invested=amount,
+            earnings_calculated=False,
+        )
+    logger.warning(f"No investment package found for the transaction amount: {amount}")
+    return None
+
+
+def match_transaction_to_package(amount):
+    """Match transaction to investment package."""
+    return InvestmentPackage.objects.filter(
+        min_amount__lte=amount,
+        max_amount__gte=amount,
+        currency='USDT'
+    ).first()
@@ -0,0 +1,43 @@
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import (
+    ASSETS_UNDER_MANAGEMENT, EARNINGS_OWED, PENDING_WITHDRAWALS, PlatformCounter, Transaction, UserBalance,
+    UserInvestment, WithdrawalRequest, deposits_counter_key,
+)
+from .money import Money
+
+
+def overview(today=None):
+    """
+    Reads the platform KPIs from the counters table with a single query.
+    """
+    deposits_today = deposits_counter_key(today or timezone.now())
+    keys = [ASSETS_UNDER_MANAGEMENT, PENDING_WITHDRAWALS, EARNINGS_OWED, deposits_today]
+    values = dict(PlatformCounter.objects.filter(key__in=keys).values_list('key', 'value'))
+    return {
+        'assets_under_management': values.get(ASSETS_UNDER_MANAGEMENT, Money(0)),
+        'pending_withdrawals': values.get(PENDING_WITHDRAWALS, Money(0)),
+        'earnings_owed': values.get(EARNINGS_OWED, Money(0)),
+        'deposits_today': values.get(deposits_today, Money(0)),
+    }
+
+
+def recompute_counters(today=None):
+    """
+    Recomputes the KPI counters from the ledger tables with full-table aggregates.
+    Returns {counter key: value}.
+    """
+    today = today or timezone.now()
+    start = timezone.localtime(today).replace(hour=0, minute=0, second=0, microsecond=0)
+    totals = {
+        ASSETS_UNDER_MANAGEMENT: UserBalance.objects.aggregate(total=Sum('balance'))['total'],
+        PENDING_WITHDRAWALS: WithdrawalRequest.objects.filter(hold_status='held').aggregate(total=Sum('amount'))['total'],
+        EARNINGS_OWED: UserInvestment.objects.filter(earnings_calculated=False).aggregate(total=Sum('earning'))['total'],
+        deposits_counter_key(today): Transaction.objects.filter(
+            transaction_type='deposit',
+            transaction_date__gte=start,
+            transaction_date__lt=start + timezone.timedelta(days=1),
+        ).aggregate(total=Sum('amount'))['total'],
+    }
+    return {key: value or Money(0) for key, value in totals.items()}
@@ -0,0 +1,64 @@
+"""
+Expiring, database-backed leases on job shards.
+
+A worker claims a shard by setting itself as the lease owner with a conditional
+UPDATE that only succeeds if the lease is free, expired or already its own, so at
+most one worker holds a shard at a time. Workers renew their lease while they work
+(a heartbeat) and stop as soon as a renewal fails; a crashed worker's shard becomes
+claimable again once its lease expires.
+"""
+import os
+import random
+import socket
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import WorkLease
+
+DEFAULT_TTL = timedelta(minutes=5)
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(job, shard, owner, ttl=DEFAULT_TTL):
+    """
+    Tries to take the lease on one shard. Returns True if owner now holds it.
+    """
+    now = timezone.now()
+    WorkLease.objects.get_or_create(job=job, shard=shard)
+    claimed = WorkLease.objects.filter(
+        Q(owner='') | Q(owner=owner) | Q(expires_at__lt=now),
+        job=job, shard=shard,
+    ).update(owner=owner, expires_at=now + ttl)
+    return bool(claimed)
+
+
+def claim_any(job, shards, owner, ttl=DEFAULT_TTL):
+    """
+    Claims the first free shard of a job split into `shards` shards, trying them in
+    random order so concurrent workers rarely contend. Returns the shard or None.
+    """
+    for shard in random.sample(range(shards), shards):
+        if claim(job, shard, owner, ttl):
+            return shard
+    return None
+
+
+def renew(job, shard, owner, ttl=DEFAULT_TTL):
+    """
+    Extends a held lease. Returns False if the lease has expired (another worker may
+    have taken the shard over), in which case the caller must stop working on it.
+    """
+    now = timezone.now()
+    return bool(
+        WorkLease.objects.filter(job=job, shard=shard, owner=owner, expires_at__gte=now)
+        .update(expires_at=now + ttl)
+    )
+
+
+def release(job, shard, owner):
+    WorkLease.objects.filter(job=job, shard=shard, owner=owner).update(owner='', expires_at=None)
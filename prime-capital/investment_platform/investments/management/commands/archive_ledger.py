@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from investments.archive import TABLES, archive_batch, archive_cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves transactions, earnings, settled withdrawals and processed-transaction "
+        "records older than ARCHIVE_AFTER_DAYS from the hot tables to the archive "
+        "database, in batches. Safe to interrupt and re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--table', action='append', choices=sorted(TABLES),
+                            help='Table to archive (repeatable). Defaults to all.')
+        parser.add_argument('--days', type=int, help='Archive rows older than this many days.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--max-batches', type=int, help='Stop each table after this many batches.')
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(options['days'])
+        self.stdout.write(f'Archiving rows older than {cutoff:%Y-%m-%d %H:%M}')
+
+        for table in options['table'] or list(TABLES):
+            start = time.perf_counter()
+            moved = batches = 0
+            while options['max_batches'] is None or batches < options['max_batches']:
+                count = archive_batch(table, cutoff, options['batch_size'])
+                if not count:
+                    break
+                moved += count
+                batches += 1
+            queryset = TABLES[table][0]()
+            self.stdout.write(self.style.SUCCESS(
+                f'{table}: archived {moved} rows in {time.perf_counter() - start:.1f}s, '
+                f'{queryset.count()} left in the hot table'
+            ))
@@ -0,0 +1,56 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from investments.rollups import METRICS, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the daily rollup tables from the ledger, a chunk of days at a time. "
+        "Each chunk replaces its days' rollups in one transaction, so the command can "
+        "be interrupted and re-run safely."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--metric', action='append', choices=sorted(METRICS),
+                            help='Metric to rebuild (repeatable). Defaults to all.')
+        parser.add_argument('--since', type=date.fromisoformat,
+                            help='First day (YYYY-MM-DD). Defaults to the earliest event.')
+        parser.add_argument('--until', type=date.fromisoformat,
+                            help='Last day (YYYY-MM-DD). Defaults to today.')
+        parser.add_argument('--chunk-days', type=int, default=31)
+
+    def handle(self, *args, **options):
+        if options['chunk_days'] < 1:
+            raise CommandError('--chunk-days must be at least 1.')
+        until = options['until'] or timezone.localdate()
+
+        for metric in options['metric'] or list(METRICS):
+            since = options['since'] or self.first_day(metric)
+            if since is None:
+                self.stdout.write(f'{metric}: no events')
+                continue
+
+            start = time.perf_counter()
+            rows = 0
+            first = since
+            while first <= until:
+                last = min(first + timedelta(days=options['chunk_days'] - 1), until)
+                rows += rebuild_rollups(metric, first, last)
+                first = last + timedelta(days=1)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(self.style.SUCCESS(
+                f'{metric}: {rows} rollup rows for {since}..{until} in {elapsed:.1f}s'
+            ))
+
+    def first_day(self, metric):
+        earliest = [
+            queryset().aggregate(earliest=Min(date_field))['earliest']
+            for queryset, date_field, amount_field, package_field in METRICS[metric]
+        ]
+        earliest = [value for value in earliest if value is not None]
+        return timezone.localdate(min(earliest)) if earliest else None
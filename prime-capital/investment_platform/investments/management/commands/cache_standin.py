@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand
+
+
+class MemcachedStandin:
+    """
+    In-memory server for the subset of the memcached text protocol that Django's
+    PyMemcacheCache backend uses. Meant for tests and benchmarks, not production.
+    """
+
+    def __init__(self):
+        self.items = {}  # key -> (flags, expires_at, value)
+
+    def _get(self, key):
+        item = self.items.get(key)
+        if item is not None and item[1] and item[1] <= time.time():
+            del self.items[key]
+            return None
+        return item
+
+    @staticmethod
+    def _expires_at(exptime):
+        exptime = int(exptime)
+        if exptime == 0:
+            return 0
+        if exptime < 0:
+            return -1
+        # Like memcached, values over 30 days are absolute unix timestamps.
+        return exptime if exptime > 60 * 60 * 24 * 30 else time.time() + exptime
+
+    async def handle(self, reader, writer):
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            parts = line.decode().split()
+            if not parts:
+                continue
+            command, args = parts[0], parts[1:]
+            noreply = bool(args) and args[-1] == 'noreply'
+            if noreply:
+                args = args[:-1]
+
+            if command in ('set', 'add', 'replace', 'append', 'prepend', 'cas'):
+                data = await reader.readexactly(int(args[3]) + 2)
+                response = self.store(command, args, data[:-2])
+            elif command in ('get', 'gets'):
+                response = self.retrieve(args, with_cas=command == 'gets')
+            elif command == 'delete':
+                response = b'DELETED\r\n' if self.items.pop(args[0], None) else b'NOT_FOUND\r\n'
+            elif command in ('incr', 'decr'):
+                response = self.incr(args[0], int(args[1]) if command == 'incr' else -int(args[1]))
+            elif command == 'touch':
+                item = self._get(args[0])
+                if item:
+                    self.items[args[0]] = (item[0], self._expires_at(args[1]), item[2])
+                response = b'TOUCHED\r\n' if item else b'NOT_FOUND\r\n'
+            elif command == 'flush_all':
+                self.items.clear()
+                response = b'OK\r\n'
+            elif command == 'version':
+                response = b'VERSION standin\r\n'
+            elif command == 'quit':
+                break
+            else:
+                response = b'ERROR\r\n'
+
+            if not noreply:
+                writer.write(response)
+                await writer.drain()
+        writer.close()
+
+    def store(self, command, args, value):
+        key, flags, exptime = args[0], int(args[1]), args[2]
+        existing = self._get(key)
+        if command == 'add' and existing:
+            return b'NOT_STORED\r\n'
+        if command in ('replace', 'append', 'prepend', 'cas') and not existing:
+            return b'NOT_FOUND\r\n' if command == 'cas' else b'NOT_STORED\r\n'
+        if command == 'cas' and int(args[4]) != id(existing):
+            return b'EXISTS\r\n'
+        if command == 'append':
+            flags, value = existing[0], existing[2] + value
+        elif command == 'prepend':
+            flags, value = existing[0], value + existing[2]
+        self.items[key] = (flags, self._expires_at(exptime), value)
+        return b'STORED\r\n'
+
+    def retrieve(self, keys, with_cas=False):
+        response = []
+        for key in keys:
+            item = self._get(key)
+            if item is None:
+                continue
+            flags, _, value = item
+            cas = f' {id(item)}' if with_cas else ''
+            response.append(f'VALUE {key} {flags} {len(value)}{cas}\r\n'.encode() + value + b'\r\n')
+        response.append(b'END\r\n')
+        return b''.join(response)
+
+    def incr(self, key, delta):
+        item = self._get(key)
+        if item is None:
+            return b'NOT_FOUND\r\n'
+        value = max(0, int(item[2]) + delta)
+        self.items[key] = (item[0], item[1], str(value).encode())
+        return f'{value}\r\n'.encode()
+
+
+class Command(BaseCommand):
+    help = "Runs a local in-memory memcached-protocol server for tests and benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=11211)
+
+    def handle(self, *args, **options):
+        asyncio.run(self.serve(options['host'], options['port']))
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(MemcachedStandin().handle, host, port)
+        self.stdout.write(f'Memcached stand-in listening on {host}:{port}')
+        async with server:
+            await server.serve_forever()
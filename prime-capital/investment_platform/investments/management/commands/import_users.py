@@ -0,0 +1,191 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from investments.models import (
+    WALLET_REGISTRY_VERSION, CustomUser, Profile, Referral, UserBalance, UserWallet, bump_counter,
+    generate_referral_code, normalize_address,
+)
+from investments.workers import init_worker, prepare_fork
+
+USER_FIELDS = ['username', 'email', 'first_name', 'last_name']
+
+
+def read_rows(path, fmt):
+    """Streams rows from a CSV or JSONL file as dicts."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk imports users from a CSV or JSONL file. Each row needs a username and "
+        "either a plain 'password' or an already hashed 'password_hash'; email, "
+        "first_name, last_name, referral_code, referred_by (username or referral code) "
+        "and usdt_erc20_wallet_address are optional. Progress is checkpointed after "
+        "every batch, so re-running the same command resumes after a failure."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Input format (default: guessed from the file extension).')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Processes used for password hashing.')
+        parser.add_argument('--state', help='Checkpoint file (default: <path>.import-state).')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+        state_path = options['state'] or f'{path}.import-state'
+        done = 0
+        if os.path.exists(state_path) and not options['restart']:
+            with open(state_path) as f:
+                done = json.load(f)['rows']
+            self.stdout.write(f'Resuming after {done} rows.')
+
+        rows = islice(read_rows(path, fmt), done, None)
+        imported = skipped = 0
+        start = time.perf_counter()
+
+        prepare_fork()
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=init_worker) as pool:
+            for batch in batched(rows, options['batch_size']):
+                created = self.import_batch(batch, pool)
+                imported += created
+                skipped += len(batch) - created
+                done += len(batch)
+                with open(state_path, 'w') as f:
+                    json.dump({'rows': done}, f)
+
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f'{done} rows read, {imported} imported, {skipped} skipped '
+                                  f'({imported / elapsed:.0f} users/s)')
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} users in {elapsed:.1f}s ({imported / max(elapsed, 1e-9):.0f} users/s), '
+            f'skipped {skipped}.'
+        ))
+
+    def import_batch(self, batch, pool):
+        """Creates the users of one batch with their profiles, balances and referrals."""
+        for row in batch:
+            if not row.get('username'):
+                raise CommandError(f'Row without a username: {row}')
+
+        # Users that already exist were imported by an earlier, interrupted run.
+        existing = set(CustomUser.objects.filter(
+            username__in=[row['username'] for row in batch]
+        ).values_list('username', flat=True))
+        rows = [row for row in batch if row['username'] not in existing]
+        if not rows:
+            return 0
+
+        to_hash = [row for row in rows if not row.get('password_hash')]
+        hashes = pool.map(make_password, [row.get('password') or None for row in to_hash], chunksize=64)
+        for row, password_hash in zip(to_hash, hashes):
+            row['password_hash'] = password_hash
+
+        self.assign_referral_codes(rows)
+
+        with transaction.atomic():
+            users = CustomUser.objects.bulk_create([
+                CustomUser(
+                    password=row['password_hash'],
+                    referral_code=row['referral_code'],
+                    **{field: row.get(field) or '' for field in USER_FIELDS},
+                )
+                for row in rows
+            ])
+            Profile.objects.bulk_create([
+                Profile(user=user, usdt_erc20_wallet_address=row.get('usdt_erc20_wallet_address') or '')
+                for user, row in zip(users, rows)
+            ])
+            # bulk_create skips Profile.save, so the wallets deposits are attributed by
+            # are registered here.
+            wallets = self.build_wallets(users, rows)
+            if wallets:
+                UserWallet.objects.bulk_create(wallets, ignore_conflicts=True)
+                bump_counter(WALLET_REGISTRY_VERSION, 1)
+            UserBalance.objects.bulk_create([UserBalance(user=user) for user in users])
+            Referral.objects.bulk_create(self.build_referrals(users, rows))
+        return len(users)
+
+    def build_wallets(self, users, rows):
+        """
+        Returns profile wallets for the batch's addresses. An address that is already
+        someone's profile wallet, or appears earlier in the batch, stays with them.
+        """
+        addresses = [normalize_address(row.get('usdt_erc20_wallet_address')) for row in rows]
+        taken = set(UserWallet.objects.filter(
+            address__in=set(addresses), source=UserWallet.PROFILE,
+        ).values_list('address', flat=True))
+        wallets = []
+        for user, address in zip(users, addresses):
+            if not address:
+                continue
+            if address in taken:
+                self.stderr.write(f"{user.username}: wallet {address} is registered to another account")
+                continue
+            wallets.append(UserWallet(user=user, address=address, source=UserWallet.PROFILE))
+            taken.add(address)
+        return wallets
+
+    def assign_referral_codes(self, rows):
+        """
+        Gives every row a referral code that is unique among existing users and the
+        batch itself, checking candidates against the database in bulk.
+        """
+        batch_codes = set()
+        pending = rows
+        while pending:
+            for row in pending:
+                code = row.get('referral_code')
+                while not code or code in batch_codes:
+                    code = generate_referral_code()
+                row['referral_code'] = code
+                batch_codes.add(code)
+            clashes = set(CustomUser.objects.filter(
+                referral_code__in=[row['referral_code'] for row in pending]
+            ).values_list('referral_code', flat=True))
+            pending = [row for row in pending if row['referral_code'] in clashes]
+
+    def build_referrals(self, users, rows):
+        keys = {row['referred_by'] for row in rows if row.get('referred_by')}
+        if not keys:
+            return []
+        referrers = {}
+        for referrer in CustomUser.objects.filter(Q(username__in=keys) | Q(referral_code__in=keys)):
+            referrers[referrer.username] = referrer
+            referrers[referrer.referral_code] = referrer
+
+        referrals = []
+        for user, row in zip(users, rows):
+            referrer = referrers.get(row.get('referred_by'))
+            if referrer is not None and referrer.pk != user.pk:
+                referrals.append(Referral(referred_by=referrer, referred_user=user))
+            elif row.get('referred_by'):
+                self.stderr.write(f"{user.username}: unknown referrer {row['referred_by']!r}")
+        return referrals
@@ -0,0 +1,90 @@
+import asyncio
+import json
+import os
+import sys
+
+from django.core.management.base import BaseCommand
+
+
+class OutboxStandin:
+    """
+    Receiver for the outbox socket and HTTP sinks. Keeps events in offset order,
+    drops offsets it already has and appends the rest to a JSONL stream. Meant for
+    tests and benchmarks, not production.
+    """
+
+    def __init__(self, output, offset=0):
+        self.output = output
+        self.offset = offset
+
+    def receive(self, events):
+        for event in events:
+            if event['offset'] <= self.offset:
+                continue
+            self.output.write(json.dumps(event) + '\n')
+            self.offset = event['offset']
+        self.output.flush()
+        return json.dumps({'offset': self.offset}).encode()
+
+    async def handle_socket(self, reader, writer):
+        # JSON lines, ended by a blank line.
+        events = []
+        while True:
+            line = await reader.readline()
+            if not line.strip():
+                break
+            events.append(json.loads(line))
+        writer.write(self.receive(events) + b'\n')
+        await writer.drain()
+        writer.close()
+
+    async def handle_http(self, reader, writer):
+        request_line = await reader.readline()
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if not line.strip():
+                break
+            name, _, value = line.decode().partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if not request_line.startswith(b'POST '):
+            writer.write(b'HTTP/1.1 405 Method Not Allowed\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+        else:
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+            response = self.receive(json.loads(body))
+            writer.write(
+                b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                + f'Content-Length: {len(response)}\r\nConnection: close\r\n\r\n'.encode()
+                + response
+            )
+        await writer.drain()
+        writer.close()
+
+
+class Command(BaseCommand):
+    help = "Runs a local receiver for the outbox socket or HTTP sink, for tests and benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8770)
+        parser.add_argument('--http', action='store_true', help='Speak HTTP instead of the socket protocol.')
+        parser.add_argument('--output', help='JSONL file to append events to (default: stdout).')
+
+    def handle(self, *args, **options):
+        offset = 0
+        if options['output'] and os.path.exists(options['output']):
+            # Carry on after the events received before a restart.
+            with open(options['output']) as f:
+                for line in f:
+                    offset = json.loads(line)['offset']
+        output = open(options['output'], 'a') if options['output'] else sys.stdout
+        standin = OutboxStandin(output, offset)
+        handler = standin.handle_http if options['http'] else standin.handle_socket
+        asyncio.run(self.serve(handler, options['host'], options['port'], options['http']))
+
+    async def serve(self, handler, host, port, http):
+        server = await asyncio.start_server(handler, host, port)
+        protocol = f'http://{host}:{port}/' if http else f'tcp://{host}:{port}'
+        self.stderr.write(f'Outbox stand-in listening on {protocol}')
+        async with server:
+            await server.serve_forever()
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from investments.withdrawals import complete_payout_batch, write_payout_manifest
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes all approved withdrawals that haven't been batched yet to a single payout "
+        "manifest (CSV). Once the batch has been paid out, run again with --complete "
+        "<batch> to mark its withdrawals completed and settle their holds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.PAYOUT_MANIFEST_ROOT,
+                            help='Directory to write the manifest to (default: PAYOUT_MANIFEST_ROOT).')
+        parser.add_argument('--complete', metavar='BATCH', help='Mark a paid-out batch as completed.')
+
+    def handle(self, *args, **options):
+        if options['complete']:
+            completed = complete_payout_batch(options['complete'])
+            self.stdout.write(self.style.SUCCESS(f"Completed {len(completed)} withdrawals in {options['complete']}."))
+            return
+
+        batch, path, count = write_payout_manifest(options['output'])
+        if not count:
+            self.stdout.write('No approved withdrawals to pay out.')
+            return
+        self.stdout.write(self.style.SUCCESS(f'Wrote {count} withdrawals to {path} (batch {batch}).'))
@@ -0,0 +1,43 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from investments.pages import PUBLIC_PAGES, USER_PAGES, pages_version, render_public_page
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes the public marketing pages out as static HTML so the front web server "
+        "can serve them without touching Django. Each page is written to "
+        "<output>/<url path>/index.html. Pages that show the logged-in user are left "
+        "to Django."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.PRERENDER_ROOT,
+                            help='Directory to write the pages to (default: PRERENDER_ROOT).')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        version, _ = pages_version()
+        pages = {url_name: template for url_name, template in PUBLIC_PAGES.items() if url_name not in USER_PAGES}
+
+        for url_name, template_name in pages.items():
+            path = reverse(url_name).strip('/')
+            directory = os.path.join(output, path)
+            os.makedirs(directory, exist_ok=True)
+            filename = os.path.join(directory, 'index.html')
+
+            # Write to a temporary file first so the web server never sees a partial page.
+            tmp_filename = f'{filename}.tmp'
+            with open(tmp_filename, 'w', encoding='utf-8') as f:
+                f.write(render_public_page(template_name))
+            os.replace(tmp_filename, filename)
+            self.stdout.write(f'{url_name}: {filename}')
+
+        with open(os.path.join(output, 'VERSION'), 'w') as f:
+            f.write(version)
+
+        self.stdout.write(self.style.SUCCESS(f'Pre-rendered {len(pages)} pages (version {version}).'))
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from investments.projections import OpenBook, payout_schedule, project
+
+
+def package_value(value):
+    package_id, _, number = value.partition('=')
+    try:
+        return int(package_id), number
+    except ValueError:
+        raise CommandError(f'Expected <package id>=<value>, got {value!r}')
+
+
+class Command(BaseCommand):
+    help = (
+        "Projects the earnings owed on open investments over the next hours, optionally "
+        "with what-if interest rates or durations for some packages."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horizon', type=int, action='append', help='Hours ahead (repeatable; default 24, 48, 72).')
+        parser.add_argument('--set-rate', type=package_value, action='append', default=[], metavar='PACKAGE=RATE',
+                            help='What-if interest rate (percent) for a package.')
+        parser.add_argument('--set-duration', type=package_value, action='append', default=[], metavar='PACKAGE=HOURS',
+                            help='What-if duration (hours) for a package.')
+        parser.add_argument('--schedule', type=int, metavar='BUCKET_HOURS',
+                            help='Also print the payout schedule in buckets of this many hours.')
+
+    def handle(self, *args, **options):
+        overrides = {}
+        for package_id, rate in options['set_rate']:
+            overrides.setdefault(package_id, {})['interest_rate'] = float(rate)
+        for package_id, hours in options['set_duration']:
+            overrides.setdefault(package_id, {})['duration'] = int(hours)
+        horizons = options['horizon'] or [24, 48, 72]
+
+        book = OpenBook.load()
+        try:
+            result = project(book, horizons, overrides)
+        except ValueError as e:
+            raise CommandError(e)
+
+        self.stdout.write(f"{result['open_investments']} open investments, {result['overdue']:.2f} overdue")
+        for horizon in result['horizons']:
+            self.stdout.write(f"next {horizon['hours']}h: {horizon['total']:.2f} owed on {horizon['count']} investments")
+            for name, total in horizon['by_package'].items():
+                self.stdout.write(f'    {name}: {total:.2f}')
+
+        if options['schedule']:
+            self.stdout.write('')
+            for start, total in payout_schedule(book, options['schedule'], max(horizons), overrides):
+                self.stdout.write(f'{start:%Y-%m-%d %H:%M}  {total:.2f}')
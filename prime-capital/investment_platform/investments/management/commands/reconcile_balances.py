@@ -0,0 +1,62 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.core.management.base import BaseCommand
+
+from investments.models import CustomUser
+from investments.money import Money
+from investments.reconciliation import contributing_rows, reconcile_range, repair_balance
+from investments.workers import id_ranges, init_worker, prepare_fork
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes every user's balance from deposits, earnings, referral commissions "
+        "and completed withdrawals and reports any drift from UserBalance. Users are "
+        "processed in id-range chunks across a process pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000, help='Users per chunk.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+        parser.add_argument('--tolerance', type=Money.from_decimal, default=Money(0),
+                            help='Allowed drift in whole units, e.g. 0.01.')
+        parser.add_argument('--show-rows', action='store_true',
+                            help='List the rows contributing to each drifting balance.')
+        parser.add_argument('--repair', action='store_true',
+                            help='Set drifting balances to their expected value.')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        ranges = list(id_ranges(CustomUser.objects.all(), options['chunk_size']))
+        reconcile = partial(reconcile_range, tolerance=options['tolerance'])
+
+        drifted = repaired = 0
+        prepare_fork()
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=init_worker) as pool:
+            for drift in pool.map(reconcile, ranges):
+                for record in drift:
+                    drifted += 1
+                    self.report(record, options['show_rows'])
+                    if options['repair'] and repair_balance(record):
+                        repaired += 1
+
+        elapsed = time.perf_counter() - start
+        summary = f'{len(ranges)} chunks checked in {elapsed:.1f}s, {drifted} balances drifted'
+        if options['repair']:
+            summary += f', {repaired} repaired'
+        style = self.style.WARNING if drifted and not options['repair'] else self.style.SUCCESS
+        self.stdout.write(style(summary + '.'))
+
+    def report(self, record, show_rows):
+        components = ', '.join(f'{name} {total}' for name, total in sorted(record['components'].items()))
+        self.stdout.write(
+            f"user {record['user_id']}: stored {record['stored']}, expected {record['expected']} "
+            f"(drift {record['stored'] - record['expected']}; {components or 'no records'})"
+        )
+        if show_rows:
+            for component, rows in contributing_rows(record['user_id']).items():
+                for pk, amount, date in rows:
+                    self.stdout.write(f'    {component} #{pk}: {amount} at {date}')
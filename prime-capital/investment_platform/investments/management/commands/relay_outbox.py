@@ -0,0 +1,64 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from investments import leases, outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Relays outbox events to the sinks in OUTBOX_SINKS, then prunes the events every "
+        "sink has taken. Each sink is relayed by one worker at a time; run it from cron, "
+        "or keep it running with --follow."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sink', action='append', default=[], help='Relay only this sink (repeatable).')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--follow', action='store_true', help='Keep relaying new events.')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between passes with --follow.')
+        parser.add_argument('--no-prune', action='store_true')
+        parser.add_argument('--lease-seconds', type=int, default=300)
+
+    def handle(self, *args, **options):
+        sinks = settings.OUTBOX_SINKS
+        unknown = set(options['sink']) - set(sinks)
+        if unknown:
+            raise CommandError(f"Unknown sink {', '.join(sorted(unknown))}; OUTBOX_SINKS has {', '.join(sinks)}.")
+        names = options['sink'] or list(sinks)
+        owner = leases.worker_id()
+        ttl = timedelta(seconds=options['lease_seconds'])
+
+        while True:
+            failed = []
+            for name in names:
+                job = f'outbox:{name}'
+                if not leases.claim(job, 0, owner, ttl):
+                    self.stdout.write(f'{name}: already being relayed elsewhere.')
+                    continue
+                try:
+                    relayed = outbox.relay(
+                        name, outbox.sink_for(sinks[name]), options['batch_size'],
+                        keep_alive=lambda: leases.renew(job, 0, owner, ttl),
+                    )
+                except (OSError, ValueError, outbox.OutboxError) as e:
+                    self.stderr.write(f'{name}: {e}')
+                    failed.append(name)
+                    continue
+                finally:
+                    leases.release(job, 0, owner)
+                if relayed or options['verbosity'] > 1:
+                    self.stdout.write(f'{name}: relayed {relayed} events.')
+
+            if not options['no_prune']:
+                pruned = outbox.prune(list(sinks))
+                if pruned and options['verbosity'] > 1:
+                    self.stdout.write(f'Pruned {pruned} events.')
+
+            if not options['follow']:
+                if failed:
+                    raise CommandError(f"Relaying to {', '.join(failed)} failed.")
+                return
+            time.sleep(options['interval'])
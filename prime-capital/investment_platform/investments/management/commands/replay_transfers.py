@@ -0,0 +1,120 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError
+
+from investments.replay import (
+    iter_json_array, iter_ndjson, merge_summary, ndjson_slices, replay, replay_ndjson_slice,
+)
+from investments.workers import init_worker, prepare_fork
+
+OUTCOMES = ['credited', 'duplicate', 'unknown_sender', 'unconfirmed']
+
+
+class Command(BaseCommand):
+    help = (
+        "Replays a recorded dump of Etherscan token transfers (NDJSON, a JSON array or a "
+        "saved API response) through the same processing path as live deposit ingestion, "
+        "without calling the API. Deposits are credited from this one process, since "
+        "SQLite takes one writer at a time; --dry-run only reports what would be "
+        "credited and can check chunks of the dump in parallel with --workers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['ndjson', 'json'],
+                            help='Input format (default: guessed from the file extension).')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Processes checking the dump with --dry-run (default: 1).')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--from-block', type=int)
+        parser.add_argument('--to-block', type=int)
+        parser.add_argument('--confirmations', type=int, default=25,
+                            help='Confirmations a transfer needs to be credited.')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be credited.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist')
+        fmt = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'json')
+        replay_options = {
+            'confirmations': options['confirmations'],
+            'dry_run': options['dry_run'],
+            'from_block': options['from_block'],
+            'to_block': options['to_block'],
+        }
+
+        start = time.perf_counter()
+        total = {}
+        try:
+            if options['dry_run'] and options['workers'] > 1:
+                self.check_parallel(path, fmt, options, replay_options, total)
+            else:
+                transfers = iter_ndjson(path) if fmt == 'ndjson' else iter_json_array(path)
+                while batch := list(islice(transfers, options['batch_size'])):
+                    self.report_batch(total, *replay(batch, **replay_options))
+        except OperationalError as e:
+            # Crediting is idempotent, so a re-run picks up where this one stopped.
+            self.summarize(total, options['dry_run'], start)
+            raise CommandError(f'Stopped by a database error ({e}); re-run to credit the rest.')
+        self.summarize(total, options['dry_run'], start)
+
+    def check_parallel(self, path, fmt, options, replay_options, total):
+        """
+        Dry-runs chunks of the dump across a process pool. Only safe for dry runs:
+        concurrent writers would contend for SQLite's single write lock.
+        """
+        prepare_fork()
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=init_worker) as pool:
+            if fmt == 'ndjson':
+                # Each worker parses its own line-aligned byte range of the file; dumps
+                # are in block order, so each range covers a contiguous block range.
+                slices = ndjson_slices(path, options['workers'] * 4)
+                replay_slice = partial(
+                    replay_ndjson_slice, path, batch_size=options['batch_size'], **replay_options,
+                )
+                results = pool.map(replay_slice, *zip(*slices)) if slices else []
+            else:
+                results = self.replay_stream(pool, iter_json_array(path), options['batch_size'],
+                                             options['workers'], replay_options)
+            for result in results:
+                self.report_batch(total, *result)
+
+    def report_batch(self, total, low, high, summary):
+        if low is not None:
+            self.stdout.write(f'blocks {low}-{high}: {self.describe(summary)}')
+        merge_summary(total, summary)
+
+    def summarize(self, total, dry_run, start):
+        elapsed = time.perf_counter() - start
+        transfers = sum(count for count, amount in total.values())
+        verb = 'Would credit' if dry_run else 'Credited'
+        credited, amount = total.get('credited', (0, 0))
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {credited} of {transfers} transfers ({amount} USDT) in {elapsed:.1f}s; '
+            f'{self.describe(total)}'
+        ))
+
+    def replay_stream(self, pool, transfers, batch_size, workers, replay_options):
+        """
+        Parses the dump in this process and hands batches to the pool, keeping a
+        bounded number of batches in flight. Yields the results in input order.
+        """
+        pending = deque()
+        while batch := list(islice(transfers, batch_size)):
+            pending.append(pool.submit(replay, batch, **replay_options))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def describe(self, summary):
+        return ', '.join(
+            f'{outcome} {summary[outcome][0]}' for outcome in OUTCOMES if outcome in summary
+        ) or 'no transfers'
@@ -0,0 +1,68 @@
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from investments.models import CustomUser, IdentityVerification, Transaction, generate_referral_code
+from investments.money import Money
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds the database for benchmarks/loadtest.py: a staff user <prefix>-admin and "
+        "users <prefix>-1..N, all with the same password, identity-verified and with a "
+        "confirmed deposit so they can request withdrawals. Existing load-test users "
+        "are kept unless --reset is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--prefix', default='loadtest')
+        parser.add_argument('--password', default='loadtest-password')
+        parser.add_argument('--deposit', type=Money.from_decimal, default=Money.from_decimal(1000),
+                            help='Deposit credited to each user, in whole units.')
+        parser.add_argument('--reset', action='store_true', help='Delete existing load-test users first.')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        # Hash once; every load-test user shares the password.
+        password = make_password(options['password'])
+
+        with transaction.atomic():
+            if options['reset']:
+                deleted, _ = CustomUser.objects.filter(username__startswith=f'{prefix}-').delete()
+                self.stdout.write(f'Deleted {deleted} rows of earlier load-test data.')
+
+            CustomUser.objects.get_or_create(username=f'{prefix}-admin', defaults={
+                'password': password, 'is_staff': True, 'is_superuser': True, 'email': f'{prefix}-admin@example.com',
+            })
+
+            usernames = [f'{prefix}-{i}' for i in range(1, options['users'] + 1)]
+            existing = set(CustomUser.objects.filter(username__in=usernames).values_list('username', flat=True))
+            users = CustomUser.objects.bulk_create([
+                CustomUser(
+                    username=username, password=password, email=f'{username}@example.com',
+                    referral_code=generate_referral_code(),
+                )
+                for username in usernames if username not in existing
+            ], batch_size=500)
+            # bulk_create doesn't return ids on every backend.
+            users = list(CustomUser.objects.filter(username__in=[user.username for user in users]))
+
+            IdentityVerification.objects.bulk_create([
+                IdentityVerification(
+                    user=user, ssn='000-00-0000', zip_code='00000', full_name=user.username, address='1 Load Test Way',
+                    state='CA', document_type='passport', document_front='loadtest.png', document_back='loadtest.png',
+                    is_verified=True,
+                )
+                for user in users
+            ], batch_size=500)
+            # Saved one by one so balances, counters and rollups are maintained as for real deposits.
+            for user in users:
+                Transaction.objects.create(
+                    user=user, amount=options['deposit'], currency='USDT', status='confirmed',
+                    transaction_type='deposit', tx_hash=f'{prefix}-seed-{user.pk}',
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(users)} new users ({len(existing)} already existed) and {prefix}-admin.'
+        ))
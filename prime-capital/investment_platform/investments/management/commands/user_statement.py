@@ -0,0 +1,34 @@
+import csv
+from datetime import date, datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from investments.archive import statement
+from investments.models import CustomUser
+
+
+def day_start(value):
+    return timezone.make_aware(datetime.combine(date.fromisoformat(value), time.min))
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes a user's deposits, earnings and completed withdrawals as CSV, "
+        "including rows that have been archived."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--since', type=day_start, help='First day (YYYY-MM-DD).')
+        parser.add_argument('--until', type=day_start, help='Day after the last one (YYYY-MM-DD).')
+
+    def handle(self, *args, **options):
+        user = CustomUser.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f"No user named {options['username']}")
+
+        writer = csv.writer(self.stdout)
+        writer.writerow(['date', 'type', 'amount', 'reference'])
+        for when, kind, amount, reference in statement(user.pk, options['since'], options['until']):
+            writer.writerow([when.isoformat(), kind, amount, reference])
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from investments.kpis import recompute_counters
+from investments.models import PlatformCounter
+from investments.money import Money
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the platform KPI counters from the ledger tables and compares them "
+        "with the incrementally maintained values. --fix overwrites counters that differ."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Overwrite counters that differ.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            expected = recompute_counters()
+            stored = dict(PlatformCounter.objects.filter(key__in=expected).values_list('key', 'value'))
+
+            mismatches = 0
+            for key, value in expected.items():
+                current = stored.get(key, Money(0))
+                if current == value:
+                    self.stdout.write(f'{key}: {value} ok')
+                    continue
+                mismatches += 1
+                self.stdout.write(self.style.WARNING(f'{key}: stored {current}, expected {value}'))
+                if options['fix']:
+                    PlatformCounter.objects.update_or_create(key=key, defaults={'value': value})
+
+        if mismatches and not options['fix']:
+            self.stdout.write(self.style.WARNING(f'{mismatches} counters differ.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Counters match the ledger.' if not mismatches else f'Fixed {mismatches} counters.'))
@@ -0,0 +1,155 @@
+"""
+Access-checked serving of uploaded files. Django decides who may read a file; the
+front server sends the bytes when MEDIA_SENDFILE names its offload header:
+
+    x-accel-redirect  nginx; MEDIA_INTERNAL_URL is an `internal` location aliasing MEDIA_ROOT
+    x-sendfile        Apache with mod_xsendfile, lighttpd
+
+Either way the front server handles Range and conditional requests itself. With
+MEDIA_SENDFILE empty the file is streamed from Python, honoring a single byte range
+so that video can seek.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def owns_identity_document(user, path):
+    from .models import IdentityVerification
+    return IdentityVerification.objects.filter(
+        Q(document_front=path) | Q(document_back=path), user=user,
+    ).exists()
+
+
+def any_user(user, path):
+    return True
+
+
+# Who may read what, by path prefix under MEDIA_ROOT. Staff may read everything;
+# anything not listed is staff only.
+ACCESS_RULES = {
+    'identity_documents/': owns_identity_document,
+    'previews/': any_user,
+}
+
+
+def is_clean(path):
+    # Rules match on the path as given, so it mustn't be able to climb out of its prefix.
+    return bool(path) and not path.startswith('/') and posixpath.normpath(path) == path
+
+
+def can_access(user, path):
+    """
+    Returns whether the logged-in user may read the file at path (relative to
+    MEDIA_ROOT).
+    """
+    if not is_clean(path):
+        return False
+    if user.is_staff:
+        return True
+    for prefix, rule in ACCESS_RULES.items():
+        if path.startswith(prefix):
+            return rule(user, path)
+    return False
+
+
+def parse_range(header, size):
+    """
+    Returns the inclusive (first, last) byte positions of a single-range Range header,
+    or None to send the whole file (no header, a malformed one or several ranges,
+    which a server may ignore). Raises ValueError if the range is unsatisfiable.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # bytes=-N is the last N bytes.
+        if int(last) == 0:
+            raise ValueError('empty suffix range')
+        return max(0, size - int(last)), size - 1
+    first = int(first)
+    if last and int(last) < first:
+        return None
+    if first >= size:
+        raise ValueError('range starts past the end of the file')
+    return first, min(int(last), size - 1) if last else size - 1
+
+
+def read_chunks(f, length):
+    with f:
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def stream_file(request, full_path, content_type):
+    stat = os.stat(full_path)
+    last_modified = http_date(stat.st_mtime)
+    response = get_conditional_response(request, last_modified=int(stat.st_mtime))
+    if response is not None:
+        return response
+
+    byte_range = None
+    # If-Range names the version the client has part of; any other version is sent whole.
+    if request.headers.get('If-Range', last_modified) == last_modified:
+        try:
+            byte_range = parse_range(request.headers.get('Range'), stat.st_size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response.headers['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+
+    f = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(f, content_type=content_type)
+    else:
+        first, last = byte_range
+        f.seek(first)
+        response = StreamingHttpResponse(read_chunks(f, last - first + 1), status=206, content_type=content_type)
+        response.headers['Content-Range'] = f'bytes {first}-{last}/{stat.st_size}'
+        response.headers['Content-Length'] = last - first + 1
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['Last-Modified'] = last_modified
+    return response
+
+
+def send_file(request, path):
+    """
+    Returns a response sending the file at path (relative to MEDIA_ROOT), offloaded
+    to the front server if MEDIA_SENDFILE is set. Callers check access first.
+    """
+    full_path = os.path.join(settings.MEDIA_ROOT, *path.split('/'))
+    if not is_clean(path) or not os.path.isfile(full_path):
+        raise Http404('No such file')
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+    if settings.MEDIA_SENDFILE == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response.headers['X-Accel-Redirect'] = settings.MEDIA_INTERNAL_URL + quote(path)
+    elif settings.MEDIA_SENDFILE == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response.headers['X-Sendfile'] = full_path
+    elif not settings.MEDIA_SENDFILE:
+        response = stream_file(request, full_path, content_type)
+    else:
+        raise ImproperlyConfigured(
+            f"MEDIA_SENDFILE must be 'x-accel-redirect', 'x-sendfile' or empty, not {settings.MEDIA_SENDFILE!r}."
+        )
+    return response
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0008_rename_usdt_trc20_wallet_address_profile_usdt_erc20_wallet_address'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='referral_code',
+            field=models.CharField(blank=True, db_index=True, max_length=50, null=True),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:11
+
+from django.db import migrations, models
+from django.db.models import F, Sum
+
+
+def hold_open_withdrawals(apps, schema_editor):
+    """Places holds for withdrawals that were still pending or approved before holds existed."""
+    UserBalance = apps.get_model('investments', 'UserBalance')
+    WithdrawalRequest = apps.get_model('investments', 'WithdrawalRequest')
+    open_withdrawals = WithdrawalRequest.objects.filter(status__in=['pending', 'approved'])
+    for row in open_withdrawals.values('user_id').annotate(total=Sum('amount')):
+        balance, _ = UserBalance.objects.get_or_create(user_id=row['user_id'])
+        UserBalance.objects.filter(pk=balance.pk).update(held=F('held') + row['total'])
+    open_withdrawals.update(hold_status='held')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0009_customuser_referral_code_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userbalance',
+            name='held',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=15),
+        ),
+        migrations.AddField(
+            model_name='withdrawalrequest',
+            name='hold_status',
+            field=models.CharField(blank=True, choices=[('held', 'Held'), ('settled', 'Settled'), ('released', 'Released')], max_length=10),
+        ),
+        migrations.AddField(
+            model_name='withdrawalrequest',
+            name='payout_batch',
+            field=models.CharField(blank=True, db_index=True, max_length=50),
+        ),
+        migrations.RunPython(hold_open_withdrawals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:15
+
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+from django.utils import timezone
+
+
+def seed_counters(apps, schema_editor):
+    """Starts the counters from the current ledger; they are maintained incrementally from here on."""
+    PlatformCounter = apps.get_model('investments', 'PlatformCounter')
+    Transaction = apps.get_model('investments', 'Transaction')
+    UserBalance = apps.get_model('investments', 'UserBalance')
+    UserInvestment = apps.get_model('investments', 'UserInvestment')
+    WithdrawalRequest = apps.get_model('investments', 'WithdrawalRequest')
+    expected_earning = ExpressionWrapper(
+        F('amount_invested') * F('package__interest_rate') / 100,
+        output_field=DecimalField(max_digits=20, decimal_places=2),
+    )
+    totals = {
+        'assets_under_management': UserBalance.objects.aggregate(total=Sum('balance'))['total'],
+        'pending_withdrawals': WithdrawalRequest.objects.filter(hold_status='held').aggregate(total=Sum('amount'))['total'],
+        'earnings_owed': UserInvestment.objects.filter(earnings_calculated=False).aggregate(total=Sum(expected_earning))['total'],
+    }
+    today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    totals[f'deposits:{today:%Y-%m-%d}'] = Transaction.objects.filter(
+        transaction_type='deposit', transaction_date__gte=today,
+    ).aggregate(total=Sum('amount'))['total']
+    for key, value in totals.items():
+        PlatformCounter.objects.create(key=key, value=round(value or 0, 2))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0011_admin_date_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, unique=True)),
+                ('value', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
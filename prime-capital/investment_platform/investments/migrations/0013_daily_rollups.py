@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0012_platform_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('metric', models.CharField(choices=[('deposits', 'Deposits'), ('investments', 'Investments'), ('earnings', 'Earnings'), ('commissions', 'Referral commissions'), ('withdrawals', 'Completed withdrawals')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('package', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='investments.investmentpackage')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['metric', 'day'], name='investments_metric_b48232_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('package__isnull', False)), fields=('metric', 'day', 'package'), name='unique_daily_rollup_package'), models.UniqueConstraint(condition=models.Q(('package__isnull', True)), fields=('metric', 'day'), name='unique_daily_rollup')],
+            },
+        ),
+    ]
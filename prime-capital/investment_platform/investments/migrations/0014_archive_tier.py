@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0013_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTxHash',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.BinaryField(max_length=16, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedEarning',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('earning_date', models.DateTimeField(db_index=True)),
+                ('from_investment_id', models.BigIntegerField()),
+                ('package_id', models.BigIntegerField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('tx_hash', models.CharField(max_length=100)),
+                ('currency', models.CharField(max_length=10)),
+                ('status', models.CharField(max_length=20)),
+                ('transaction_type', models.CharField(choices=[('deposit', 'Deposit'), ('earning', 'Earning'), ('referral', 'Referral Commission')], max_length=20)),
+                ('transaction_date', models.DateTimeField(db_index=True)),
+                ('withdrawal_request_id', models.BigIntegerField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedWithdrawal',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('currency', models.CharField(max_length=10)),
+                ('to_address', models.CharField(blank=True, max_length=42)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('failed', 'Failed'), ('completed', 'Completed')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('processed_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('admin_notes', models.TextField(blank=True)),
+                ('hold_status', models.CharField(blank=True, max_length=10)),
+                ('payout_batch', models.CharField(blank=True, max_length=50)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0015_work_leases'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='data_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
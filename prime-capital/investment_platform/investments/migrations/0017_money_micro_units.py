@@ -0,0 +1,88 @@
+from django.db import migrations, models
+from django.db.models import BigIntegerField, F, FloatField
+from django.db.models.functions import Cast, Round
+
+import investments.money
+
+MICROS = 1_000_000
+
+# model -> [(field, has a default)]. Each field is converted from a two-place Decimal
+# to integer micro-units: a *_micros column is added and filled, the Decimal column
+# is dropped and the new column takes its name. Reversing rounds amounts back to
+# two places, so sub-cent amounts recorded since are lost.
+MONEY_FIELDS = {
+    'investmentpackage': [('min_amount', False), ('max_amount', False)],
+    'transaction': [('amount', False)],
+    'userinvestment': [('amount_invested', False)],
+    'userbalance': [('balance', True), ('held', True)],
+    'userearning': [('amount', False)],
+    'referralcommission': [('amount', False)],
+    'withdrawalrequest': [('amount', False)],
+    'platformcounter': [('value', True)],
+    'dailyrollup': [('amount', True)],
+    'archivedtransaction': [('amount', False)],
+    'archivedearning': [('amount', False)],
+    'archivedwithdrawal': [('amount', False)],
+}
+
+
+def fill_micros(model_name, fields):
+    def forwards(apps, schema_editor):
+        model = apps.get_model('investments', model_name)
+        model.objects.using(schema_editor.connection.alias).update(**{
+            f'{name}_micros': Cast(Round(F(name) * MICROS), BigIntegerField()) for name in fields
+        })
+
+    def backwards(apps, schema_editor):
+        model = apps.get_model('investments', model_name)
+        model.objects.using(schema_editor.connection.alias).update(**{
+            name: Round(Cast(F(f'{name}_micros'), FloatField()) / MICROS, 2) for name in fields
+        })
+
+    # The hint lets the router run this on the database that holds the model.
+    return migrations.RunPython(forwards, backwards, hints={'model_name': model_name})
+
+
+def default_to_zero(model_name, name):
+    # State only: reversing the RemoveField re-adds the Decimal column, which then
+    # needs a value for the existing rows until backwards() fills it.
+    return migrations.SeparateDatabaseAndState(state_operations=[
+        migrations.AlterField(
+            model_name=model_name, name=name, field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+    ])
+
+
+def convert(model_name, fields):
+    names = [name for name, _ in fields]
+    return [
+        *(
+            migrations.AddField(
+                model_name=model_name,
+                name=f'{name}_micros',
+                field=investments.money.MoneyField(default=0),
+                preserve_default=has_default,
+            )
+            for name, has_default in fields
+        ),
+        fill_micros(model_name, names),
+        *(default_to_zero(model_name, name) for name, has_default in fields if not has_default),
+        *(migrations.RemoveField(model_name=model_name, name=name) for name in names),
+        *(
+            migrations.RenameField(model_name=model_name, old_name=f'{name}_micros', new_name=name)
+            for name in names
+        ),
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0016_customuser_data_version'),
+    ]
+
+    operations = [
+        operation
+        for model_name, fields in MONEY_FIELDS.items()
+        for operation in convert(model_name, fields)
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+from investments import search
+
+
+def install(apps, schema_editor):
+    search.install(schema_editor.connection.alias)
+
+
+def uninstall(apps, schema_editor):
+    search.uninstall(schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0017_money_micro_units'),
+    ]
+
+    operations = [
+        # Creates the FTS5 indexes and triggers for the admin search on SQLite.
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def register_existing_wallets(apps, schema_editor):
+    """Registers profile wallets, then withdrawal addresses; the first user to use an address keeps it."""
+    Profile = apps.get_model('investments', 'Profile')
+    WithdrawalRequest = apps.get_model('investments', 'WithdrawalRequest')
+    UserWallet = apps.get_model('investments', 'UserWallet')
+    PlatformCounter = apps.get_model('investments', 'PlatformCounter')
+    owners = {}
+    sources = [
+        Profile.objects.order_by('pk').values_list('usdt_erc20_wallet_address', 'user_id'),
+        WithdrawalRequest.objects.order_by('pk').values_list('to_address', 'user_id'),
+    ]
+    for rows in sources:
+        for address, user_id in rows.iterator():
+            owners.setdefault((address or '').strip().lower(), user_id)
+    owners.pop('', None)
+    UserWallet.objects.bulk_create(
+        [UserWallet(address=address, user_id=user_id) for address, user_id in owners.items()], batch_size=1000
+    )
+    PlatformCounter.objects.update_or_create(key='wallet_registry_version', defaults={'value': 1})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0018_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserWallet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address', models.CharField(max_length=42, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wallets', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(register_existing_wallets, migrations.RunPython.noop),
+    ]
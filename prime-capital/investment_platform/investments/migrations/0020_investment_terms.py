@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+from django.db import migrations, models
+
+import investments.money
+
+BATCH_SIZE = 1000
+
+
+def fill_terms(apps, schema_editor):
+    # Existing investments get the terms of their package as it is now, which is what
+    # they would have been credited with.
+    UserInvestment = apps.get_model('investments', 'UserInvestment')
+    investments = UserInvestment.objects.using(schema_editor.connection.alias).select_related('package')
+    batch = []
+    for investment in investments.iterator(chunk_size=BATCH_SIZE):
+        investment.earning = investment.amount_invested * (investment.package.interest_rate / 100)
+        investment.matures_at = investment.investment_date + timedelta(hours=investment.package.duration)
+        batch.append(investment)
+        if len(batch) == BATCH_SIZE:
+            UserInvestment.objects.using(schema_editor.connection.alias).bulk_update(batch, ['earning', 'matures_at'])
+            batch = []
+    UserInvestment.objects.using(schema_editor.connection.alias).bulk_update(batch, ['earning', 'matures_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0019_user_wallets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userinvestment',
+            name='earning',
+            field=investments.money.MoneyField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userinvestment',
+            name='matures_at',
+            field=models.DateTimeField(null=True),
+        ),
+        # The hint lets the router run this on the database that holds the model.
+        migrations.RunPython(fill_terms, migrations.RunPython.noop, hints={'model_name': 'userinvestment'}),
+        migrations.AlterField(
+            model_name='userinvestment',
+            name='matures_at',
+            field=models.DateTimeField(),
+        ),
+        migrations.AddIndex(
+            model_name='userinvestment',
+            index=models.Index(
+                fields=['user', 'matures_at'], condition=models.Q(earnings_calculated=False),
+                name='investment_user_uncredited',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='userinvestment',
+            index=models.Index(
+                fields=['matures_at'], condition=models.Q(earnings_calculated=False), name='investment_uncredited',
+            ),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:03
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def split_wallet_sources(apps, schema_editor):
+    # 0019 gave an address to the first user to use it, withdrawal destinations
+    # included. Only profile wallets own their address: the rest become destinations,
+    # and profile wallets they displaced are registered (the earliest profile wins).
+    db = schema_editor.connection.alias
+    Profile = apps.get_model('investments', 'Profile')
+    UserWallet = apps.get_model('investments', 'UserWallet')
+    PlatformCounter = apps.get_model('investments', 'PlatformCounter')
+    profiles = [
+        (user_id, (address or '').strip().lower())
+        for user_id, address in Profile.objects.using(db).order_by('pk').values_list('user_id', 'usdt_erc20_wallet_address')
+    ]
+    profiles = [(user_id, address) for user_id, address in profiles if address]
+    profile_wallets = set(profiles)
+    demoted = [
+        pk for pk, user_id, address in UserWallet.objects.using(db).values_list('pk', 'user_id', 'address').iterator()
+        if (user_id, address) not in profile_wallets
+    ]
+    for start in range(0, len(demoted), 500):
+        UserWallet.objects.using(db).filter(pk__in=demoted[start:start + 500]).update(source='withdrawal')
+    owned = set(UserWallet.objects.using(db).filter(source='profile').values_list('address', flat=True))
+    for user_id, address in profiles:
+        if address in owned:
+            continue
+        UserWallet.objects.using(db).update_or_create(user_id=user_id, address=address, defaults={'source': 'profile'})
+        owned.add(address)
+    if not PlatformCounter.objects.using(db).filter(key='wallet_registry_version').update(value=F('value') + 1):
+        PlatformCounter.objects.using(db).create(key='wallet_registry_version', value=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0022_withdrawal_risk'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userwallet',
+            name='source',
+            field=models.CharField(choices=[('profile', 'Profile wallet'), ('withdrawal', 'Withdrawal destination')], default='profile', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='userwallet',
+            name='address',
+            field=models.CharField(db_index=True, max_length=42),
+        ),
+        migrations.AddConstraint(
+            model_name='userwallet',
+            constraint=models.UniqueConstraint(fields=('user', 'address'), name='wallet_user_address'),
+        ),
+        migrations.RunPython(split_wallet_sources, migrations.RunPython.noop, hints={'model_name': 'userwallet'}),
+        migrations.AddConstraint(
+            model_name='userwallet',
+            constraint=models.UniqueConstraint(condition=models.Q(('source', 'profile')), fields=('address',), name='wallet_owner'),
+        ),
+    ]
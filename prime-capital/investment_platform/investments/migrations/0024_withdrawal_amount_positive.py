@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:31
+
+import django.core.validators
+import investments.money
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0023_wallet_sources'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='withdrawalrequest',
+            name='amount',
+            field=investments.money.MoneyField(validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+    ]
@@ -1,18 +1,40 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
 from django.conf import settings
+from django.utils import timezone
+import hashlib
 import uuid
 from django.contrib.auth.models import AbstractUser
+from django.core.validators import MinValueValidator
+
+from .money import Money, MoneyField
+
+
+def generate_referral_code():
+    return uuid.uuid4().hex[:8]
 
 
 class CustomUser(AbstractUser):
     # Existing fields
-    referral_code = models.CharField(max_length=50, blank=True, null=True)
+    referral_code = models.CharField(max_length=50, blank=True, null=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     email_verified = models.BooleanField(default=False, null=True, blank=True)
+    # Bumped whenever the user's balance, investments or withdrawals change; the
+    # account API uses it as its ETag. Only bump_data_version writes it.
+    data_version = models.PositiveBigIntegerField(default=0)
 
     def save(self, *args, **kwargs):
         if not self.referral_code:
-            self.referral_code = uuid.uuid4().hex[:8]  # Generate a unique referral code
+            self.referral_code = generate_referral_code()  # Generate a unique referral code
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            # The in-memory data_version may be stale, and writing it back would roll the
+            # version back. Like Django, leave deferred fields alone.
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname != 'data_version' and field.attname not in deferred
+            ]
         super().save(*args, **kwargs)
 
     def is_identity_verified(self):
@@ -30,8 +52,8 @@ class CustomUser(AbstractUser):
 class InvestmentPackage(models.Model):
     name = models.CharField(max_length=100)
     interest_rate = models.DecimalField(max_digits=5, decimal_places=2)  # e.g., 15% as 15.00
-    min_amount = models.DecimalField(max_digits=10, decimal_places=2)
-    max_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    min_amount = MoneyField()
+    max_amount = MoneyField()
     duration = models.IntegerField(help_text="Duration in hours")  # e.g., 12, 24, 48, 72
     currency = models.CharField(max_length=10, default='USDT')  # USDT as the only payment method
 
@@ -48,14 +70,27 @@ class WithdrawalRequest(models.Model):
         ('completed', 'Completed')
     ]
 
+    HOLD_STATUS_CHOICES = [
+        ('held', 'Held'),
+        ('settled', 'Settled'),
+        ('released', 'Released'),
+    ]
+
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
-    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    amount = MoneyField(validators=[MinValueValidator(1)])
     currency = models.CharField(max_length=10, default='USDT')
     to_address = models.CharField(max_length=42, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     processed_at = models.DateTimeField(null=True, blank=True)
     admin_notes = models.TextField(blank=True)
+    # Balance changes go through investments.withdrawals, which tracks the hold here.
+    hold_status = models.CharField(max_length=10, choices=HOLD_STATUS_CHOICES, blank=True)
+    payout_batch = models.CharField(max_length=50, blank=True, db_index=True)
+    # Set for pending requests by investments.risk.
+    risk_score = models.FloatField(null=True, blank=True, db_index=True)
+    risk_factors = models.CharField(max_length=200, blank=True)
+    risk_scored_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"Withdrawal request by {self.user.username}"
@@ -63,17 +98,13 @@ class WithdrawalRequest(models.Model):
     def save(self, *args, **kwargs):
         if not self.to_address:
             user_profile, created = Profile.objects.get_or_create(user=self.user)
-            self.to_address = user_profile.usdt_trc20_wallet_address
-
-        if self.status == 'completed':
-            user_balance, created = UserBalance.objects.get_or_create(user=self.user)
-            if user_balance.balance < self.amount:
-                raise ValueError("Withdrawal amount exceeds available balance")
+            self.to_address = user_profile.usdt_erc20_wallet_address
 
-        super().save(*args, **kwargs)
-
-        if self.status == 'completed':
-            update_user_balance(self.user, -self.amount)
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                register_wallet(self.user_id, self.to_address, UserWallet.WITHDRAWAL)
 
 
 class Transaction(models.Model):
@@ -84,12 +115,12 @@ class Transaction(models.Model):
     ]
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
-    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    amount = MoneyField()
     tx_hash = models.CharField(max_length=100, unique=True)
     currency = models.CharField(max_length=10, default='USDT')  # USDT as the only payment method
     status = models.CharField(max_length=20, default='pending')
     transaction_type = models.CharField(max_length=20, choices=TRANSACTION_TYPES)
-    transaction_date = models.DateTimeField(auto_now_add=True)
+    transaction_date = models.DateTimeField(auto_now_add=True, db_index=True)
 
     withdrawal_request = models.ForeignKey(WithdrawalRequest, on_delete=models.SET_NULL, null=True, blank=True)
 
@@ -97,28 +128,76 @@ class Transaction(models.Model):
         return f"{self.transaction_type} - {self.user.username}"
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Update user balance after saving the transaction
-        if self.transaction_type == 'deposit':
-            update_user_balance(self.user, self.amount)
-        elif self.transaction_type == 'withdrawal':
-            update_user_balance(self.user, -self.amount)  # Subtract withdrawal amount
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # Update user balance after creating the transaction
+            if adding and self.transaction_type == 'deposit':
+                update_user_balance(self.user, self.amount)
+                bump_counter(deposits_counter_key(self.transaction_date), self.amount)
+                bump_rollup('deposits', self.transaction_date, self.amount)
+                record_event(
+                    'deposit', self.user_id, transaction=self.pk, tx_hash=self.tx_hash, amount=self.amount,
+                    currency=self.currency, status=self.status,
+                )
+            elif adding and self.transaction_type == 'withdrawal':
+                update_user_balance(self.user, -self.amount)  # Subtract withdrawal amount
 
 
 class UserInvestment(models.Model):
     user = models.ForeignKey('investments.CustomUser', on_delete=models.CASCADE)
     package = models.ForeignKey(InvestmentPackage, on_delete=models.CASCADE)
-    amount_invested = models.DecimalField(max_digits=10, decimal_places=2)
-    investment_date = models.DateTimeField(auto_now_add=True)
+    amount_invested = MoneyField()
+    investment_date = models.DateTimeField(auto_now_add=True, db_index=True)
+    # The terms are fixed when the investment is made: the earning paid at maturity
+    # and when that is. From then on the earning counts towards the user's balance
+    # (see investments.earnings), whether or not it has been credited yet.
+    earning = MoneyField(default=0)
+    matures_at = models.DateTimeField()
+    # Set once the earning has been credited as a UserEarning.
     earnings_calculated = models.BooleanField(default=False)
 
+    class Meta:
+        # Partial indexes over the uncredited investments only.
+        indexes = [
+            # A user's matured earnings, read with every balance.
+            models.Index(
+                fields=['user', 'matures_at'], condition=models.Q(earnings_calculated=False),
+                name='investment_user_uncredited',
+            ),
+            # All matured earnings, for the settlement pass.
+            models.Index(
+                fields=['matures_at'], condition=models.Q(earnings_calculated=False), name='investment_uncredited',
+            ),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.package.name}"
 
+    def expected_earning(self):
+        # One rounding to the micro-unit, so the counters and reconciliation agree.
+        return self.amount_invested * (self.package.interest_rate / 100)
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if adding:
+            self.earning = self.earning or self.expected_earning()
+            if self.matures_at is None:
+                self.matures_at = timezone.now() + timezone.timedelta(hours=self.package.duration)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                bump_rollup('investments', self.investment_date, self.amount_invested, self.package_id)
+                bump_data_version(self.user_id)
+            if adding and not self.earnings_calculated:
+                bump_counter(EARNINGS_OWED, self.earning)
+
 
 class UserBalance(models.Model):
     user = models.OneToOneField('investments.CustomUser', on_delete=models.CASCADE)
-    balance = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    balance = MoneyField(default=0)
+    # Reserved by pending and approved withdrawals; only balance - held can be withdrawn.
+    held = MoneyField(default=0)
 
     def __str__(self):
         return f"{self.user.username}'s Balance"
@@ -126,37 +205,50 @@ class UserBalance(models.Model):
 
 class UserEarning(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
-    amount = models.DecimalField(max_digits=10, decimal_places=2)
-    earning_date = models.DateTimeField(auto_now_add=True)
+    amount = MoneyField()
+    earning_date = models.DateTimeField(auto_now_add=True, db_index=True)
     from_investment = models.ForeignKey('UserInvestment', on_delete=models.CASCADE)
 
     def __str__(self):
         return f"Earning for {self.user.username}"
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Update user balance after saving the earning
-        update_user_balance(self.user, self.amount)
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # Update user balance after creating the earning
+            if adding:
+                update_user_balance(self.user, self.amount)
+                bump_counter(EARNINGS_OWED, -self.amount)
+                bump_rollup('earnings', self.earning_date, self.amount, self.from_investment.package_id)
+                record_event(
+                    'earning', self.user_id, earning=self.pk, investment=self.from_investment_id, amount=self.amount,
+                )
 
 
 class ReferralCommission(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
-    amount = models.DecimalField(max_digits=10, decimal_places=2)
-    created_at = models.DateTimeField(auto_now_add=True)
+    amount = MoneyField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     def __str__(self):
         return f"Commission for {self.user.username}"
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Update user balance after saving the referral commission
-        update_user_balance(self.user, self.amount)
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # Update user balance after creating the referral commission
+            if adding:
+                update_user_balance(self.user, self.amount)
+                bump_rollup('commissions', self.created_at, self.amount)
+                record_event('commission', self.user_id, commission=self.pk, amount=self.amount)
 
 
 class Referral(models.Model):
     referred_by = models.ForeignKey('investments.CustomUser', related_name='referrals_made', on_delete=models.CASCADE)
     referred_user = models.ForeignKey('investments.CustomUser', related_name='referred_by', on_delete=models.CASCADE)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     def __str__(self):
         return f"{self.referred_user.username} referred by {self.referred_by.username}"
@@ -169,6 +261,96 @@ class Profile(models.Model):
     def __str__(self):
         return self.user.username
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            register_wallet(self.user_id, self.usdt_erc20_wallet_address)
+
+
+# Bumped on every UserWallet change; investments.wallets reloads its map when it moves.
+WALLET_REGISTRY_VERSION = 'wallet_registry_version'
+
+
+def normalize_address(address):
+    """
+    Etherscan reports addresses in lowercase, so they're stored and compared that way.
+    """
+    return (address or '').strip().lower()
+
+
+class UserWallet(models.Model):
+    """
+    An address a user has used. Deposits are attributed by the profile wallets: a user
+    can have several, and an address is the profile wallet of at most one user.
+    Withdrawal destinations are recorded per user but own nothing, since anyone can
+    send a withdrawal to any address.
+    """
+    PROFILE = 'profile'
+    WITHDRAWAL = 'withdrawal'
+    SOURCE_CHOICES = [
+        (PROFILE, 'Profile wallet'),
+        (WITHDRAWAL, 'Withdrawal destination'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='wallets')
+    address = models.CharField(max_length=42, db_index=True)
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default=PROFILE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'address'], name='wallet_user_address'),
+            models.UniqueConstraint(fields=['address'], condition=models.Q(source='profile'), name='wallet_owner'),
+        ]
+
+    def __str__(self):
+        return self.address
+
+    def save(self, *args, **kwargs):
+        self.address = normalize_address(self.address)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            bump_counter(WALLET_REGISTRY_VERSION, 1)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            bump_counter(WALLET_REGISTRY_VERSION, 1)
+            return super().delete(*args, **kwargs)
+
+
+def register_wallet(user_id, address, source=UserWallet.PROFILE):
+    """
+    Adds address to the user's wallets unless it's blank or already there; a profile
+    wallet is only added if no other user has it as theirs. Returns the id of the user
+    whose profile wallet the address is (None if it's nobody's or blank).
+    """
+    address = normalize_address(address)
+    if not address:
+        return None
+    if source == UserWallet.PROFILE:
+        owner = wallet_owner(address)
+        if owner is not None:
+            return owner
+    try:
+        with transaction.atomic():
+            wallet, created = UserWallet.objects.get_or_create(
+                user_id=user_id, address=address, defaults={'source': source},
+            )
+            if source == UserWallet.PROFILE and wallet.source != source:
+                # A destination the user has withdrawn to before becomes theirs.
+                wallet.source = source
+                wallet.save(update_fields=['source'])
+    except IntegrityError:
+        # Registered concurrently.
+        pass
+    return wallet_owner(address)
+
+
+def wallet_owner(address):
+    return UserWallet.objects.filter(
+        address=normalize_address(address), source=UserWallet.PROFILE,
+    ).values_list('user_id', flat=True).first()
+
 
 class IdentityVerification(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -187,12 +369,124 @@ class IdentityVerification(models.Model):
 
 
 def update_user_balance(user, amount):
-    try:
-        balance = UserBalance.objects.get(user=user)
-        balance.balance += amount
-        balance.save()
-    except UserBalance.DoesNotExist:
-        UserBalance.objects.create(user=user, balance=amount)
+    with transaction.atomic():
+        updated = UserBalance.objects.filter(user=user).update(balance=F('balance') + amount)
+        if not updated:
+            UserBalance.objects.create(user=user, balance=amount)
+        bump_counter(ASSETS_UNDER_MANAGEMENT, amount)
+        bump_data_version(user.pk)
+
+
+def bump_data_version(*user_ids):
+    """
+    Marks the users' financial data as changed. Call it inside the transaction that
+    makes the change.
+    """
+    CustomUser.objects.filter(pk__in=user_ids).update(data_version=F('data_version') + 1)
+
+
+# Platform-wide KPI counters, updated in the same transaction as the ledger change.
+ASSETS_UNDER_MANAGEMENT = 'assets_under_management'
+PENDING_WITHDRAWALS = 'pending_withdrawals'
+EARNINGS_OWED = 'earnings_owed'
+
+
+def deposits_counter_key(date):
+    return f'deposits:{timezone.localdate(date):%Y-%m-%d}'
+
+
+class PlatformCounter(models.Model):
+    key = models.CharField(max_length=50, unique=True)
+    value = MoneyField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.key
+
+
+def bump_counter(key, delta):
+    """
+    Adds delta to a platform counter. Call it inside the transaction that makes the
+    change being counted.
+    """
+    if not delta:
+        return
+    updated = PlatformCounter.objects.filter(key=key).update(value=F('value') + delta, updated_at=timezone.now())
+    if not updated:
+        counter, created = PlatformCounter.objects.get_or_create(key=key, defaults={'value': delta})
+        if not created:
+            PlatformCounter.objects.filter(key=key).update(value=F('value') + delta, updated_at=timezone.now())
+
+
+class DailyRollup(models.Model):
+    """
+    Per-day (and, where it applies, per-package) totals of ledger events for charts.
+    Maintained by bump_rollup as events are saved; `manage.py backfill_rollups`
+    rebuilds them from the ledger.
+    """
+    METRIC_CHOICES = [
+        ('deposits', 'Deposits'),
+        ('investments', 'Investments'),
+        ('earnings', 'Earnings'),
+        ('commissions', 'Referral commissions'),
+        ('withdrawals', 'Completed withdrawals'),
+    ]
+
+    day = models.DateField()
+    metric = models.CharField(max_length=20, choices=METRIC_CHOICES)
+    package = models.ForeignKey(InvestmentPackage, on_delete=models.CASCADE, null=True, blank=True)
+    amount = MoneyField(default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # NULLs are distinct in unique indexes, so rows without a package need their own.
+            models.UniqueConstraint(
+                fields=['metric', 'day', 'package'], condition=models.Q(package__isnull=False),
+                name='unique_daily_rollup_package',
+            ),
+            models.UniqueConstraint(
+                fields=['metric', 'day'], condition=models.Q(package__isnull=True),
+                name='unique_daily_rollup',
+            ),
+        ]
+        indexes = [models.Index(fields=['metric', 'day'])]
+
+    def __str__(self):
+        return f"{self.metric} on {self.day}"
+
+
+def bump_rollup(metric, date, amount, package_id=None):
+    """
+    Adds one event of the given amount to its day's rollup row. Call it inside the
+    transaction that records the event.
+    """
+    day = timezone.localdate(date)
+    rows = DailyRollup.objects.filter(metric=metric, day=day, package_id=package_id)
+    updated = rows.update(amount=F('amount') + amount, count=F('count') + 1)
+    if not updated:
+        rollup, created = DailyRollup.objects.get_or_create(
+            metric=metric, day=day, package_id=package_id, defaults={'amount': amount, 'count': 1},
+        )
+        if not created:
+            rows.update(amount=F('amount') + amount, count=F('count') + 1)
+
+
+class WorkLease(models.Model):
+    """
+    An expiring claim on one shard of a background job, so overlapping workers split
+    the work instead of repeating it. See investments.leases.
+    """
+    job = models.CharField(max_length=50)
+    shard = models.PositiveIntegerField()
+    owner = models.CharField(max_length=100, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['job', 'shard'], name='unique_work_lease')]
+
+    def __str__(self):
+        return f"{self.job}/{self.shard}"
 
 
 class ProcessedTransaction(models.Model):
@@ -201,3 +495,112 @@ class ProcessedTransaction(models.Model):
 
     def __str__(self):
         return self.tx_hash
+
+
+# Change-data outbox. Every balance-affecting change records an OutboxEvent in its
+# own transaction, and `manage.py relay_outbox` forwards the events to the sinks in
+# OUTBOX_SINKS (see investments.outbox). An event's id is its offset.
+
+class OutboxEvent(models.Model):
+    event = models.CharField(max_length=30)
+    user_id = models.BigIntegerField()
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.pk}: {self.event}"
+
+
+class OutboxCursor(models.Model):
+    """
+    The offset of the last event a sink has taken.
+    """
+    sink = models.CharField(max_length=50, unique=True)
+    offset = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.sink} at {self.offset}"
+
+
+def record_event(event, user_id, **payload):
+    """
+    Adds an event to the outbox. Call it inside the transaction that makes the change.
+    Amounts are recorded as decimal strings.
+    """
+    payload = {key: value.decimal if isinstance(value, Money) else value for key, value in payload.items()}
+    OutboxEvent.objects.create(event=event, user_id=user_id, payload=payload)
+
+
+# Archive tier. Ledger rows older than ARCHIVE_AFTER_DAYS are moved here by
+# `manage.py archive_ledger`; investments.routers.ArchiveRouter keeps these models
+# on the 'archive' database. Archived rows keep their original primary keys, and
+# user ids aren't enforced by a foreign key constraint since users live elsewhere.
+
+class ArchivedTransaction(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+',
+    )
+    amount = MoneyField()
+    tx_hash = models.CharField(max_length=100)
+    currency = models.CharField(max_length=10)
+    status = models.CharField(max_length=20)
+    transaction_type = models.CharField(max_length=20, choices=Transaction.TRANSACTION_TYPES)
+    transaction_date = models.DateTimeField(db_index=True)
+    withdrawal_request_id = models.BigIntegerField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.transaction_type} - {self.tx_hash}"
+
+
+class ArchivedEarning(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+',
+    )
+    amount = MoneyField()
+    earning_date = models.DateTimeField(db_index=True)
+    from_investment_id = models.BigIntegerField()
+    # Denormalized so rollups can be rebuilt without joining across databases.
+    package_id = models.BigIntegerField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Earning {self.pk}"
+
+
+class ArchivedWithdrawal(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+',
+    )
+    amount = MoneyField()
+    currency = models.CharField(max_length=10)
+    to_address = models.CharField(max_length=42, blank=True)
+    status = models.CharField(max_length=20, choices=WithdrawalRequest.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    processed_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    admin_notes = models.TextField(blank=True)
+    hold_status = models.CharField(max_length=10, blank=True)
+    payout_batch = models.CharField(max_length=50, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Withdrawal {self.pk}"
+
+
+def tx_digest(tx_hash):
+    return hashlib.blake2b(tx_hash.encode(), digest_size=16).digest()
+
+
+class ArchivedTxHash(models.Model):
+    """
+    Digests of every archived transaction and processed-transaction hash, so deposit
+    dedupe stays correct after the rows leave the hot tables. 16 bytes per hash.
+    """
+    digest = models.BinaryField(max_length=16, unique=True)
+
+    def __str__(self):
+        return self.digest.hex()
@@ -0,0 +1,135 @@
+"""
+Money as integer micro-units (millionths of a USDT, the token's own precision).
+
+Money is an int subclass, so amounts go to the database, into F() expressions,
+aggregates and NumPy arrays as plain 64-bit integers and sums are exact. It converts
+to and from Decimal at the edges (forms, API responses, display).
+"""
+from decimal import ROUND_HALF_EVEN, Decimal
+
+from django import forms
+from django.core import checks
+from django.db import models
+
+MICROS = 1_000_000
+DECIMAL_PLACES = 6
+
+
+class Money(int):
+    """
+    An amount in micro-units. Adding or subtracting Money (or ints) gives Money;
+    multiplying or dividing by a Decimal, float or int rounds half-to-even to the
+    nearest micro-unit.
+    """
+
+    @classmethod
+    def from_decimal(cls, value):
+        """
+        Converts an amount in whole units (Decimal, str, int or float) to Money.
+        """
+        units = value if isinstance(value, Decimal) else Decimal(str(value))
+        return cls((units * MICROS).to_integral_value(ROUND_HALF_EVEN))
+
+    @property
+    def decimal(self):
+        return Decimal(int(self)).scaleb(-DECIMAL_PLACES)
+
+    def __str__(self):
+        # Whole units with at least two decimal places and no trailing zeros beyond.
+        text = f'{self.decimal:.{DECIMAL_PLACES}f}'
+        whole, fraction = text.split('.')
+        return f"{whole}.{fraction.rstrip('0').ljust(2, '0')}"
+
+    def __repr__(self):
+        return f'Money({self})'
+
+    def __format__(self, spec):
+        return format(self.decimal, spec) if spec else str(self)
+
+    def __add__(self, other):
+        result = int.__add__(self, other)
+        return result if result is NotImplemented else Money(result)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        result = int.__sub__(self, other)
+        return result if result is NotImplemented else Money(result)
+
+    def __rsub__(self, other):
+        result = int.__rsub__(self, other)
+        return result if result is NotImplemented else Money(result)
+
+    def __neg__(self):
+        return Money(-int(self))
+
+    def __abs__(self):
+        return Money(abs(int(self)))
+
+    def __mul__(self, other):
+        if isinstance(other, int) and not isinstance(other, bool):
+            return Money(int(self) * other)
+        if isinstance(other, (Decimal, float)):
+            return Money((Decimal(int(self)) * Decimal(str(other))).to_integral_value(ROUND_HALF_EVEN))
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if isinstance(other, (int, Decimal, float)) and not isinstance(other, (bool, Money)):
+            return Money((Decimal(int(self)) / Decimal(str(other))).to_integral_value(ROUND_HALF_EVEN))
+        return int.__truediv__(self, other)
+
+
+class MoneyFormField(forms.DecimalField):
+    """
+    Takes an amount in whole units and cleans it to Money.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('decimal_places', DECIMAL_PLACES)
+        kwargs.setdefault('max_digits', 19)
+        super().__init__(**kwargs)
+
+    def prepare_value(self, value):
+        return value.decimal if isinstance(value, Money) else value
+
+    def clean(self, value):
+        # Validate as a Decimal (places, digits, bounds), then convert.
+        value = super().clean(value)
+        return None if value is None else Money.from_decimal(value)
+
+
+class MoneyField(models.BigIntegerField):
+    """
+    Stores Money as a 64-bit integer number of micro-units.
+    """
+    description = "Amount in integer micro-units"
+
+    def check(self, **kwargs):
+        return [*super().check(**kwargs), *self._check_default()]
+
+    def _check_default(self):
+        if self.has_default() and isinstance(self.default, (Decimal, float)):
+            return [checks.Error('MoneyField defaults must be ints or Money (micro-units).', obj=self)]
+        return []
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else Money(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, Money):
+            return value
+        if isinstance(value, int):
+            return Money(value)
+        # Anything else (forms, fixtures, strings) is an amount in whole units.
+        return Money.from_decimal(value)
+
+    def get_prep_value(self, value):
+        # Skip IntegerField.get_prep_value, which would truncate whole-unit Decimals.
+        value = models.Field.get_prep_value(self, value)
+        return None if value is None else int(self.to_python(value))
+
+    def formfield(self, **kwargs):
+        # Skip BigIntegerField.formfield too: its range bounds are in micro-units.
+        return models.Field.formfield(self, **{'form_class': MoneyFormField, **kwargs})
@@ -0,0 +1,201 @@
+"""
+Relays outbox events (investments.models.OutboxEvent) to downstream sinks.
+
+Each sink in OUTBOX_SINKS is sent the events after its position, in offset order
+and in batches read by primary key range. Events every sink has taken are pruned,
+so the table stays small. A sink's target is one of:
+
+    a directory       rotating JSONL files, one event per line
+    tcp://host:port   batches of JSON lines, each acknowledged by the receiver
+    http(s)://...     batches POSTed as a JSON array, acknowledged in the response
+
+Every event carries its offset. The JSONL sink reads its position back from its
+newest file, so after a crash it neither repeats nor skips an event. The socket and
+HTTP sinks resend anything that wasn't acknowledged; receivers drop offsets they
+have already seen, as `manage.py outbox_standin` does, so each offset is taken
+exactly once.
+
+Offsets are assigned when an event is inserted. SQLite serializes writers, so events
+commit in offset order and the relay never moves past an offset that has yet to
+commit.
+"""
+import json
+import os
+import re
+import socket
+import urllib.request
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import OutboxCursor, OutboxEvent
+
+TIMEOUT = 30
+
+FILE_RE = re.compile(r'^outbox-(\d{20})\.jsonl$')
+
+# Enough to hold the last few lines of a file.
+TAIL_BYTES = 64 * 1024
+
+
+class OutboxError(Exception):
+    pass
+
+
+def serialize(event):
+    return {
+        'offset': event.pk,
+        'event': event.event,
+        'user_id': event.user_id,
+        'created_at': event.created_at,
+        'data': event.payload,
+    }
+
+
+def encode(events):
+    return b''.join(json.dumps(event, cls=DjangoJSONEncoder).encode() + b'\n' for event in events)
+
+
+class JsonlSink:
+    """
+    Appends events to JSONL files in a directory. A new file, named after its first
+    offset, is started once the newest one reaches max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes=None):
+        self.directory = directory
+        self.max_bytes = max_bytes or settings.OUTBOX_FILE_BYTES
+
+    def files(self):
+        return sorted(name for name in os.listdir(self.directory) if FILE_RE.match(name))
+
+    def position(self, stored):
+        """
+        Returns the offset of the last event in the newest file, dropping a partly
+        written last line first. The files are the record of what this sink has taken;
+        the stored cursor is only used when there are none.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        files = self.files()
+        if not files:
+            return stored
+        with open(os.path.join(self.directory, files[-1]), 'rb+') as f:
+            size = f.seek(0, os.SEEK_END)
+            start = f.seek(max(0, size - TAIL_BYTES))
+            tail = f.read()
+            end = tail.rfind(b'\n') + 1
+            if end < len(tail):
+                f.truncate(start + end)
+        lines = tail[:end].splitlines()
+        if not lines:
+            # Created, but nothing written to it yet.
+            return int(FILE_RE.match(files[-1]).group(1)) - 1
+        return json.loads(lines[-1])['offset']
+
+    def write(self, events):
+        files = self.files()
+        path = files and os.path.join(self.directory, files[-1])
+        if not path or os.path.getsize(path) >= self.max_bytes:
+            path = os.path.join(self.directory, f"outbox-{events[0]['offset']:020d}.jsonl")
+        with open(path, 'ab') as f:
+            f.write(encode(events))
+            f.flush()
+            os.fsync(f.fileno())
+        return events[-1]['offset']
+
+
+class SocketSink:
+    """
+    Sends each batch over a new TCP connection as JSON lines ended by a blank line.
+    The receiver answers with a line {"offset": N}, the highest offset it has.
+    """
+
+    def __init__(self, target):
+        address = urlsplit(target)
+        self.address = (address.hostname, address.port)
+
+    def position(self, stored):
+        return stored
+
+    def write(self, events):
+        with socket.create_connection(self.address, timeout=TIMEOUT) as conn:
+            conn.sendall(encode(events) + b'\n')
+            with conn.makefile('rb') as reader:
+                ack = reader.readline()
+        if not ack:
+            raise OutboxError(f'{self.address[0]}:{self.address[1]} closed the connection without acknowledging')
+        return json.loads(ack)['offset']
+
+
+class HttpSink:
+    """
+    POSTs each batch as a JSON array. The receiver answers with {"offset": N}, the
+    highest offset it has.
+    """
+
+    def __init__(self, url):
+        self.url = url
+
+    def position(self, stored):
+        return stored
+
+    def write(self, events):
+        request = urllib.request.Request(
+            self.url, data=json.dumps(events, cls=DjangoJSONEncoder).encode(),
+            headers={'Content-Type': 'application/json'},
+        )
+        with urllib.request.urlopen(request, timeout=TIMEOUT) as response:
+            return json.load(response)['offset']
+
+
+def sink_for(target):
+    if target.startswith('tcp://'):
+        return SocketSink(target)
+    if target.startswith(('http://', 'https://')):
+        return HttpSink(target)
+    return JsonlSink(target)
+
+
+def relay(name, sink, batch_size=500, keep_alive=None):
+    """
+    Sends the events after the sink's position to it in batches until it has them
+    all, recording its position under name after each batch. keep_alive is called
+    between batches and stops the run when it returns False. Returns the number of
+    events the sink took.
+    """
+    cursor, _ = OutboxCursor.objects.get_or_create(sink=name)
+    position = sink.position(cursor.offset)
+    relayed = 0
+    while True:
+        batch = list(OutboxEvent.objects.filter(pk__gt=position).order_by('pk')[:batch_size])
+        if not batch:
+            break
+        acknowledged = sink.write([serialize(event) for event in batch])
+        if acknowledged <= position:
+            raise OutboxError(f'{name} acknowledged none of offsets {batch[0].pk}-{batch[-1].pk}')
+        relayed += sum(event.pk <= acknowledged for event in batch)
+        position = acknowledged
+        OutboxCursor.objects.filter(sink=name).update(offset=position)
+        if keep_alive is not None and not keep_alive():
+            break
+    return relayed
+
+
+def prune(names, batch_size=10000):
+    """
+    Deletes the events that every sink in names has taken, except the newest one:
+    SQLite would hand its offset out again if it were deleted. Returns the number of
+    events deleted.
+    """
+    offsets = list(OutboxCursor.objects.filter(sink__in=names).values_list('offset', flat=True))
+    if len(offsets) < len(names):
+        # A sink that has never run has taken nothing.
+        return 0
+    below = min(offsets)
+    deleted = 0
+    while True:
+        ids = list(OutboxEvent.objects.filter(pk__lt=below).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += OutboxEvent.objects.filter(pk__gte=ids[0], pk__lte=ids[-1]).delete()[0]
@@ -0,0 +1,105 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import render
+from django.template.loader import get_template, render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+# url name -> template for the marketing pages that don't depend on the request.
+PUBLIC_PAGES = {
+    'index': 'index.html',
+    'investors': 'investors.html',
+    'leaders': 'Leaders.html',
+    'support': 'support.html',
+    'customer': 'customer.html',
+    'market': 'market.html',
+}
+
+# Public pages that show the logged-in user. They're cached for anonymous visitors
+# only (see serve_public_page's anonymous_only), and never pre-rendered: the front
+# web server would serve the anonymous copy to everyone.
+USER_PAGES = {'customer'}
+
+_version = None
+
+
+def _template_stats():
+    """
+    Returns (path, mtime, size) for every public page template.
+    """
+    stats = []
+    for template_name in sorted(set(PUBLIC_PAGES.values())):
+        origin = get_template(template_name).origin.name
+        stat = os.stat(origin)
+        stats.append((origin, stat.st_mtime, stat.st_size))
+    return stats
+
+
+def pages_version():
+    """
+    Returns (version, last_modified) for the public pages.
+
+    The version changes whenever the deploy version or any of the page templates
+    changes, so old cache entries simply stop being looked up. Templates are only
+    re-stat'ed on every call in DEBUG; in production a deploy restarts the workers.
+    """
+    global _version
+    if _version is not None and not settings.DEBUG:
+        return _version
+
+    stats = _template_stats()
+    digest = hashlib.sha1(settings.PUBLIC_PAGE_VERSION.encode())
+    for origin, mtime, size in stats:
+        digest.update(f'{origin}:{mtime}:{size}'.encode())
+    _version = (digest.hexdigest()[:16], int(max(mtime for _, mtime, _ in stats)))
+    return _version
+
+
+def render_public_page(template_name):
+    """
+    Renders a public page without a request, so no session or CSRF token is touched.
+    """
+    return render_to_string(template_name)
+
+
+def get_public_page(template_name):
+    """
+    Returns (content, etag, last_modified) for a public page, rendering it at most
+    once per version.
+    """
+    version, last_modified = pages_version()
+    key = f'public-page:{template_name}:{version}'
+    content = cache.get(key)
+    if content is None:
+        content = render_public_page(template_name)
+        cache.set(key, content, settings.PUBLIC_PAGE_CACHE_TIMEOUT)
+    etag = '"%s"' % hashlib.sha1(f'{version}:{template_name}'.encode()).hexdigest()[:20]
+    return content, etag, last_modified
+
+
+def serve_public_page(request, template_name, anonymous_only=False):
+    """
+    Serves a public page from the full-page cache, answering conditional GETs with 304.
+
+    Pages marked ``anonymous_only`` show the logged-in user and are rendered normally
+    for authenticated users.
+    """
+    if anonymous_only and request.user.is_authenticated:
+        return render(request, template_name)
+
+    content, etag, last_modified = get_public_page(template_name)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(content)
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    if anonymous_only:
+        patch_cache_control(response, private=True, max_age=settings.PUBLIC_PAGE_MAX_AGE)
+    else:
+        patch_cache_control(response, public=True, max_age=settings.PUBLIC_PAGE_MAX_AGE)
+    return response
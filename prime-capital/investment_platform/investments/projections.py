@@ -0,0 +1,149 @@
+"""
+Vectorized earnings projections over the open investment book.
+
+The open book (investments whose earnings haven't been credited yet) is loaded once
+into flat NumPy arrays; liabilities per time bucket and what-if scenarios with
+different package terms are then computed without any per-investment Python loop.
+
+An investment is owed the earning and maturity it was given when it was made (see
+investments.earnings), not its package's current terms, so projections start from
+those. What-if terms for a package replace them for that package's investments.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.utils import timezone
+
+from .models import InvestmentPackage, UserInvestment
+from .money import MICROS
+
+LOAD_CHUNK_SIZE = 50000
+
+
+class OpenBook:
+    """
+    Open investments as arrays: amount and earning (micro-units), start and maturity
+    timestamps (seconds) and the index of their package in package_ids.
+    """
+
+    def __init__(self, amount, earning, start, maturity, package_index, package_ids, package_names):
+        self.amount = amount
+        self.earning = earning
+        self.start = start
+        self.maturity = maturity
+        self.package_index = package_index
+        self.package_ids = package_ids
+        self.package_names = package_names
+
+    def __len__(self):
+        return len(self.amount)
+
+    @classmethod
+    def load(cls):
+        packages = list(InvestmentPackage.objects.order_by('pk').values_list('pk', 'name'))
+        package_ids = np.array([p[0] for p in packages], dtype=np.int64)
+        position = {pk: i for i, pk in enumerate(package_ids.tolist())}
+
+        open_investments = UserInvestment.objects.filter(earnings_calculated=False)
+        count = open_investments.count()
+        amount = np.empty(count, dtype=np.int64)
+        earning = np.empty(count, dtype=np.int64)
+        start = np.empty(count, dtype=np.int64)
+        maturity = np.empty(count, dtype=np.int64)
+        package_index = np.empty(count, dtype=np.int32)
+
+        # Stream the rows into preallocated arrays instead of building model instances.
+        rows = open_investments.values_list(
+            'amount_invested', 'earning', 'investment_date', 'matures_at', 'package_id',
+        ).iterator(chunk_size=LOAD_CHUNK_SIZE)
+        n = 0
+        for n, (amount_invested, owed, investment_date, matures_at, package_id) in enumerate(rows, 1):
+            if n > count:
+                break
+            amount[n - 1] = amount_invested
+            earning[n - 1] = owed
+            start[n - 1] = int(investment_date.timestamp())
+            maturity[n - 1] = int(matures_at.timestamp())
+            package_index[n - 1] = position[package_id]
+
+        return cls(
+            amount[:n], earning[:n], start[:n], maturity[:n], package_index[:n], package_ids,
+            [p[1] for p in packages],
+        )
+
+    def terms(self, overrides=None):
+        """
+        Returns (interest_rate, duration) package arrays of what-if overrides, NaN for
+        the terms a package keeps. overrides maps package id to {'interest_rate': ...,
+        'duration': ...}.
+        """
+        interest_rate = np.full(len(self.package_ids), np.nan)
+        duration = np.full(len(self.package_ids), np.nan)
+        for package_id, values in (overrides or {}).items():
+            i = np.searchsorted(self.package_ids, package_id)
+            if i == len(self.package_ids) or self.package_ids[i] != package_id:
+                raise ValueError(f'Unknown package {package_id}')
+            if values.get('interest_rate') is not None:
+                interest_rate[i] = float(values['interest_rate'])
+            if values.get('duration') is not None:
+                duration[i] = int(values['duration'])
+        return interest_rate, duration
+
+    def payouts(self, overrides=None):
+        """
+        Returns (payout in whole units, maturity timestamp) arrays, one entry per open
+        investment: its stored terms, or what-if terms computed from its amount and start.
+        """
+        interest_rate, duration = self.terms(overrides)
+        rate = interest_rate[self.package_index]
+        hours = duration[self.package_index]
+        payout = np.where(np.isnan(rate), self.earning, self.amount * np.nan_to_num(rate) / 100) / MICROS
+        maturity = np.where(
+            np.isnan(hours), self.maturity, self.start + np.nan_to_num(hours).astype(np.int64) * 3600,
+        )
+        return payout, maturity
+
+
+def project(book, horizons=(24, 48, 72), overrides=None, now=None):
+    """
+    Returns the amounts owed within each horizon (in hours) from now, in total and per
+    package. Earnings that have matured but not been credited yet count as overdue and
+    are included in every horizon.
+    """
+    now = int((now or timezone.now()).timestamp())
+    payout, maturity = book.payouts(overrides)
+    packages = len(book.package_ids)
+
+    overdue = maturity <= now
+    result = {
+        'open_investments': len(book),
+        'overdue': float(payout[overdue].sum()),
+        'horizons': [],
+    }
+    for hours in horizons:
+        due = maturity <= now + hours * 3600
+        by_package = np.bincount(book.package_index[due], weights=payout[due], minlength=packages)
+        result['horizons'].append({
+            'hours': hours,
+            'total': float(by_package.sum()),
+            'count': int(due.sum()),
+            'by_package': {
+                name: float(total) for name, total in zip(book.package_names, by_package) if total
+            },
+        })
+    return result
+
+
+def payout_schedule(book, bucket_hours=1, horizon=72, overrides=None, now=None):
+    """
+    Returns [(bucket start, amount)] for the payouts maturing in each bucket over the
+    next horizon hours. Overdue payouts fall into the first bucket.
+    """
+    now_dt = now or timezone.now()
+    now = int(now_dt.timestamp())
+    payout, maturity = book.payouts(overrides)
+    buckets = horizon // bucket_hours
+    index = np.clip((maturity - now) // (bucket_hours * 3600), 0, None)
+    in_range = index < buckets
+    totals = np.bincount(index[in_range], weights=payout[in_range], minlength=buckets)
+    return [(now_dt + timedelta(hours=i * bucket_hours), float(total)) for i, total in enumerate(totals)]
@@ -0,0 +1,142 @@
+"""
+Live account events (deposits, earnings, withdrawals) pushed to logged-in users.
+
+Ingestion, crediting and the withdrawal service call publish() inside the
+transaction that records the event; the event is sent once that transaction
+commits. It is delivered to subscribers in the same process and, when PUSH_BUS is
+set, multicast as a small JSON datagram on the loopback interface, so every ASGI
+worker on the host receives events published by other processes such as tasks.py.
+The account_events view streams them to the browser as server-sent events.
+"""
+import asyncio
+import json
+import logging
+import socket
+import struct
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .money import Money
+
+logger = logging.getLogger(__name__)
+
+EVENTS = {'deposit_detected', 'deposit_confirmed', 'earning_credited', 'withdrawal_status'}
+
+# Identifies this process, so it ignores its own datagrams coming back from the bus.
+ORIGIN = uuid.uuid4().hex
+
+
+def bus_address():
+    if not settings.PUSH_BUS:
+        return None
+    host, port = settings.PUSH_BUS.rsplit(':', 1)
+    return host, int(port)
+
+
+class Broker:
+    """
+    Per-process registry of subscriber queues by user id.
+    """
+
+    def __init__(self):
+        self.subscribers = {}
+        self.lock = threading.Lock()
+        self.listening = False
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(maxsize=100)
+        with self.lock:
+            self.subscribers.setdefault(user_id, set()).add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        with self.lock:
+            queues = self.subscribers.get(user_id, set())
+            queues.discard((asyncio.get_running_loop(), queue))
+            if not queues:
+                self.subscribers.pop(user_id, None)
+
+    def dispatch(self, message):
+        """
+        Hands a message to the user's subscribers. Safe to call from any thread.
+        """
+        with self.lock:
+            targets = list(self.subscribers.get(message['user_id'], ()))
+        for loop, queue in targets:
+            loop.call_soon_threadsafe(self._offer, queue, message)
+
+    @staticmethod
+    def _offer(queue, message):
+        # A client that stopped reading misses events rather than growing the queue.
+        if not queue.full():
+            queue.put_nowait(message)
+
+    async def listen(self):
+        """
+        Starts receiving events from the bus in this process, once.
+        """
+        address = bus_address()
+        if self.listening or address is None:
+            return
+        self.listening = True
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(('', address[1]))
+            sock.setsockopt(
+                socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP,
+                struct.pack('4s4s', socket.inet_aton(address[0]), socket.inet_aton('127.0.0.1')),
+            )
+        except OSError as e:
+            sock.close()
+            logger.error(f"Can't join the push bus at {settings.PUSH_BUS}, only local events will be pushed: {e}")
+            return
+        await asyncio.get_running_loop().create_datagram_endpoint(lambda: BusProtocol(self), sock=sock)
+
+
+class BusProtocol(asyncio.DatagramProtocol):
+    def __init__(self, broker):
+        self.broker = broker
+
+    def datagram_received(self, data, addr):
+        try:
+            message = json.loads(data)
+        except ValueError:
+            return
+        if message.get('origin') != ORIGIN and message.get('event') in EVENTS:
+            self.broker.dispatch(message)
+
+
+broker = Broker()
+_bus_socket = None
+
+
+def _send(message):
+    global _bus_socket
+    broker.dispatch(message)
+    address = bus_address()
+    if address is None:
+        return
+    if _bus_socket is None:
+        _bus_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        _bus_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton('127.0.0.1'))
+        _bus_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+    try:
+        _bus_socket.sendto(json.dumps(message, cls=DjangoJSONEncoder).encode(), address)
+    except OSError:
+        # Live updates are best effort; clients still poll the account API.
+        pass
+
+
+def publish(user_id, event, **data):
+    """
+    Pushes an event to the user's open event streams once the current transaction
+    commits (immediately outside a transaction).
+    """
+    data = {key: value.decimal if isinstance(value, Money) else value for key, value in data.items()}
+    message = {'origin': ORIGIN, 'user_id': user_id, 'event': event, 'data': data}
+    transaction.on_commit(lambda: _send(message))
@@ -0,0 +1,112 @@
+"""
+Cache-backed rate limiting for views that hash passwords, send email or store files.
+
+Limits are declared in settings.RATELIMITS by name and applied with the ratelimit
+decorator. Each limit is a sliding window approximated from two fixed-window
+counters in the cache (the previous window's count weighted by how much of it still
+overlaps the sliding window), so a check costs two cache reads and one increment
+and never touches the database. Throttled requests get a 429 before the view runs
+and are counted per limit in the cache (see throttle_counts).
+"""
+import logging
+import math
+import re
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+RATE_RE = re.compile(r'^(\d+)/(\d*)([smhd])$')
+
+
+def parse_rate(rate):
+    """
+    Parses '10/m', '5/h' or '20/15m' into (requests, period in seconds).
+    """
+    match = RATE_RE.match(rate)
+    if not match:
+        raise ValueError(f'Invalid rate {rate!r}')
+    count, multiplier, unit = match.groups()
+    return int(count), int(multiplier or 1) * PERIODS[unit]
+
+
+def client_ip(request):
+    value = request.META.get(settings.RATELIMIT_IP_HEADER) or request.META.get('REMOTE_ADDR', '')
+    # X-Forwarded-For style headers list the client first.
+    return value.split(',')[0].strip()
+
+
+def request_key(request, key):
+    if key == 'user' and request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{client_ip(request)}'
+
+
+def hit(name, ident, limit, period, now=None):
+    """
+    Records a request and returns 0 if it's within the limit, otherwise the number of
+    seconds until the client may retry.
+    """
+    now = time.time() if now is None else now
+    window = int(now // period)
+    current_key = f'ratelimit:{name}:{ident}:{window}'
+    cache.add(current_key, 0, timeout=period * 2)
+    try:
+        current = cache.incr(current_key)
+    except ValueError:
+        # The counter expired between add() and incr().
+        cache.add(current_key, 1, timeout=period * 2)
+        current = 1
+    previous = cache.get(f'ratelimit:{name}:{ident}:{window - 1}', 0)
+    elapsed = now / period - window
+    if previous * (1 - elapsed) + current <= limit:
+        return 0
+    return max(1, math.ceil((1 - elapsed) * period))
+
+
+def count_throttled(name):
+    key = f'ratelimit-throttled:{name}'
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, timeout=None)
+
+
+def throttle_counts():
+    """
+    Returns {limit name: requests throttled} for every configured limit.
+    """
+    keys = {f'ratelimit-throttled:{name}': name for name in settings.RATELIMITS}
+    values = cache.get_many(list(keys))
+    return {name: values.get(key, 0) for key, name in keys.items()}
+
+
+def ratelimit(name):
+    """
+    Applies the limit settings.RATELIMITS[name] to a view. A limit is a dict with
+    'rate' (e.g. '10/m'), 'key' ('ip', or 'user' to key authenticated requests by
+    user) and optionally 'methods' (the HTTP methods that count; default all).
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            config = settings.RATELIMITS.get(name)
+            if settings.RATELIMIT_ENABLED and config and request.method in config.get('methods', [request.method]):
+                limit, period = parse_rate(config['rate'])
+                retry_after = hit(name, request_key(request, config.get('key', 'ip')), limit, period)
+                if retry_after:
+                    count_throttled(name)
+                    logger.warning(f"Rate limit {name} exceeded by {request_key(request, config.get('key', 'ip'))}")
+                    response = HttpResponse('Too many requests, please try again later.', status=429,
+                                            content_type='text/plain')
+                    response.headers['Retry-After'] = str(retry_after)
+                    return response
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
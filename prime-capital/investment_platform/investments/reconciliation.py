@@ -0,0 +1,118 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from .models import (
+    ASSETS_UNDER_MANAGEMENT, ArchivedEarning, ArchivedTransaction, ArchivedWithdrawal, ReferralCommission,
+    Transaction, UserBalance, UserEarning, WithdrawalRequest, bump_counter, bump_data_version, record_event,
+)
+from .money import Money
+
+# component -> (queryset, sign). Each user's balance should equal the signed sum
+# of their rows in these querysets, hot and archived.
+COMPONENTS = {
+    'deposits': (lambda: Transaction.objects.filter(transaction_type='deposit'), 1),
+    'earnings': (lambda: UserEarning.objects.all(), 1),
+    'commissions': (lambda: ReferralCommission.objects.all(), 1),
+    'withdrawals': (lambda: WithdrawalRequest.objects.filter(status='completed'), -1),
+    'archived_deposits': (lambda: ArchivedTransaction.objects.filter(transaction_type='deposit'), 1),
+    'archived_earnings': (lambda: ArchivedEarning.objects.all(), 1),
+    'archived_withdrawals': (lambda: ArchivedWithdrawal.objects.filter(status='completed'), -1),
+}
+
+
+def component_sums(low, high):
+    """
+    Returns {user_id: {component: total}} for users with ids in [low, high], using one
+    GROUP BY query per component.
+    """
+    sums = defaultdict(dict)
+    for component, (queryset, sign) in COMPONENTS.items():
+        rows = (
+            queryset()
+            .filter(user_id__gte=low, user_id__lte=high)
+            .values('user_id')
+            .annotate(total=Sum('amount'))
+            .order_by()
+        )
+        for row in rows:
+            sums[row['user_id']][component] = sign * row['total']
+    return sums
+
+
+def reconcile_range(bounds, tolerance=Money(0)):
+    """
+    Compares stored and expected balances for users with ids in [low, high].
+    Returns a list of drift records for users whose balances differ by more than tolerance.
+    """
+    low, high = bounds
+    # Balances are read first: a credit committed between the two reads then shows
+    # up in the components only, and repair_balance rechecks before writing.
+    stored = dict(
+        UserBalance.objects.filter(user_id__gte=low, user_id__lte=high).values_list('user_id', 'balance')
+    )
+    sums = component_sums(low, high)
+
+    drift = []
+    for user_id in sorted(set(sums) | set(stored)):
+        components = sums.get(user_id, {})
+        expected = sum(components.values(), Money(0))
+        balance = stored.get(user_id, Money(0))
+        if abs(balance - expected) > tolerance:
+            drift.append({
+                'user_id': user_id,
+                'stored': balance,
+                'expected': expected,
+                'components': components,
+            })
+    return drift
+
+
+def contributing_rows(user_id):
+    """
+    Returns {component: [(pk, amount, date), ...]} for one user, for drift reports.
+    """
+    date_fields = {
+        'deposits': 'transaction_date',
+        'earnings': 'earning_date',
+        'commissions': 'created_at',
+        'withdrawals': 'processed_at',
+        'archived_deposits': 'transaction_date',
+        'archived_earnings': 'earning_date',
+        'archived_withdrawals': 'processed_at',
+    }
+    return {
+        component: list(queryset().filter(user_id=user_id).values_list('pk', 'amount', date_fields[component]))
+        for component, (queryset, sign) in COMPONENTS.items()
+    }
+
+
+def repair_balance(drift):
+    """
+    Sets a drifting balance to its expected value, unless it changed since it was read.
+    The expected value is recomputed once the balance is locked, so a credit committed
+    since the drift was found is kept. Returns True if the balance was repaired.
+    """
+    user_id, stored = drift['user_id'], drift['stored']
+    try:
+        with transaction.atomic():
+            # A no-op write locks the row (the whole database on SQLite) before the
+            # recheck, so nothing can be credited between the recheck and the repair.
+            locked = UserBalance.objects.filter(user_id=user_id, balance=stored).update(balance=F('balance'))
+            if not locked and UserBalance.objects.filter(user_id=user_id).exists():
+                return False
+            expected = sum(component_sums(user_id, user_id).get(user_id, {}).values(), Money(0))
+            if expected == stored:
+                return False
+            if locked:
+                UserBalance.objects.filter(user_id=user_id).update(balance=expected)
+            else:
+                UserBalance.objects.create(user_id=user_id, balance=expected)
+            bump_counter(ASSETS_UNDER_MANAGEMENT, expected - stored)
+            bump_data_version(user_id)
+            record_event('balance_adjustment', user_id, amount=expected - stored, balance=expected)
+    except IntegrityError:
+        # The balance was created concurrently.
+        return False
+    return True
@@ -0,0 +1,158 @@
+"""
+Streaming readers for recorded Etherscan transfer dumps, used by `manage.py replay_transfers`.
+
+Two formats are supported: newline-delimited JSON (one transfer per line) and JSON,
+either a bare array of transfers or a saved API response with the transfers under
+"result". Neither is ever loaded whole: NDJSON files are memory-mapped and split at
+line boundaries so each worker of a parallel dry run parses its own byte range, and
+JSON documents are decoded one array element at a time. Crediting runs in a single
+process: SQLite takes one writer at a time, so parallel writers only queue behind
+each other's locks and eventually fail with "database is locked".
+"""
+import json
+import mmap
+import os
+from itertools import islice
+
+from .ingestion import process_usdt_transactions
+
+READ_SIZE = 1 << 20
+
+
+def ndjson_slices(path, parts):
+    """
+    Splits an NDJSON file into at most `parts` (start, end) byte ranges that begin and
+    end on line boundaries.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        bounds = [0]
+        for i in range(1, parts):
+            newline = data.find(b'\n', max(size * i // parts, bounds[-1]))
+            if newline == -1:
+                break
+            if newline + 1 > bounds[-1]:
+                bounds.append(newline + 1)
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def iter_ndjson(path, start=0, end=None):
+    """
+    Yields the transfers on the lines in [start, end) of an NDJSON file.
+    """
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        end = len(data) if end is None else end
+        position = start
+        while position < end:
+            newline = data.find(b'\n', position, end)
+            line_end = end if newline == -1 else newline
+            line = data[position:line_end].strip()
+            position = line_end + 1
+            if line:
+                yield json.loads(line)
+
+
+def iter_json_array(path):
+    """
+    Yields the transfers of a JSON array, or of the "result" array of a saved API
+    response, decoding one element at a time.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding='utf-8') as f:
+        buffer = f.read(READ_SIZE)
+        eof = not buffer
+
+        def fill():
+            nonlocal buffer, eof
+            chunk = f.read(READ_SIZE)
+            eof = not chunk
+            buffer += chunk
+            return not eof
+
+        # Find the opening bracket of the transfers array.
+        stripped = buffer.lstrip()
+        if stripped.startswith('{'):
+            while '"result"' not in buffer and fill():
+                pass
+            key = buffer.find('"result"')
+            if key == -1:
+                raise ValueError(f'{path} has no "result" array')
+            while buffer.find('[', key) == -1 and fill():
+                pass
+            position = buffer.find('[', key) + 1
+        elif stripped.startswith('['):
+            position = buffer.index('[') + 1
+        else:
+            raise ValueError(f'{path} is not a JSON array or API response')
+
+        while True:
+            # Skip separators; refill when the buffer runs out.
+            while True:
+                while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                    position += 1
+                if position < len(buffer) or not fill():
+                    break
+            if position >= len(buffer):
+                raise ValueError(f'{path} ends inside the transfers array')
+            if buffer[position] == ']':
+                return
+            try:
+                transfer, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if fill():
+                    continue
+                raise
+            yield transfer
+            # Drop what has been decoded so memory stays bounded by one read.
+            if position > READ_SIZE:
+                buffer = buffer[position:]
+                position = 0
+
+
+def block_number(transfer):
+    return int(transfer.get('blockNumber', 0))
+
+
+def replay(transfers, confirmations, dry_run=False, from_block=None, to_block=None):
+    """
+    Feeds recorded transfers within the block range through live ingestion's
+    processing path. Returns (lowest block, highest block, summary), where summary
+    is what process_usdt_transactions returns.
+    """
+    selected = [
+        transfer for transfer in transfers
+        if (from_block is None or block_number(transfer) >= from_block)
+        and (to_block is None or block_number(transfer) <= to_block)
+    ]
+    if not selected:
+        return None, None, {}
+    blocks = [block_number(transfer) for transfer in selected]
+    return min(blocks), max(blocks), process_usdt_transactions(selected, confirmations, dry_run=dry_run)
+
+
+def replay_ndjson_slice(path, start, end, batch_size=1000, **options):
+    """
+    Replays the transfers in one byte range of an NDJSON dump, batch_size at a time.
+    Returns the combined (lowest block, highest block, summary).
+    """
+    low = high = None
+    summary = {}
+    transfers = iter_ndjson(path, start, end)
+    while batch := list(islice(transfers, batch_size)):
+        batch_low, batch_high, batch_summary = replay(batch, **options)
+        if batch_low is not None:
+            low = batch_low if low is None else min(low, batch_low)
+            high = batch_high if high is None else max(high, batch_high)
+        merge_summary(summary, batch_summary)
+    return low, high, summary
+
+
+def merge_summary(total, summary):
+    for outcome, (count, amount) in summary.items():
+        entry = total.setdefault(outcome, [0, 0])
+        entry[0] += count
+        entry[1] += amount
+    return total
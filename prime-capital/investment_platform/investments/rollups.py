@@ -0,0 +1,100 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    ArchivedEarning, ArchivedTransaction, ArchivedWithdrawal, DailyRollup, ReferralCommission, Transaction,
+    UserEarning, UserInvestment, WithdrawalRequest,
+)
+
+# metric -> [(queryset, date field, amount field, package field or None)], one source
+# per table holding the metric's events (hot and archived). Must agree with the
+# bump_rollup calls made as the events are saved.
+METRICS = {
+    'deposits': [
+        (lambda: Transaction.objects.filter(transaction_type='deposit'), 'transaction_date', 'amount', None),
+        (lambda: ArchivedTransaction.objects.filter(transaction_type='deposit'), 'transaction_date', 'amount', None),
+    ],
+    'investments': [
+        (lambda: UserInvestment.objects.all(), 'investment_date', 'amount_invested', 'package_id'),
+    ],
+    'earnings': [
+        (lambda: UserEarning.objects.all(), 'earning_date', 'amount', 'from_investment__package_id'),
+        (lambda: ArchivedEarning.objects.all(), 'earning_date', 'amount', 'package_id'),
+    ],
+    'commissions': [
+        (lambda: ReferralCommission.objects.all(), 'created_at', 'amount', None),
+    ],
+    'withdrawals': [
+        (lambda: WithdrawalRequest.objects.filter(status='completed'), 'processed_at', 'amount', None),
+        (lambda: ArchivedWithdrawal.objects.filter(status='completed'), 'processed_at', 'amount', None),
+    ],
+}
+
+
+def day_bounds(first, last):
+    """
+    Returns the aware datetimes bounding the local days first..last (inclusive).
+    """
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(first, time.min), tz)
+    end = timezone.make_aware(datetime.combine(last + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+def compute_rollups(metric, first, last):
+    """
+    Aggregates one metric from the ledger for the days first..last. The date range
+    filter uses the date column's index; only the rows in range are grouped.
+    Returns unsaved DailyRollup instances.
+    """
+    start, end = day_bounds(first, last)
+    totals = defaultdict(lambda: [0, 0])
+    for queryset, date_field, amount_field, package_field in METRICS[metric]:
+        group_by = ['day'] + ([package_field] if package_field else [])
+        rows = (
+            queryset()
+            .filter(**{f'{date_field}__gte': start, f'{date_field}__lt': end})
+            .annotate(day=TruncDate(date_field))
+            .values(*group_by)
+            .annotate(amount=Sum(amount_field), count=Count('pk'))
+            .order_by()
+        )
+        for row in rows:
+            total = totals[row['day'], row[package_field] if package_field else None]
+            total[0] += row['amount']
+            total[1] += row['count']
+    return [
+        DailyRollup(metric=metric, day=day, package_id=package_id, amount=amount, count=count)
+        for (day, package_id), (amount, count) in totals.items()
+    ]
+
+
+def rebuild_rollups(metric, first, last):
+    """
+    Replaces the stored rollups of one metric for the days first..last with freshly
+    computed ones. Returns the number of rows written.
+    """
+    rollups = compute_rollups(metric, first, last)
+    with transaction.atomic():
+        DailyRollup.objects.filter(metric=metric, day__gte=first, day__lte=last).delete()
+        DailyRollup.objects.bulk_create(rollups)
+    return len(rollups)
+
+
+def series(metric, first, last, package_id=None, by_package=False):
+    """
+    Returns [{'day', 'amount', 'count'}] for each day in first..last that had events,
+    summed over packages unless a package_id is given. With by_package, each entry
+    also carries its 'package_id'.
+    """
+    rollups = DailyRollup.objects.filter(metric=metric, day__gte=first, day__lte=last)
+    if package_id is not None:
+        rollups = rollups.filter(package_id=package_id)
+    group_by = ['day', 'package_id'] if by_package else ['day']
+    rows = rollups.values(*group_by).annotate(amount=Sum('amount'), count=Sum('count')).order_by(*group_by)
+    return [{**row, 'amount': row['amount'].decimal} for row in rows]
@@ -0,0 +1,37 @@
+ARCHIVE_DATABASE = 'archive'
+
+ARCHIVE_MODELS = {'archivedtransaction', 'archivedearning', 'archivedwithdrawal', 'archivedtxhash'}
+
+
+def is_archive_model(model):
+    return model._meta.app_label == 'investments' and model._meta.model_name in ARCHIVE_MODELS
+
+
+class ArchiveRouter:
+    """
+    Keeps the archive models on the 'archive' database and everything else off it.
+    """
+
+    def db_for_read(self, model, **hints):
+        if is_archive_model(model):
+            return ARCHIVE_DATABASE
+        # Related objects of archived rows (their users) live on the default database.
+        # __class__ rather than type(), so a lazily wrapped request.user works too.
+        instance = hints.get('instance')
+        if instance is not None and is_archive_model(instance.__class__):
+            return 'default'
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if is_archive_model(obj1.__class__) or is_archive_model(obj2.__class__):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == ARCHIVE_DATABASE:
+            return app_label == 'investments' and model_name in ARCHIVE_MODELS
+        if app_label == 'investments' and model_name in ARCHIVE_MODELS:
+            return False
+        return None
@@ -0,0 +1,210 @@
+"""
+Full-text search for the admin over users (username, email, names and wallet
+address), transaction hashes, and withdrawal addresses and payout batches.
+
+Each index is an SQLite FTS5 table using the trigram tokenizer. Any substring of
+three or more characters is found through the index, not a LIKE '%term%' scan. An
+index row's rowid is the id of the row it indexes, and triggers on the source tables
+keep the index current within the writing transaction. Django rebuilds an SQLite
+table for most schema changes, which drops its triggers, so install() runs after
+every migrate to restore missing triggers and repopulate the index they maintain.
+"""
+from django.db import connections, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.text import smart_split, unescape_string_literal
+
+# The trigram tokenizer can't match anything shorter.
+MIN_TERM_LENGTH = 3
+
+INDEXES = {
+    'user': {
+        'table': 'investments_user_fts',
+        'columns': ['username', 'email', 'first_name', 'last_name', 'wallet'],
+        'sources': ['investments_customuser', 'investments_profile'],
+        'populate': """
+            INSERT INTO investments_user_fts (rowid, username, email, first_name, last_name, wallet)
+            SELECT u.id, u.username, u.email, u.first_name, u.last_name, COALESCE(p.usdt_erc20_wallet_address, '')
+            FROM investments_customuser u LEFT JOIN investments_profile p ON p.user_id = u.id
+        """,
+        'triggers': {
+            'investments_user_fts_insert': """
+                CREATE TRIGGER investments_user_fts_insert AFTER INSERT ON investments_customuser BEGIN
+                    INSERT INTO investments_user_fts (rowid, username, email, first_name, last_name, wallet)
+                    VALUES (new.id, new.username, new.email, new.first_name, new.last_name, COALESCE(
+                        (SELECT usdt_erc20_wallet_address FROM investments_profile WHERE user_id = new.id), ''
+                    ));
+                END
+            """,
+            'investments_user_fts_update': """
+                CREATE TRIGGER investments_user_fts_update
+                AFTER UPDATE OF username, email, first_name, last_name ON investments_customuser BEGIN
+                    UPDATE investments_user_fts
+                    SET username = new.username, email = new.email,
+                        first_name = new.first_name, last_name = new.last_name
+                    WHERE rowid = new.id;
+                END
+            """,
+            'investments_user_fts_delete': """
+                CREATE TRIGGER investments_user_fts_delete AFTER DELETE ON investments_customuser BEGIN
+                    DELETE FROM investments_user_fts WHERE rowid = old.id;
+                END
+            """,
+            'investments_user_fts_wallet_insert': """
+                CREATE TRIGGER investments_user_fts_wallet_insert AFTER INSERT ON investments_profile BEGIN
+                    UPDATE investments_user_fts SET wallet = new.usdt_erc20_wallet_address
+                    WHERE rowid = new.user_id;
+                END
+            """,
+            'investments_user_fts_wallet_update': """
+                CREATE TRIGGER investments_user_fts_wallet_update
+                AFTER UPDATE OF usdt_erc20_wallet_address ON investments_profile BEGIN
+                    UPDATE investments_user_fts SET wallet = new.usdt_erc20_wallet_address
+                    WHERE rowid = new.user_id;
+                END
+            """,
+            'investments_user_fts_wallet_delete': """
+                CREATE TRIGGER investments_user_fts_wallet_delete AFTER DELETE ON investments_profile BEGIN
+                    UPDATE investments_user_fts SET wallet = '' WHERE rowid = old.user_id;
+                END
+            """,
+        },
+    },
+    'transaction': {
+        'table': 'investments_transaction_fts',
+        'columns': ['tx_hash'],
+        'sources': ['investments_transaction'],
+        'populate': """
+            INSERT INTO investments_transaction_fts (rowid, tx_hash) SELECT id, tx_hash FROM investments_transaction
+        """,
+        'triggers': {
+            'investments_transaction_fts_insert': """
+                CREATE TRIGGER investments_transaction_fts_insert AFTER INSERT ON investments_transaction BEGIN
+                    INSERT INTO investments_transaction_fts (rowid, tx_hash) VALUES (new.id, new.tx_hash);
+                END
+            """,
+            'investments_transaction_fts_update': """
+                CREATE TRIGGER investments_transaction_fts_update
+                AFTER UPDATE OF tx_hash ON investments_transaction BEGIN
+                    UPDATE investments_transaction_fts SET tx_hash = new.tx_hash WHERE rowid = new.id;
+                END
+            """,
+            'investments_transaction_fts_delete': """
+                CREATE TRIGGER investments_transaction_fts_delete AFTER DELETE ON investments_transaction BEGIN
+                    DELETE FROM investments_transaction_fts WHERE rowid = old.id;
+                END
+            """,
+        },
+    },
+    'withdrawal': {
+        'table': 'investments_withdrawal_fts',
+        'columns': ['to_address', 'payout_batch'],
+        'sources': ['investments_withdrawalrequest'],
+        'populate': """
+            INSERT INTO investments_withdrawal_fts (rowid, to_address, payout_batch)
+            SELECT id, to_address, payout_batch FROM investments_withdrawalrequest
+        """,
+        'triggers': {
+            'investments_withdrawal_fts_insert': """
+                CREATE TRIGGER investments_withdrawal_fts_insert AFTER INSERT ON investments_withdrawalrequest BEGIN
+                    INSERT INTO investments_withdrawal_fts (rowid, to_address, payout_batch)
+                    VALUES (new.id, new.to_address, new.payout_batch);
+                END
+            """,
+            'investments_withdrawal_fts_update': """
+                CREATE TRIGGER investments_withdrawal_fts_update
+                AFTER UPDATE OF to_address, payout_batch ON investments_withdrawalrequest BEGIN
+                    UPDATE investments_withdrawal_fts SET to_address = new.to_address, payout_batch = new.payout_batch
+                    WHERE rowid = new.id;
+                END
+            """,
+            'investments_withdrawal_fts_delete': """
+                CREATE TRIGGER investments_withdrawal_fts_delete AFTER DELETE ON investments_withdrawalrequest BEGIN
+                    DELETE FROM investments_withdrawal_fts WHERE rowid = old.id;
+                END
+            """,
+        },
+    },
+}
+
+
+def is_supported(using='default'):
+    return connections[using].vendor == 'sqlite'
+
+
+def install(using='default'):
+    """
+    Creates any missing index tables and triggers on an SQLite database. An index
+    whose table or triggers were missing is repopulated from its source tables.
+    Returns the names of the indexes that were (re)built.
+    """
+    if not is_supported(using):
+        return []
+    rebuilt = []
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = {name for (name,) in cursor.fetchall()}
+        for name, index in INDEXES.items():
+            if not set(index['sources']) <= existing:
+                # Not migrated yet, or a database without these tables (the archive).
+                continue
+            missing = [trigger for trigger in index['triggers'] if trigger not in existing]
+            if index['table'] in existing and not missing:
+                continue
+            columns = ', '.join(index['columns'])
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {index['table']} USING fts5({columns}, tokenize='trigram')"
+            )
+            cursor.execute(f"DELETE FROM {index['table']}")
+            for trigger in missing:
+                cursor.execute(index['triggers'][trigger])
+            cursor.execute(index['populate'])
+            rebuilt.append(name)
+    return rebuilt
+
+
+def uninstall(using='default'):
+    if not is_supported(using):
+        return
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        for index in INDEXES.values():
+            for trigger in index['triggers']:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+            cursor.execute(f"DROP TABLE IF EXISTS {index['table']}")
+
+
+def matching_ids(index, term):
+    """
+    Returns a subquery selecting the ids of the rows whose indexed columns contain
+    term, case-insensitively.
+    """
+    table = INDEXES[index]['table']
+    phrase = '"' + term.replace('"', '""') + '"'
+    return RawSQL(f'SELECT rowid FROM {table} WHERE {table} MATCH %s', [phrase])
+
+
+def search_terms(search_term):
+    # Split like the admin does, keeping quoted phrases together.
+    return [
+        unescape_string_literal(bit) if bit[0] in '"\'' and bit[-1:] == bit[0] else bit
+        for bit in smart_split(search_term)
+    ]
+
+
+def search_condition(indexes, search_term, using='default'):
+    """
+    Returns a Q matching rows where every term of search_term is found in one of
+    indexes, a list of (index name, lookup of the indexed row's id) pairs. Returns
+    None if the indexes can't answer the search (not SQLite, or a term is shorter
+    than MIN_TERM_LENGTH), in which case callers fall back to their LIKE search.
+    """
+    terms = search_terms(search_term)
+    if not terms or not is_supported(using) or any(len(term) < MIN_TERM_LENGTH for term in terms):
+        return None
+    condition = Q()
+    for term in terms:
+        any_index = Q()
+        for index, lookup in indexes:
+            any_index |= Q(**{f'{lookup}__in': matching_ids(index, term)})
+        condition &= any_index
+    return condition
@@ -1,3 +1,852 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import kpis, leases, media, outbox, search
+from .archive import archive_batch, archive_cutoff, is_processed, statement
+from .earnings import calculate_user_earnings, credit_matured, matured_earnings
+from .forms import WithdrawalRequestForm
+from .models import (
+    PENDING_WITHDRAWALS, ArchivedTransaction, CustomUser, DailyRollup, IdentityVerification, InvestmentPackage,
+    OutboxEvent, PlatformCounter, Profile, Referral, Transaction, UserBalance, UserEarning, UserInvestment,
+    UserWallet, WithdrawalRequest, bump_data_version, record_event, register_wallet,
+)
+from .money import Money
+from .paginators import estimate_table_rows
+from .projections import OpenBook, payout_schedule, project
+from .ratelimit import hit, parse_rate, throttle_counts
+from .reconciliation import reconcile_range, repair_balance
+from .rollups import rebuild_rollups, series
+from .risk import align, score_pending
+from .routers import ArchiveRouter
+from .wallets import WalletRegistry
+from .withdrawals import (
+    InsufficientBalance, InvalidAmount, InvalidTransition, available_balance, create_withdrawal,
+    transition_withdrawal,
+)
+
+
+def units(value):
+    return Money.from_decimal(value)
+
+
+def deposit(user, amount):
+    return Transaction.objects.create(
+        user=user, amount=units(amount), transaction_type='deposit', status='confirmed',
+        tx_hash=f'0x{Transaction.objects.count():064x}',
+    )
+
+
+class MoneyTests(TestCase):
+    def test_from_decimal_rounds_half_to_even(self):
+        self.assertEqual(units('0.0000005'), 0)
+        self.assertEqual(units('0.0000015'), 2)
+        self.assertEqual(units('1.25'), 1_250_000)
+        self.assertEqual(units(0.1), 100_000)
+
+    def test_str(self):
+        self.assertEqual(str(Money(1_500_000)), '1.50')
+        self.assertEqual(str(Money(1)), '0.000001')
+        self.assertEqual(str(Money(-2_000_000)), '-2.00')
+        self.assertEqual(f'{Money(1_234_567):.2f}', '1.23')
+
+    def test_arithmetic_stays_money(self):
+        self.assertIsInstance(Money(10) + 5, Money)
+        self.assertIsInstance(5 + Money(10), Money)
+        self.assertIsInstance(Money(10) - Money(15), Money)
+        self.assertIsInstance(-Money(10), Money)
+        self.assertEqual(sum([Money(1), Money(2)], Money(0)), Money(3))
+
+    def test_multiplication_and_division_round_half_to_even(self):
+        self.assertEqual(Money(3) * Decimal('0.5'), 2)
+        self.assertEqual(Money(5) * Decimal('0.5'), 2)
+        self.assertEqual(Money(10) / 4, 2)
+        self.assertEqual(Money(14) / 4, 4)
+        self.assertEqual(Money(10) / Money(4), 2.5)
+
+    def test_database_round_trip(self):
+        user = CustomUser.objects.create_user('saver', password='pw')
+        deposit(user, '12.345678')
+        balance = UserBalance.objects.get(user=user).balance
+        self.assertIsInstance(balance, Money)
+        self.assertEqual(balance, 12_345_678)
+
+
+class WithdrawalHoldTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('holder', password='pw')
+        deposit(self.user, 100)
+
+    def withdraw(self, amount):
+        return create_withdrawal(WithdrawalRequest(user=self.user, amount=units(amount), to_address='0x' + 'a' * 40))
+
+    def balance(self):
+        return UserBalance.objects.get(user=self.user)
+
+    def test_hold_reserves_the_amount(self):
+        withdrawal = self.withdraw(40)
+        self.assertEqual(withdrawal.hold_status, 'held')
+        self.assertEqual(self.balance().held, units(40))
+        self.assertEqual(available_balance(self.user), units(60))
+
+    def test_hold_beyond_available_balance_saves_nothing(self):
+        self.withdraw(40)
+        with self.assertRaises(InsufficientBalance):
+            self.withdraw(70)
+        self.assertEqual(WithdrawalRequest.objects.count(), 1)
+        self.assertEqual(self.balance().held, units(40))
+
+    def test_completing_settles_the_hold_once(self):
+        withdrawal = self.withdraw(40)
+        transition_withdrawal(withdrawal, 'completed')
+        transition_withdrawal(withdrawal, 'completed')
+        balance = self.balance()
+        self.assertEqual((balance.balance, balance.held), (units(60), 0))
+        self.assertEqual(WithdrawalRequest.objects.get().hold_status, 'settled')
+
+    def test_rejecting_releases_the_hold(self):
+        withdrawal = self.withdraw(40)
+        transition_withdrawal(withdrawal, 'rejected')
+        balance = self.balance()
+        self.assertEqual((balance.balance, balance.held), (units(100), 0))
+        self.assertEqual(WithdrawalRequest.objects.get().hold_status, 'released')
+        with self.assertRaises(InvalidTransition):
+            transition_withdrawal(withdrawal, 'completed')
+
+    def test_non_positive_amounts_are_refused(self):
+        for amount in (0, -1000):
+            with self.assertRaises(InvalidAmount):
+                self.withdraw(amount)
+        self.assertFalse(WithdrawalRequest.objects.exists())
+        balance = self.balance()
+        self.assertEqual((balance.balance, balance.held), (units(100), 0))
+
+    def test_form_refuses_non_positive_amounts(self):
+        for amount in ('0', '-1000'):
+            form = WithdrawalRequestForm({'amount': amount, 'currency': 'USDT', 'to_address': '0x' + 'a' * 40})
+            self.assertIn('amount', form.errors)
+
+    def test_view_refuses_a_negative_amount(self):
+        IdentityVerification.objects.create(
+            user=self.user, ssn='000-00-0000', zip_code='00000', full_name='Holder', address='-', state='-',
+            document_type='passport', document_front='front.png', document_back='back.png', is_verified=True,
+        )
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('request-withdrawal'), {
+            'amount': '-1000', 'currency': 'USDT', 'to_address': '0x' + 'a' * 40,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(WithdrawalRequest.objects.exists())
+        self.assertEqual(available_balance(self.user), units(100))
+
+
+class EarningsTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('earner', password='pw')
+        deposit(self.user, 100)
+        package = InvestmentPackage.objects.create(
+            name='Test', interest_rate=Decimal('10.00'), min_amount=units(1), max_amount=units(1000), duration=24,
+        )
+        self.investment = UserInvestment.objects.create(
+            user=self.user, package=package, amount_invested=units(50),
+            matures_at=timezone.now() - timedelta(hours=1),
+        )
+
+    def test_matured_earnings_count_before_crediting(self):
+        self.assertEqual(self.investment.earning, units(5))
+        self.assertEqual(matured_earnings(self.user.pk), units(5))
+        self.assertEqual(available_balance(self.user), units(105))
+
+    def test_earnings_are_credited_exactly_once(self):
+        self.assertEqual(credit_matured(self.user.pk), 1)
+        self.assertEqual(credit_matured(self.user.pk), 0)
+        self.assertEqual(calculate_user_earnings(), 0)
+        self.assertEqual(UserEarning.objects.count(), 1)
+        self.assertEqual(UserBalance.objects.get(user=self.user).balance, units(105))
+        self.assertEqual(matured_earnings(self.user.pk), 0)
+        self.assertEqual(available_balance(self.user), units(105))
+
+    def test_unmatured_earnings_are_not_credited(self):
+        UserInvestment.objects.filter(pk=self.investment.pk).update(matures_at=timezone.now() + timedelta(hours=1))
+        self.assertEqual(matured_earnings(self.user.pk), 0)
+        self.assertEqual(calculate_user_earnings(), 0)
+
+
+class ReconciliationTests(TestCase):
+    databases = {'default', 'archive'}
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('drifter', password='pw')
+        deposit(self.user, 100)
+        UserBalance.objects.filter(user=self.user).update(balance=units(90))
+
+    def test_repair_sets_the_expected_balance(self):
+        [drift] = reconcile_range((self.user.pk, self.user.pk))
+        self.assertEqual((drift['stored'], drift['expected']), (units(90), units(100)))
+        self.assertTrue(repair_balance(drift))
+        self.assertEqual(UserBalance.objects.get(user=self.user).balance, units(100))
+        self.assertEqual(reconcile_range((self.user.pk, self.user.pk)), [])
+
+    def test_repair_keeps_a_credit_made_after_the_drift_was_found(self):
+        [drift] = reconcile_range((self.user.pk, self.user.pk))
+        deposit(self.user, 50)
+        self.assertFalse(repair_balance(drift))
+        self.assertEqual(UserBalance.objects.get(user=self.user).balance, units(140))
+
+    def test_repair_rechecks_a_stale_expected_balance(self):
+        # The stored balance was read after a credit that the expected one missed.
+        [drift] = reconcile_range((self.user.pk, self.user.pk))
+        deposit(self.user, 50)
+        drift['stored'] = units(140)
+        self.assertTrue(repair_balance(drift))
+        self.assertEqual(UserBalance.objects.get(user=self.user).balance, units(150))
+
+
+class LeaseTests(TestCase):
+    def test_one_owner_at_a_time(self):
+        self.assertTrue(leases.claim('job', 0, 'a'))
+        self.assertFalse(leases.claim('job', 0, 'b'))
+        self.assertTrue(leases.claim('job', 1, 'b'))
+        self.assertTrue(leases.renew('job', 0, 'a'))
+        leases.release('job', 0, 'a')
+        self.assertTrue(leases.claim('job', 0, 'b'))
+
+    def test_expired_lease_can_be_taken_over(self):
+        self.assertTrue(leases.claim('job', 0, 'a', ttl=timedelta(seconds=-1)))
+        self.assertTrue(leases.claim('job', 0, 'b'))
+        self.assertFalse(leases.renew('job', 0, 'a'))
+
+    def test_claim_any_takes_a_free_shard(self):
+        leases.claim('job', 0, 'a')
+        self.assertEqual(leases.claim_any('job', 2, 'b'), 1)
+        self.assertIsNone(leases.claim_any('job', 2, 'c'))
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.user = CustomUser.objects.create_user('relayed', password='pw')
+
+    def offsets(self):
+        offsets = []
+        for name in sorted(os.listdir(self.directory)):
+            with open(os.path.join(self.directory, name)) as f:
+                offsets += [json.loads(line)['offset'] for line in f]
+        return offsets
+
+    def test_relay_resumes_after_a_truncated_line(self):
+        for i in range(3):
+            record_event('test', self.user.pk, n=i)
+        sink = outbox.JsonlSink(self.directory, max_bytes=10 ** 6)
+        self.assertEqual(outbox.relay('files', sink), 3)
+        # A crash midway through a write leaves a partial line, and the cursor behind.
+        [name] = os.listdir(self.directory)
+        with open(os.path.join(self.directory, name), 'a') as f:
+            f.write('{"offset": 4, "ev')
+        for i in range(2):
+            record_event('test', self.user.pk, n=3 + i)
+        outbox.OutboxCursor.objects.filter(sink='files').update(offset=0)
+
+        self.assertEqual(outbox.relay('files', sink), 2)
+        self.assertEqual(self.offsets(), list(OutboxEvent.objects.order_by('pk').values_list('pk', flat=True)))
+
+    def test_relay_rotates_files(self):
+        for i in range(5):
+            record_event('test', self.user.pk, n=i)
+        outbox.relay('files', outbox.JsonlSink(self.directory, max_bytes=1), batch_size=2)
+        self.assertEqual(len(os.listdir(self.directory)), 3)
+        self.assertEqual(len(self.offsets()), 5)
+
+    def test_prune_keeps_what_a_sink_has_not_taken(self):
+        for i in range(3):
+            record_event('test', self.user.pk, n=i)
+        outbox.relay('files', outbox.JsonlSink(self.directory))
+        self.assertEqual(outbox.prune(['files', 'other']), 0)
+        self.assertEqual(outbox.prune(['files']), 2)
+        self.assertEqual(OutboxEvent.objects.count(), 1)
+
+
+class WalletTests(TestCase):
+    def setUp(self):
+        self.owner = CustomUser.objects.create_user('owner', password='pw')
+        self.other = CustomUser.objects.create_user('other', password='pw')
+        self.address = '0x' + 'b' * 40
+        deposit(self.other, 100)
+
+    def test_withdrawal_destination_does_not_claim_deposits(self):
+        create_withdrawal(WithdrawalRequest(user=self.other, amount=units(10), to_address=self.address))
+        registry = WalletRegistry()
+        self.assertIsNone(registry.user_id(self.address))
+
+        Profile.objects.create(user=self.owner, usdt_erc20_wallet_address=self.address.upper().replace('0X', '0x'))
+        registry.refresh()
+        self.assertEqual(registry.user_id(self.address), self.owner.pk)
+        self.assertEqual(register_wallet(self.other.pk, self.address), self.owner.pk)
+
+    def test_destination_becomes_profile_wallet(self):
+        create_withdrawal(WithdrawalRequest(user=self.other, amount=units(10), to_address=self.address))
+        Profile.objects.create(user=self.other, usdt_erc20_wallet_address=self.address)
+        wallet = UserWallet.objects.get(address=self.address)
+        self.assertEqual((wallet.user_id, wallet.source), (self.other.pk, UserWallet.PROFILE))
+
+
+class DataVersionTests(TestCase):
+    def test_full_save_keeps_bumped_version(self):
+        user = CustomUser.objects.create_user('versioned', password='pw')
+        stale = CustomUser.objects.get(pk=user.pk)
+        bump_data_version(user.pk)
+        stale.first_name = 'Changed'
+        stale.save()
+        user.refresh_from_db()
+        self.assertEqual((user.data_version, user.first_name), (1, 'Changed'))
+
+
+class AccountApiTests(TestCase):
+    databases = {'default', 'archive'}
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('polled', password='pw')
+        self.client.force_login(self.user)
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('account_api')).status_code, 401)
+
+    def test_unchanged_data_answers_304(self):
+        response = self.client.get(reverse('account_api'))
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+        response = self.client.get(reverse('account_api'), headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+
+    def test_ledger_changes_change_the_etag(self):
+        etag = self.client.get(reverse('account_api')).headers['ETag']
+        deposit(self.user, 25)
+        response = self.client.get(reverse('account_api'), headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(Decimal(str(response.json()['balance']['balance'])), Decimal(25))
+
+
+class PaginatorTests(TestCase):
+    def test_estimate_follows_archived_rows(self):
+        user = CustomUser.objects.create_user('counted', password='pw')
+        for _ in range(5):
+            deposit(user, 1)
+        Transaction.objects.filter(pk__in=list(Transaction.objects.order_by('pk').values_list('pk', flat=True)[:3])).delete()
+        self.assertEqual(estimate_table_rows(Transaction), 2)
+
+
+class MediaTests(TestCase):
+    path = 'identity_documents/front/id.png'
+    body = b'0123456789'
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        os.makedirs(os.path.join(root, 'identity_documents', 'front'))
+        with open(os.path.join(root, *self.path.split('/')), 'wb') as f:
+            f.write(self.body)
+        with open(os.path.join(root, 'secret.txt'), 'wb') as f:
+            f.write(b'secret')
+        override = override_settings(MEDIA_ROOT=root, MEDIA_SENDFILE='')
+        override.enable()
+        self.addCleanup(override.disable)
+        self.root = root
+        self.owner = CustomUser.objects.create_user('owner', password='pw')
+        self.other = CustomUser.objects.create_user('other', password='pw')
+        self.staff = CustomUser.objects.create_user('staff', password='pw', is_staff=True)
+        IdentityVerification.objects.create(
+            user=self.owner, ssn='000-00-0000', zip_code='00000', full_name='Owner', address='-', state='-',
+            document_type='passport', document_front=self.path, document_back='identity_documents/back/id.png',
+        )
+
+    def get(self, user, path=None, **headers):
+        if user is not None:
+            self.client.force_login(user)
+        return self.client.get(reverse('protected_media', args=[path or self.path]), headers=headers)
+
+    def test_owner_and_staff_can_read(self):
+        for user in (self.owner, self.staff):
+            response = self.get(user)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.getvalue(), self.body)
+            self.assertIn('private', response.headers['Cache-Control'])
+
+    def test_other_users_get_not_found(self):
+        self.assertEqual(self.get(self.other).status_code, 404)
+
+    def test_anonymous_users_are_sent_to_log_in(self):
+        response = self.get(None)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.url.startswith(settings.LOGIN_URL))
+
+    def test_paths_cannot_climb_out_of_their_prefix(self):
+        for path in ('identity_documents/../secret.txt', 'previews/../secret.txt', '/secret.txt', ''):
+            self.assertFalse(media.can_access(self.staff, path))
+        self.assertTrue(media.can_access(self.staff, 'secret.txt'))
+        self.assertEqual(self.get(self.staff, 'identity_documents/../secret.txt').status_code, 404)
+
+    def test_byte_ranges(self):
+        response = self.get(self.owner, range='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.getvalue(), b'2345')
+        self.assertEqual(response.headers['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(self.get(self.owner, range='bytes=-3').getvalue(), b'789')
+        self.assertEqual(self.get(self.owner, range='bytes=7-').getvalue(), b'789')
+
+    def test_unsatisfiable_range(self):
+        response = self.get(self.owner, range='bytes=10-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response.headers['Content-Range'], 'bytes */10')
+
+    def test_stale_if_range_sends_the_whole_file(self):
+        response = self.get(self.owner, range='bytes=2-5', if_range='Wed, 21 Oct 2015 07:28:00 GMT')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.getvalue(), self.body)
+
+    @override_settings(MEDIA_SENDFILE='x-accel-redirect', MEDIA_INTERNAL_URL='/protected-media/')
+    def test_x_accel_redirect(self):
+        response = self.get(self.owner)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Accel-Redirect'], '/protected-media/' + self.path)
+        self.assertEqual(response.content, b'')
+
+    @override_settings(MEDIA_SENDFILE='x-sendfile')
+    def test_x_sendfile(self):
+        response = self.get(self.owner)
+        self.assertEqual(response.headers['X-Sendfile'], os.path.join(self.root, 'identity_documents', 'front', 'id.png'))
+        self.assertEqual(response.content, b'')
+
+
+class PublicPageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_conditional_get(self):
+        response = self.client.get(reverse('index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response.headers['Cache-Control'])
+        etag = response.headers['ETag']
+        response = self.client.get(reverse('index'), headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        response = self.client.get(reverse('index'), headers={'if-modified-since': response.headers['Last-Modified']})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get(reverse('index'), headers={'if-none-match': '"stale"'}).status_code, 200)
+
+    def test_user_pages_are_cached_for_anonymous_visitors_only(self):
+        response = self.client.get(reverse('customer'))
+        self.assertIn('ETag', response.headers)
+        self.assertIn('private', response.headers['Cache-Control'])
+        self.client.force_login(CustomUser.objects.create_user('visitor', password='pw'))
+        response = self.client.get(reverse('customer'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response.headers)
+
+    def test_prerender_skips_user_pages(self):
+        output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output)
+        call_command('prerender_pages', output=output, stdout=io.StringIO())
+        self.assertTrue(os.path.isfile(os.path.join(output, 'index.html')))
+        self.assertTrue(os.path.isfile(os.path.join(output, 'market', 'index.html')))
+        self.assertFalse(os.path.exists(os.path.join(output, 'customer-support')))
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('10/m'), (10, 60))
+        self.assertEqual(parse_rate('20/15m'), (20, 900))
+        with self.assertRaises(ValueError):
+            parse_rate('10 per minute')
+
+    def test_sliding_window_weights_the_previous_window(self):
+        for ident in ('ip:1', 'ip:2'):
+            hits = [hit('test', ident, 2, 60, now=10) for _ in range(3)]
+            self.assertEqual(hits[:2], [0, 0])
+            self.assertGreater(hits[2], 0)
+        # Halfway into the next window the previous three requests count as 1.5...
+        self.assertGreater(hit('test', 'ip:1', 2, 60, now=90), 0)
+        # ...and near its end as 0.3, so another request fits.
+        self.assertEqual(hit('test', 'ip:2', 2, 60, now=114), 0)
+
+    @override_settings(RATELIMIT_ENABLED=True, RATELIMITS={'login': {'rate': '2/m', 'key': 'ip', 'methods': ['POST']}})
+    def test_throttled_requests_get_429(self):
+        credentials = {'username': 'nobody', 'password': 'wrong'}
+        for _ in range(2):
+            self.assertEqual(self.client.post(reverse('login'), credentials).status_code, 200)
+        with self.assertLogs('investments.ratelimit', 'WARNING'):
+            response = self.client.post(reverse('login'), credentials)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response.headers['Retry-After']), 0)
+        self.assertEqual(self.client.get(reverse('login')).status_code, 200)
+        self.assertEqual(throttle_counts(), {'login': 1})
+
+
+class SearchTests(TestCase):
+    def users(self, term):
+        return set(CustomUser.objects.filter(search.search_condition([('user', 'pk')], term))
+                   .values_list('username', flat=True))
+
+    def test_triggers_keep_the_user_index_current(self):
+        user = CustomUser.objects.create_user('alexandra', email='alex@example.com', password='pw')
+        CustomUser.objects.create_user('bob', password='pw')
+        self.assertEqual(self.users('XANDR'), {'alexandra'})
+        self.assertEqual(self.users('example.com'), {'alexandra'})
+
+        user.username = 'sandra'
+        user.save()
+        self.assertEqual(self.users('xandr'), set())
+        self.assertEqual(self.users('sandra'), {'sandra'})
+
+        Profile.objects.create(user=user, usdt_erc20_wallet_address='0x' + 'ab12' * 10)
+        self.assertEqual(self.users('ab12ab'), {'sandra'})
+        user.delete()
+        self.assertEqual(self.users('sandra'), set())
+
+    def test_every_term_must_match(self):
+        CustomUser.objects.create_user('alexandra', email='alex@example.com', password='pw')
+        CustomUser.objects.create_user('alexis', email='alexis@example.org', password='pw')
+        self.assertEqual(self.users('alex'), {'alexandra', 'alexis'})
+        self.assertEqual(self.users('alex example.org'), {'alexis'})
+        self.assertEqual(self.users('"alex@example.com"'), {'alexandra'})
+
+    def test_short_terms_fall_back_to_like_search(self):
+        self.assertIsNone(search.search_condition([('user', 'pk')], 'al'))
+        self.assertIsNone(search.search_condition([('user', 'pk')], 'alex al'))
+
+    def test_install_restores_dropped_triggers(self):
+        user = CustomUser.objects.create_user('rebuilt', password='pw')
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER investments_transaction_fts_insert')
+        deposit(user, 1)
+        self.assertEqual(search.install(), ['transaction'])
+        self.assertEqual(search.install(), [])
+        condition = search.search_condition([('transaction', 'pk')], f'0x{0:064x}'[-12:])
+        self.assertEqual(Transaction.objects.filter(condition).count(), 1)
+
+
+class ArchiveTests(TestCase):
+    databases = {'default', 'archive'}
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('archived', password='pw')
+        self.old = deposit(self.user, 10)
+        self.new = deposit(self.user, 20)
+        Transaction.objects.filter(pk=self.old.pk).update(transaction_date=timezone.now() - timedelta(days=400))
+
+    def test_moves_old_rows_only(self):
+        self.assertEqual(archive_batch('transactions', archive_cutoff(365)), 1)
+        self.assertEqual(archive_batch('transactions', archive_cutoff(365)), 0)
+        self.assertEqual(list(Transaction.objects.values_list('pk', flat=True)), [self.new.pk])
+        archived = ArchivedTransaction.objects.get()
+        self.assertEqual((archived.pk, archived.tx_hash, archived.amount), (self.old.pk, self.old.tx_hash, units(10)))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.data_version, 3)
+
+    def test_archived_hashes_still_count_as_processed(self):
+        archive_batch('transactions', archive_cutoff(365))
+        self.assertTrue(is_processed(self.old.tx_hash))
+        self.assertTrue(is_processed(self.new.tx_hash))
+        self.assertFalse(is_processed('0x' + 'f' * 64))
+
+    def test_rerunning_an_interrupted_batch(self):
+        # A run that stopped after copying leaves the rows in both places.
+        ArchivedTransaction.objects.create(
+            id=self.old.pk, user_id=self.user.pk, amount=self.old.amount, tx_hash=self.old.tx_hash, currency='USDT',
+            status='confirmed', transaction_type='deposit', transaction_date=self.old.transaction_date,
+        )
+        self.assertEqual(archive_batch('transactions', archive_cutoff(365)), 1)
+        self.assertEqual(ArchivedTransaction.objects.count(), 1)
+        self.assertFalse(Transaction.objects.filter(pk=self.old.pk).exists())
+
+    def test_statement_merges_hot_and_archived_rows(self):
+        archive_batch('transactions', archive_cutoff(365))
+        entries = list(statement(self.user.pk))
+        self.assertEqual([(kind, amount) for _, kind, amount, _ in entries],
+                         [('deposit', units(10)), ('deposit', units(20))])
+
+    def test_routing(self):
+        router = ArchiveRouter()
+        self.assertEqual(router.db_for_read(ArchivedTransaction), 'archive')
+        self.assertIsNone(router.db_for_read(Transaction))
+        self.assertEqual(router.db_for_read(CustomUser, instance=ArchivedTransaction()), 'default')
+        self.assertTrue(router.allow_migrate('archive', 'investments', 'archivedtransaction'))
+        self.assertFalse(router.allow_migrate('archive', 'investments', 'transaction'))
+        self.assertFalse(router.allow_migrate('default', 'investments', 'archivedtransaction'))
+        archive_batch('transactions', archive_cutoff(365))
+        self.assertEqual(ArchivedTransaction.objects.get().user, self.user)
+
+
+class ImportUsersTests(TestCase):
+    wallet = '0x' + 'cd34' * 10
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def import_users(self, rows, *args):
+        path = os.path.join(self.directory, 'users.jsonl')
+        with open(path, 'w') as f:
+            f.writelines(json.dumps(row) + '\n' for row in rows)
+        stderr = io.StringIO()
+        call_command('import_users', path, '--workers', '1', '--batch-size', '2', *args,
+                     stdout=io.StringIO(), stderr=stderr)
+        return stderr.getvalue()
+
+    def test_imports_users_with_their_records(self):
+        CustomUser.objects.create_user('existing', password='pw', referral_code='EXIST')
+        self.import_users([
+            {'username': 'ann', 'password': 'secret', 'email': 'ann@example.com',
+             'usdt_erc20_wallet_address': self.wallet.upper().replace('0X', '0x')},
+            {'username': 'ben', 'password_hash': CustomUser.objects.get().password, 'referred_by': 'ann'},
+            {'username': 'cat', 'password': 'secret', 'referred_by': 'EXIST'},
+        ])
+        ann, ben, cat = (CustomUser.objects.get(username=name) for name in ('ann', 'ben', 'cat'))
+        self.assertTrue(ann.check_password('secret'))
+        self.assertTrue(ben.check_password('pw'))
+        self.assertEqual(ann.email, 'ann@example.com')
+        self.assertEqual(len({ann.referral_code, ben.referral_code, cat.referral_code, 'EXIST'}), 4)
+        self.assertEqual(UserBalance.objects.filter(user__in=[ann, ben, cat]).count(), 3)
+        self.assertEqual(Profile.objects.get(user=ann).usdt_erc20_wallet_address, self.wallet.upper().replace('0X', '0x'))
+        self.assertEqual(UserWallet.objects.get(address=self.wallet).user, ann)
+        self.assertEqual(
+            set(Referral.objects.values_list('referred_by__username', 'referred_user__username')),
+            {('ann', 'ben'), ('existing', 'cat')},
+        )
+
+    def test_rerun_resumes_and_skips_imported_users(self):
+        rows = [{'username': f'user{i}', 'password': 'pw'} for i in range(3)]
+        self.import_users(rows[:2])
+        self.import_users(rows)
+        self.assertEqual(CustomUser.objects.count(), 3)
+        self.import_users(rows, '--restart')
+        self.assertEqual(CustomUser.objects.count(), 3)
+
+    def test_a_wallet_stays_with_its_first_owner(self):
+        stderr = self.import_users([
+            {'username': 'first', 'password': 'pw', 'usdt_erc20_wallet_address': self.wallet},
+            {'username': 'second', 'password': 'pw', 'usdt_erc20_wallet_address': self.wallet},
+            {'username': 'third', 'password': 'pw', 'referred_by': 'nobody'},
+        ])
+        self.assertEqual(UserWallet.objects.get().user.username, 'first')
+        self.assertIn('second: wallet', stderr)
+        self.assertIn("third: unknown referrer 'nobody'", stderr)
+
+    def test_rows_need_a_username(self):
+        with self.assertRaises(CommandError):
+            self.import_users([{'password': 'pw'}])
+
+
+class RiskTests(TestCase):
+    address = '0x' + 'e5' * 20
+
+    def setUp(self):
+        self.owner = CustomUser.objects.create_user('settled', password='pw')
+        self.stranger = CustomUser.objects.create_user('stranger', password='pw')
+        Profile.objects.create(user=self.owner, usdt_erc20_wallet_address=self.address)
+        month_ago = timezone.now() - timedelta(days=60)
+        for user in (self.owner, self.stranger):
+            deposit(user, 100)
+        CustomUser.objects.update(date_joined=timezone.now() - timedelta(days=365))
+        Transaction.objects.update(transaction_date=month_ago)
+        UserWallet.objects.update(created_at=month_ago)
+
+    def withdraw(self, user, amount):
+        return create_withdrawal(WithdrawalRequest(user=user, amount=units(amount), to_address=self.address))
+
+    def test_scores_pending_withdrawals(self):
+        routine = self.withdraw(self.owner, 50)
+        foreign = self.withdraw(self.stranger, 50)
+        self.assertEqual(score_pending(), 2)
+        routine.refresh_from_db()
+        foreign.refresh_from_db()
+        self.assertLess(routine.risk_score, settings.WITHDRAWAL_LOW_RISK_BELOW)
+        self.assertEqual(routine.risk_factors, '')
+        self.assertGreater(foreign.risk_score, 50)
+        self.assertEqual(foreign.risk_factors, 'foreign_address, new_address')
+        self.assertIsNotNone(foreign.risk_scored_at)
+
+    def test_only_pending_withdrawals_are_scored(self):
+        withdrawal = self.withdraw(self.owner, 50)
+        transition_withdrawal(withdrawal, 'approved')
+        self.assertEqual(score_pending(), 0)
+        withdrawal.refresh_from_db()
+        self.assertIsNone(withdrawal.risk_score)
+
+    def test_fresh_deposits_and_repeat_requests_raise_the_score(self):
+        first = self.withdraw(self.owner, 10)
+        score_pending()
+        first.refresh_from_db()
+        deposit(self.owner, 100)
+        self.withdraw(self.owner, 10)
+        score_pending()
+        self.assertGreater(WithdrawalRequest.objects.get(pk=first.pk).risk_score, first.risk_score)
+
+    def test_align(self):
+        users = np.array([3, 5, 9])
+        self.assertEqual(align(users, [(9, 2.0), (3, 1.0), (7, 4.0)]).tolist(), [1.0, 0.0, 2.0])
+        self.assertTrue(np.isnan(align(users, [], np.nan)).all())
+
+
+class ProjectionTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user('projected', password='pw')
+        deposit(user, 1000)
+        self.short = InvestmentPackage.objects.create(
+            name='Short', interest_rate=Decimal('10.00'), min_amount=units(1), max_amount=units(1000), duration=24,
+        )
+        self.long = InvestmentPackage.objects.create(
+            name='Long', interest_rate=Decimal('20.00'), min_amount=units(1), max_amount=units(1000), duration=48,
+        )
+        self.now = timezone.now()
+        for package, amount, hours in ((self.short, 100, -1), (self.short, 100, 12), (self.long, 50, 36),
+                                       (self.long, 500, 6)):
+            UserInvestment.objects.create(user=user, package=package, amount_invested=units(amount),
+                                          matures_at=self.now + timedelta(hours=hours))
+        # Credited investments are no longer owed anything.
+        UserInvestment.objects.filter(amount_invested=units(500)).update(earnings_calculated=True)
+        # Investments keep the terms they were made with.
+        InvestmentPackage.objects.filter(pk=self.short.pk).update(interest_rate=Decimal('50.00'))
+
+    def test_project(self):
+        result = project(OpenBook.load(), (24, 48), now=self.now)
+        self.assertEqual((result['open_investments'], result['overdue']), (3, 10))
+        self.assertEqual([(h['hours'], h['total'], h['count']) for h in result['horizons']], [(24, 20, 2), (48, 30, 3)])
+        self.assertEqual(result['horizons'][1]['by_package'], {'Short': 20, 'Long': 10})
+
+    def test_what_if_terms(self):
+        book = OpenBook.load()
+        result = project(book, (48,), overrides={self.long.pk: {'interest_rate': 40}}, now=self.now)
+        self.assertEqual(result['horizons'][0]['by_package'], {'Short': 20, 'Long': 20})
+        # Maturity moves to start + duration, which is past the horizon here.
+        result = project(book, (48,), overrides={self.short.pk: {'duration': 100}}, now=self.now)
+        self.assertEqual((result['overdue'], result['horizons'][0]['by_package']), (0, {'Long': 10}))
+        with self.assertRaises(ValueError):
+            project(book, overrides={0: {'duration': 1}}, now=self.now)
+
+    def test_payout_schedule(self):
+        schedule = payout_schedule(OpenBook.load(), bucket_hours=24, horizon=72, now=self.now)
+        self.assertEqual([total for _, total in schedule], [20, 10, 0])
+        self.assertEqual(schedule[1][0], self.now + timedelta(hours=24))
+
+    def test_command(self):
+        stdout = io.StringIO()
+        call_command('project_earnings', '--horizon', '48', '--set-rate', f'{self.long.pk}=40', stdout=stdout)
+        self.assertIn('next 48h: 40.00 owed on 3 investments', stdout.getvalue())
+
+
+class RollupTests(TestCase):
+    databases = {'default', 'archive'}
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('charted', password='pw')
+        self.package = InvestmentPackage.objects.create(
+            name='Test', interest_rate=Decimal('10.00'), min_amount=units(1), max_amount=units(1000), duration=24,
+        )
+        self.today = timezone.localdate()
+
+    def stored(self):
+        return set(DailyRollup.objects.values_list('metric', 'day', 'package_id', 'amount', 'count'))
+
+    def test_events_update_their_day(self):
+        deposit(self.user, 10)
+        deposit(self.user, 20)
+        UserInvestment.objects.create(user=self.user, package=self.package, amount_invested=units(25))
+        self.assertEqual(series('deposits', self.today, self.today),
+                         [{'day': self.today, 'amount': Decimal(30), 'count': 2}])
+        self.assertEqual(series('investments', self.today, self.today, by_package=True),
+                         [{'day': self.today, 'package_id': self.package.pk, 'amount': Decimal(25), 'count': 1}])
+        self.assertEqual(series('investments', self.today, self.today, package_id=0), [])
+
+    def test_backfill_matches_incremental_rollups(self):
+        deposit(self.user, 10)
+        UserInvestment.objects.create(user=self.user, package=self.package, amount_invested=units(25))
+        withdrawal = create_withdrawal(WithdrawalRequest(user=self.user, amount=units(5), to_address='0x' + 'a' * 40))
+        transition_withdrawal(withdrawal, 'approved')
+        transition_withdrawal(withdrawal, 'completed')
+        incremental = self.stored()
+        self.assertEqual({row[0] for row in incremental}, {'deposits', 'investments', 'withdrawals'})
+        DailyRollup.objects.all().delete()
+        call_command('backfill_rollups', stdout=io.StringIO())
+        self.assertEqual(self.stored(), incremental)
+
+    def test_rebuild_replaces_a_range(self):
+        deposit(self.user, 10)
+        # update() skips the hooks that keep the rollups current.
+        Transaction.objects.update(transaction_date=timezone.now() - timedelta(days=3))
+        first = self.today - timedelta(days=7)
+        self.assertEqual(rebuild_rollups('deposits', first, self.today), 1)
+        self.assertEqual(series('deposits', first, self.today),
+                         [{'day': self.today - timedelta(days=3), 'amount': Decimal(10), 'count': 1}])
+
+    def test_series_view(self):
+        deposit(self.user, 10)
+        self.client.force_login(CustomUser.objects.create_user('staffer', password='pw', is_staff=True))
+        response = self.client.get(reverse('rollup_series'), {'metric': 'deposits'})
+        self.assertEqual(response.json()['series']['deposits'],
+                         [{'day': self.today.isoformat(), 'amount': '10.000000', 'count': 1}])
+        for params in ({'metric': 'nope'}, {'start': 'today'}, {'start': '2024-02-01', 'end': '2024-01-01'}):
+            self.assertEqual(self.client.get(reverse('rollup_series'), params).status_code, 400)
+
+
+class KpiTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('counted', password='pw')
+        package = InvestmentPackage.objects.create(
+            name='Test', interest_rate=Decimal('10.00'), min_amount=units(1), max_amount=units(1000), duration=24,
+        )
+        deposit(self.user, 100)
+        UserInvestment.objects.create(user=self.user, package=package, amount_invested=units(50),
+                                      matures_at=timezone.now() - timedelta(hours=1))
+        UserInvestment.objects.create(user=self.user, package=package, amount_invested=units(20))
+        completed = create_withdrawal(WithdrawalRequest(user=self.user, amount=units(5), to_address='0x' + 'a' * 40))
+        transition_withdrawal(completed, 'approved')
+        transition_withdrawal(completed, 'completed')
+        create_withdrawal(WithdrawalRequest(user=self.user, amount=units(3), to_address='0x' + 'a' * 40))
+        credit_matured(self.user.pk)
+
+    def test_counters_follow_the_ledger(self):
+        values = kpis.overview()
+        self.assertEqual(values['deposits_today'], units(100))
+        self.assertEqual(values['pending_withdrawals'], units(3))
+        self.assertEqual(values['earnings_owed'], units(2))
+        self.assertEqual(values['assets_under_management'], UserBalance.objects.get(user=self.user).balance)
+        self.assertEqual(list(values.values()), list(kpis.recompute_counters().values()))
+
+    def test_verify_counters(self):
+        stdout = io.StringIO()
+        call_command('verify_counters', stdout=stdout)
+        self.assertIn('Counters match the ledger.', stdout.getvalue())
+
+        PlatformCounter.objects.filter(key=PENDING_WITHDRAWALS).update(value=units(99))
+        stdout = io.StringIO()
+        call_command('verify_counters', stdout=stdout)
+        self.assertIn('1 counters differ.', stdout.getvalue())
+        call_command('verify_counters', '--fix', stdout=io.StringIO())
+        self.assertEqual(kpis.overview()['pending_withdrawals'], units(3))
+
+    def test_overview_page(self):
+        self.client.force_login(CustomUser.objects.create_user('staffer', password='pw', is_staff=True))
+        response = self.client.get(reverse('platform_overview'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['kpis']['deposits_today'], units(100))
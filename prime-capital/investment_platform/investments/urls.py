@@ -4,16 +4,17 @@ from .views import CustomLoginView
 from django.conf import settings
 from django.conf.urls. static import static
 from django.contrib.auth import views as auth_views
+from .ratelimit import ratelimit
 
 urlpatterns = [
     path('', views.index, name='index'),
     path('register/', views.register, name='register'),
-    path('login/', views.CustomLoginView.as_view(), name='login'),
+    path('login/', ratelimit('login')(views.CustomLoginView.as_view()), name='login'),
     path('accounts/profile/', views.profile_view, name='profile'),
     path('change-password/', views.change_password, name='change-password'),
-    path('dashboard/', views.dashboard, name='dashboard'),
-    path('referrals/', views.referrals, name='referrals'),
-    path('transactions/', views.transactions, name='transactions'),
+    path('dashboard/', views.dashboard_async if settings.ASYNC_VIEWS else views.dashboard, name='dashboard'),
+    path('referrals/', views.referrals_async if settings.ASYNC_VIEWS else views.referrals, name='referrals'),
+    path('transactions/', views.transactions_async if settings.ASYNC_VIEWS else views.transactions, name='transactions'),
     path('investors/', views.investors, name='investors'),
     path('leaders/', views.leaders, name='leaders'),
     path('customer-support/', views.customer, name='customer'),
@@ -24,8 +25,12 @@ urlpatterns = [
     path('select-package/', views.select_package, name='select-package'),
     path('submit-verification/', views.submit_verification, name='submit-verification'),
     path('api/verification-status/', views.verification_status, name='verification_status'),
+    path('api/account/', views.account_api, name='account_api'),
     path('logout/', views.logout_view, name='logout'),
-    path('password_reset/', auth_views.PasswordResetView.as_view(template_name='password_reset_form.html'),
+    path(settings.MEDIA_URL.lstrip('/') + '<path:path>', views.protected_media, name='protected_media'),
+    path('staff/overview/', views.platform_overview, name='platform_overview'),
+    path('staff/api/rollups/', views.rollup_series, name='rollup_series'),
+    path('password_reset/', ratelimit('password_reset')(auth_views.PasswordResetView.as_view(template_name='password_reset_form.html')),
          name='password_reset'),
     path('password_reset/sent/',
          auth_views.PasswordResetDoneView.as_view(template_name='password_reset_done.html'),
@@ -38,7 +43,9 @@ urlpatterns = [
          name='password_reset_complete'),
 ]
 
+if settings.ASYNC_VIEWS:
+    # The event stream holds its connection open, so it's only served under ASGI.
+    urlpatterns.append(path('api/account/events/', views.account_events, name='account_events'))
 
 urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
@@ -1,19 +1,26 @@
-from django.http import HttpResponse
-from django.contrib.auth.views import LoginView
+import asyncio
+import json
+from datetime import date, timedelta
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.contrib.auth.views import LoginView, redirect_to_login
 from django.contrib import messages
 from django.db.models import Sum
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.conf import settings
-from django.db import transaction
+from django.db import connections, transaction
 from django.contrib.auth import logout
 import secrets
-from django.core.mail import send_mail, message
 from django.shortcuts import render, redirect
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.urls import reverse
-from .forms import IdentityVerificationForm
-from .models import IdentityVerification
 from .forms import (
     IdentityVerificationForm,
     CustomUserCreationForm,
@@ -43,6 +50,13 @@ from .notifications import (
     send_acknowledgment_email,
     send_verification_status_email
 )
+from . import kpis, media, push, rollups
+from .account import account_etag, account_snapshot
+from .earnings import matured_earnings
+from .money import Money
+from .pages import serve_public_page
+from .ratelimit import ratelimit, throttle_counts
+from .withdrawals import InsufficientBalance, InvalidAmount, create_withdrawal
 from urllib.parse import urlencode
 
 
@@ -50,44 +64,45 @@ def index(request):
     """
     View for the home page (index.html).
     """
-    return render(request, 'index.html')
+    return serve_public_page(request, 'index.html')
 
 
 def investors(request):
     """
     View for the investors page (investors.html).
     """
-    return render(request, 'investors.html')
+    return serve_public_page(request, 'investors.html')
 
 
 def leaders(request):
     """
     View for the Leaders page (Leaders.html).
     """
-    return render(request, 'Leaders.html')
+    return serve_public_page(request, 'Leaders.html')
 
 
 def support(request):
     """
     View for the support page (support.html).
     """
-    return render(request, 'support.html')
+    return serve_public_page(request, 'support.html')
 
 
 def customer(request):
     """
     View for the customer support page (customer.html).
     """
-    return render(request, 'customer.html')
+    return serve_public_page(request, 'customer.html', anonymous_only=True)
 
 
 def market(request):
     """
     View for the market page (market.html).
     """
-    return render(request, 'market.html')
+    return serve_public_page(request, 'market.html')
 
 
+@ratelimit('register')
 @transaction.atomic
 def register(request):
     if request.method == 'POST':
@@ -107,7 +122,7 @@ def register(request):
 
                     # Create referral and commission objects
                     referral = Referral.objects.create(referred_by=referrer, referred_user=user)
-                    ReferralCommission.objects.create(user=referrer, amount=10)
+                    ReferralCommission.objects.create(user=referrer, amount=Money.from_decimal(10))
 
                     # Save the user after setting the referrer and creating related objects
                     user.save()
@@ -149,6 +164,19 @@ def profile_view(request):
     return render(request, 'profile.html', context)
 
 
+@login_required
+def protected_media(request, path):
+    """
+    Serves an uploaded file to the users allowed to read it (see investments.media).
+    Files they may not read are reported missing rather than forbidden.
+    """
+    if not media.can_access(request.user, path):
+        raise Http404('No such file')
+    response = media.send_file(request, path)
+    patch_cache_control(response, private=True)
+    return response
+
+
 @login_required
 def payment_details(request):
     """
@@ -179,7 +207,7 @@ def dashboard(request):
     except UserBalance.DoesNotExist:
         user_balance = UserBalance.objects.create(user=user)
 
-    current_balance = user_balance.balance
+    current_balance = user_balance.balance + matured_earnings(user.pk)
     total_deposits = Transaction.objects.filter(user=user, transaction_type='deposit').aggregate(Sum('amount'))['amount__sum'] or 0
     total_withdrawals = Transaction.objects.filter(user=user, transaction_type='withdrawal').aggregate(Sum('amount'))['amount__sum'] or 0
     total_referral_commissions = ReferralCommission.objects.filter(user=user).aggregate(Sum('amount'))['amount__sum'] or 0
@@ -226,6 +254,108 @@ def transactions(request):
     return render(request, 'transactions.html', context)
 
 
+async def gather_queries(*queries):
+    """
+    Runs independent read-only queries concurrently.
+
+    Django's async ORM methods all run on the same thread one after another, so each
+    query gets its own worker thread (and database connection) instead.
+    """
+    def run(query):
+        try:
+            return query()
+        finally:
+            # The executor's threads outlive the request, and request_finished only
+            # closes the connections of the thread that handled it.
+            connections.close_all()
+
+    return await asyncio.gather(*(sync_to_async(run, thread_sensitive=False)(query) for query in queries))
+
+
+def async_login_required(view_func):
+    """
+    login_required for async views.
+    """
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        # Make request.user a plain object so the templates don't hit the database.
+        request.user = user
+        return await view_func(request, *args, **kwargs)
+    return wrapper
+
+
+@async_login_required
+async def dashboard_async(request):
+    """
+    Async version of the dashboard, used when ASYNC_VIEWS is enabled.
+    """
+    user = request.user
+
+    user_balance, matured, total_deposits, total_withdrawals, total_referral_commissions, latest_investment, last_earning = await gather_queries(
+        lambda: UserBalance.objects.get_or_create(user=user)[0],
+        lambda: matured_earnings(user.pk),
+        lambda: Transaction.objects.filter(user=user, transaction_type='deposit').aggregate(Sum('amount'))['amount__sum'] or 0,
+        lambda: Transaction.objects.filter(user=user, transaction_type='withdrawal').aggregate(Sum('amount'))['amount__sum'] or 0,
+        lambda: ReferralCommission.objects.filter(user=user).aggregate(Sum('amount'))['amount__sum'] or 0,
+        lambda: UserInvestment.objects.filter(user=user).select_related('package').order_by('-investment_date').first(),
+        lambda: UserEarning.objects.filter(user=user).order_by('-earning_date').first(),
+    )
+
+    context = {
+        'current_balance': user_balance.balance + matured,
+        'total_deposits': total_deposits,
+        'total_withdrawals': total_withdrawals,
+        'total_referral_commissions': total_referral_commissions,
+        'latest_investment': latest_investment,
+        'last_earning': last_earning,
+        # Live balance updates need the account_events stream, which only runs under ASGI.
+        'account_events': True,
+    }
+
+    return await sync_to_async(render)(request, 'dashboard.html', context)
+
+
+@async_login_required
+async def referrals_async(request):
+    """
+    Async version of the referrals page, used when ASYNC_VIEWS is enabled.
+    """
+    user = request.user
+    total_referrals, active_referrals = await gather_queries(
+        lambda: Referral.objects.filter(referred_by=user).count(),
+        lambda: Referral.objects.filter(referred_by=user, referred_user__userinvestment__isnull=False).distinct().count(),
+    )
+
+    context = {
+        'total_referrals': total_referrals,
+        'active_referrals': active_referrals,
+    }
+    return await sync_to_async(render)(request, 'referrals.html', context)
+
+
+@async_login_required
+async def transactions_async(request):
+    """
+    Async version of the transactions page, used when ASYNC_VIEWS is enabled.
+    """
+    user = request.user
+    deposits, earnings, withdrawals = await gather_queries(
+        lambda: list(Transaction.objects.filter(user=user, transaction_type='deposit')),
+        lambda: list(UserEarning.objects.filter(user=user)),
+        lambda: list(WithdrawalRequest.objects.filter(user=user)),
+    )
+
+    context = {
+        'deposits': deposits,
+        'withdrawals': withdrawals,
+        'earnings': earnings,
+    }
+    return await sync_to_async(render)(request, 'transactions.html', context)
+
+
 
 
 @login_required
@@ -248,8 +378,12 @@ def request_withdrawal(request):
         if form.is_valid():
             withdrawal_request = form.save(commit=False)
             withdrawal_request.user = user
-            withdrawal_request.save()
-            return render(request, 'dashboard.html')
+            try:
+                create_withdrawal(withdrawal_request)
+            except (InsufficientBalance, InvalidAmount) as e:
+                form.add_error('amount', str(e))
+            else:
+                return render(request, 'dashboard.html')
     else:
         # Instantiate the form with an instance of WithdrawalRequest
         withdrawal_request = WithdrawalRequest(user=user)
@@ -278,6 +412,7 @@ def select_package(request):
     return render(request, 'select_package.html', context)
 
 
+@ratelimit('submit_verification')
 @login_required
 def submit_verification(request):
     try:
@@ -300,19 +435,127 @@ def submit_verification(request):
     return render(request, 'submit_verification.html', {'form': form})
 
 
+@ratelimit('verification_status')
 @login_required
 def verification_status(request):
     try:
-        verification = request.user.identity_verification
+        verification = request.user.identityverification
         status = True
     except IdentityVerification.DoesNotExist:
         status = False
 
     send_verification_status_email(request.user, status)
 
+    message = 'Verification request received.' if status else 'No verification request found.'
     return JsonResponse({"status": status, "message": message})
 
 
+def account_api(request):
+    """
+    JSON balance, totals and recent activity for the logged-in user.
+
+    The ETag is the user's data version, which is bumped with every change to their
+    financial records, so polling clients get a 304 without any aggregate queries
+    being run. The version is read before the snapshot is built, so a change made in
+    between only causes one extra full response.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+
+    etag = account_etag(request.user)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(account_snapshot(request.user))
+    response.headers['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+async def account_events(request):
+    """
+    Server-sent event stream of the logged-in user's deposit, earning and withdrawal
+    events (see investments.push). Needs an ASGI server; each open stream costs an
+    idle coroutine rather than a worker thread. Under WSGI a stream would hold a
+    worker for as long as the browser keeps it open, so it answers 204 instead,
+    which tells EventSource not to reconnect.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+
+    await push.broker.listen()
+    queue = push.broker.subscribe(user.pk)
+
+    async def stream():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=settings.PUSH_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    # Comments keep proxies from closing an idle connection.
+                    yield ': keep-alive\n\n'
+                    continue
+                data = json.dumps(message['data'], cls=DjangoJSONEncoder)
+                yield f"event: {message['event']}\ndata: {data}\n\n"
+        finally:
+            push.broker.unsubscribe(user.pk, queue)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@staff_member_required
+def platform_overview(request):
+    """
+    Staff overview of platform-wide KPIs, read from the incrementally maintained counters.
+    """
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Platform overview',
+        'kpis': kpis.overview(),
+        'throttled': throttle_counts(),
+    }
+    return render(request, 'admin/platform_overview.html', context)
+
+
+@staff_member_required
+def rollup_series(request):
+    """
+    JSON time series from the daily rollup tables, for charts.
+
+    Query parameters: metric (repeatable, defaults to all), start and end
+    (YYYY-MM-DD, defaulting to the last year), package (a package id) and
+    by_package=1 to split each day by package.
+    """
+    metrics = request.GET.getlist('metric') or list(rollups.METRICS)
+    unknown = [metric for metric in metrics if metric not in rollups.METRICS]
+    if unknown:
+        return JsonResponse({'error': f"Unknown metric: {', '.join(unknown)}"}, status=400)
+    try:
+        end = date.fromisoformat(request.GET['end']) if 'end' in request.GET else timezone.localdate()
+        start = date.fromisoformat(request.GET['start']) if 'start' in request.GET else end - timedelta(days=364)
+        package_id = int(request.GET['package']) if request.GET.get('package') else None
+    except ValueError:
+        return JsonResponse({'error': 'start and end must be YYYY-MM-DD and package an id'}, status=400)
+    if start > end:
+        return JsonResponse({'error': 'start must not be after end'}, status=400)
+
+    by_package = request.GET.get('by_package') == '1'
+    return JsonResponse({
+        'start': start,
+        'end': end,
+        'series': {
+            metric: rollups.series(metric, start, end, package_id=package_id, by_package=by_package)
+            for metric in metrics
+        },
+    })
+
+
 def handler404(request, exception):
     return render(request, '404.html', status=404)
 
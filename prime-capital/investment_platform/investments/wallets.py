@@ -0,0 +1,37 @@
+"""
+In-memory map from wallet address to user id, used to attribute deposits.
+
+Ingestion looks up the sender of every transfer, so it keeps the profile wallets
+in UserWallet in a dict rather than querying per transfer. UserWallet writes bump the
+wallet_registry_version counter. refresh() reads that counter (one single-row
+query) and reloads the map only when it has moved since the last load.
+"""
+from .models import WALLET_REGISTRY_VERSION, PlatformCounter, UserWallet, normalize_address
+
+
+def registry_version():
+    version = PlatformCounter.objects.filter(key=WALLET_REGISTRY_VERSION).values_list('value', flat=True).first()
+    return int(version or 0)
+
+
+class WalletRegistry:
+    def __init__(self):
+        self.version = None
+        self.users = {}
+
+    def refresh(self):
+        # Read the version first, so a change made during the load triggers another.
+        version = registry_version()
+        if version != self.version:
+            self.users = dict(
+                UserWallet.objects.filter(source=UserWallet.PROFILE).values_list('address', 'user_id').iterator()
+            )
+            self.version = version
+
+    def user_id(self, address):
+        if self.version is None:
+            self.refresh()
+        return self.users.get(normalize_address(address))
+
+
+registry = WalletRegistry()
@@ -0,0 +1,191 @@
+import csv
+import os
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .earnings import credit_matured, matured_earnings
+from .models import (
+    ASSETS_UNDER_MANAGEMENT, PENDING_WITHDRAWALS, UserBalance, WithdrawalRequest, bump_counter, bump_data_version,
+    bump_rollup, record_event,
+)
+from .push import publish
+
+# status -> statuses it may move to. Rejected, failed and completed are final.
+TRANSITIONS = {
+    'pending': {'approved', 'rejected', 'failed', 'completed'},
+    'approved': {'rejected', 'failed', 'completed'},
+    'rejected': set(),
+    'failed': set(),
+    'completed': set(),
+}
+
+
+class InsufficientBalance(ValueError):
+    pass
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+class InvalidAmount(ValueError):
+    pass
+
+
+def available_balance(user):
+    """
+    Returns the part of the user's balance, including matured earnings, that isn't
+    held by open withdrawals.
+    """
+    balance = UserBalance.objects.filter(user=user).first()
+    matured = matured_earnings(user.pk)
+    if balance is None:
+        return matured
+    return balance.balance - balance.held + matured
+
+
+def _place_hold(withdrawal):
+    """
+    Reserves the withdrawal amount on the user's balance.
+
+    The availability check and the reservation are a single conditional UPDATE, so two
+    concurrent requests can never reserve more than the balance.
+    """
+    UserBalance.objects.get_or_create(user_id=withdrawal.user_id)
+    reserved = UserBalance.objects.filter(
+        user_id=withdrawal.user_id,
+        balance__gte=F('held') + withdrawal.amount,
+    ).update(held=F('held') + withdrawal.amount)
+    if not reserved:
+        raise InsufficientBalance("Withdrawal amount exceeds available balance")
+    withdrawal.hold_status = 'held'
+    withdrawal.save(update_fields=['hold_status'])
+    bump_counter(PENDING_WITHDRAWALS, withdrawal.amount)
+    bump_data_version(withdrawal.user_id)
+
+
+def create_withdrawal(withdrawal):
+    """
+    Saves a new withdrawal request and places a hold for its amount.
+    Raises InsufficientBalance (and saves nothing) if the available balance is too low,
+    and InvalidAmount if the amount isn't positive: a negative hold would add to the
+    available balance.
+    """
+    if withdrawal.amount is None or withdrawal.amount <= 0:
+        raise InvalidAmount("Withdrawal amount must be positive")
+    with transaction.atomic():
+        # Matured earnings are part of the balance but can only be held once credited.
+        credit_matured(withdrawal.user_id)
+        withdrawal.save()
+        _place_hold(withdrawal)
+        _record(withdrawal)
+        publish(withdrawal.user_id, 'withdrawal_status', withdrawal=withdrawal.pk, status=withdrawal.status,
+                amount=withdrawal.amount)
+    return withdrawal
+
+
+def _record(withdrawal):
+    record_event(
+        'withdrawal', withdrawal.user_id, withdrawal=withdrawal.pk, status=withdrawal.status,
+        hold_status=withdrawal.hold_status, amount=withdrawal.amount, currency=withdrawal.currency,
+        to_address=withdrawal.to_address,
+    )
+
+
+def transition_withdrawal(withdrawal, status):
+    """
+    Moves a withdrawal to a new status, settling or releasing its hold.
+
+    Completing debits the held amount from the balance; rejecting or failing releases
+    it. Moving a withdrawal to the status it already has is a no-op, so retries never
+    debit twice. Returns the updated withdrawal.
+    """
+    with transaction.atomic():
+        withdrawal = WithdrawalRequest.objects.select_for_update().get(pk=withdrawal.pk)
+        if withdrawal.status == status:
+            return withdrawal
+        if status not in TRANSITIONS[withdrawal.status]:
+            raise InvalidTransition(f"Cannot move a {withdrawal.status} withdrawal to {status}")
+
+        # Claim the transition with a compare-and-set, which also guards against
+        # concurrent transitions on databases without row locks (SQLite).
+        claimed = WithdrawalRequest.objects.filter(
+            pk=withdrawal.pk, status=withdrawal.status, hold_status=withdrawal.hold_status,
+        ).update(status=status, processed_at=timezone.now())
+        if not claimed:
+            raise InvalidTransition(f"Withdrawal {withdrawal.pk} was changed concurrently")
+        bump_data_version(withdrawal.user_id)
+
+        if status == 'completed':
+            _settle(withdrawal)
+        elif status in ('rejected', 'failed') and withdrawal.hold_status == 'held':
+            UserBalance.objects.filter(user_id=withdrawal.user_id).update(held=F('held') - withdrawal.amount)
+            WithdrawalRequest.objects.filter(pk=withdrawal.pk).update(hold_status='released')
+            bump_counter(PENDING_WITHDRAWALS, -withdrawal.amount)
+
+        withdrawal.refresh_from_db()
+        _record(withdrawal)
+        publish(withdrawal.user_id, 'withdrawal_status', withdrawal=withdrawal.pk, status=withdrawal.status,
+                amount=withdrawal.amount)
+    return withdrawal
+
+
+def _settle(withdrawal):
+    if withdrawal.hold_status == 'held':
+        debited = UserBalance.objects.filter(
+            user_id=withdrawal.user_id,
+            balance__gte=withdrawal.amount,
+        ).update(balance=F('balance') - withdrawal.amount, held=F('held') - withdrawal.amount)
+    else:
+        # Requests made before holds existed have nothing reserved.
+        debited = UserBalance.objects.filter(
+            user_id=withdrawal.user_id,
+            balance__gte=F('held') + withdrawal.amount,
+        ).update(balance=F('balance') - withdrawal.amount)
+    if not debited:
+        raise InsufficientBalance("Withdrawal amount exceeds available balance")
+    WithdrawalRequest.objects.filter(pk=withdrawal.pk).update(hold_status='settled')
+    bump_counter(ASSETS_UNDER_MANAGEMENT, -withdrawal.amount)
+    bump_rollup('withdrawals', timezone.now(), withdrawal.amount)
+    if withdrawal.hold_status == 'held':
+        bump_counter(PENDING_WITHDRAWALS, -withdrawal.amount)
+
+
+def write_payout_manifest(directory):
+    """
+    Writes every approved withdrawal that isn't in a payout batch yet to one CSV
+    manifest and assigns them to that batch.
+    Returns (batch, path, count), or (None, None, 0) if there is nothing to pay out.
+    """
+    batch = timezone.now().strftime('payout-%Y%m%dT%H%M%S')
+    path = os.path.join(directory, f'{batch}.csv')
+    os.makedirs(directory, exist_ok=True)
+
+    with transaction.atomic():
+        withdrawals = list(
+            WithdrawalRequest.objects.select_for_update()
+            .filter(status='approved', payout_batch='')
+            .order_by('pk')
+            .values_list('pk', 'user_id', 'to_address', 'amount', 'currency')
+        )
+        if not withdrawals:
+            return None, None, 0
+
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['withdrawal_id', 'user_id', 'to_address', 'amount', 'currency'])
+            writer.writerows(withdrawals)
+        WithdrawalRequest.objects.filter(pk__in=[row[0] for row in withdrawals]).update(payout_batch=batch)
+        os.replace(tmp_path, path)
+    return batch, path, len(withdrawals)
+
+
+def complete_payout_batch(batch):
+    """
+    Marks every withdrawal of a paid-out batch as completed. Safe to re-run.
+    """
+    withdrawals = WithdrawalRequest.objects.filter(payout_batch=batch, status='approved')
+    return [transition_withdrawal(withdrawal, 'completed') for withdrawal in withdrawals]
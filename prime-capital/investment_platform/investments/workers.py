@@ -0,0 +1,33 @@
+import os
+
+import django
+from django.db import connections
+from django.db.models import Max, Min
+
+
+def init_worker():
+    """
+    Process pool initializer that sets up Django in each worker process (needed
+    under the spawn start method, harmless under fork).
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'investment_platform.settings')
+    django.setup()
+
+
+def prepare_fork():
+    """
+    Closes the parent's database connections before a pool is started, so forked
+    workers never share a connection with the parent.
+    """
+    connections.close_all()
+
+
+def id_ranges(queryset, chunk_size):
+    """
+    Yields (low, high) primary key ranges of at most chunk_size ids covering the queryset.
+    """
+    bounds = queryset.order_by().aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return
+    for low in range(bounds['low'], bounds['high'] + 1, chunk_size):
+        yield low, min(low + chunk_size - 1, bounds['high'])
@@ -1,127 +1,97 @@
+"""
+Background jobs, run from cron: deposit ingestion, earnings settlement and
+withdrawal risk scoring.
+
+Balances include matured earnings before they are credited (see
+investments.earnings), so the earnings job only needs to run often enough to keep
+the uncredited backlog small, e.g. daily; ingestion should run every few minutes.
+Risk scores (investments.risk) are only as fresh as the last scoring run, so run it
+as often as withdrawals are reviewed.
+
+Several copies can run at once. Each job is split into shards guarded by expiring
+leases (investments.leases), and crediting is idempotent, so overlapping runs share
+the work instead of repeating it. To process the earnings backlog on N cores, start
+N copies with --shards N.
+"""
 import os
 import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'investment_platform.settings')
 django.setup()
 
-import requests
-from decimal import Decimal
-from django.conf import settings
-from investments.models import Transaction, UserInvestment, CustomUser, update_user_balance, InvestmentPackage, \
-    ProcessedTransaction
-from django.utils import timezone
+import argparse
 import logging
+from datetime import timedelta
+from django.conf import settings
+from investments import leases
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
-# Constants
-USDT_DIVISOR = Decimal(1e6)  # USDT decimals divisor
 
+def run_ingestion(owner, ttl):
+    """Fetch and credit new deposits, unless another worker is already doing so."""
+    # Job modules are imported when their job runs, so cron runs of one job don't
+    # pay for the other's imports (see benchmarks/startup.py).
+    from investments.ingestion import fetch_usdt_transactions, process_usdt_transactions
 
-def fetch_usdt_transactions(address):
-    """Fetch USDT transactions from Etherscan API."""
+    if not leases.claim('ingest', 0, owner, ttl):
+        logger.info("Deposit ingestion is already running elsewhere.")
+        return
     try:
-        api_url = f"https://api.etherscan.io/api?module=account&action=tokentx&address={address}&contractaddress={settings.USDT_CONTRACT_ADDRESS}&page=1&offset=1000&sort=desc&apikey={settings.ETHERSCAN_API_KEY}"
-        response = requests.get(api_url)
-        response.raise_for_status()
-        return response.json().get('result', [])
-    except requests.RequestException as e:
-        logger.error(f"Error fetching USDT transactions from Etherscan: {e}")
-        return []
-
-
-def process_usdt_transactions(transactions, required_confirmations):
-    """Process USDT transactions."""
-    for tx in transactions:
-        tx_hash = tx.get('hash')
-        confirmations = int(tx.get('confirmations', 0))
-        if confirmations >= required_confirmations:
-            if not ProcessedTransaction.objects.filter(tx_hash=tx_hash).exists():
-                amount = Decimal(tx.get('value', 0)) / USDT_DIVISOR
-                sender_address = tx.get('from')  # Get sender's address
-                user = CustomUser.objects.filter(usdt_erc20_wallet_address=sender_address).first()
-                if user:
-                    transaction_instance = create_transaction_instance(user, amount, tx_hash)
-                    if transaction_instance:
-                        create_user_investment(user, amount, transaction_instance)
-            else:
-                logger.info(f"Skipping transaction {tx_hash} as it has already been processed.")
-        else:
-            logger.info(f"USDT transaction {tx_hash} has not reached required confirmations.")
-
-
-def create_transaction_instance(user, amount, tx_hash):
-    """Create an instance of the Transaction model."""
+        transactions = fetch_usdt_transactions(settings.USDT_WALLET_ADDRESS)
+        if transactions:
+            process_usdt_transactions(transactions, required_confirmations=25)
+    finally:
+        leases.release('ingest', 0, owner)
+
+
+def run_earnings(owner, ttl, shards):
+    """Credit matured earnings for the first free shard of users."""
+    from investments.earnings import calculate_user_earnings
+
+    shard = leases.claim_any('earnings', shards, owner, ttl)
+    if shard is None:
+        logger.info("All earnings shards are claimed.")
+        return
     try:
-        return Transaction.objects.create(
-            user=user,
-            amount=amount,
-            currency='USDT',
-            status='confirmed',
-            transaction_type='deposit',
-            tx_hash=tx_hash
+        credited = calculate_user_earnings(
+            shard, shards, keep_alive=lambda: leases.renew('earnings', shard, owner, ttl),
         )
-    except Exception as e:
-        logger.error(f"Error creating transaction instance for {tx_hash}: {e}")
-        return None
-
-
-def create_user_investment(user, amount, transaction_instance):
-    """Create an instance of the UserInvestment model."""
-    package = match_transaction_to_package(amount)
-    if package:
-        try:
-            return UserInvestment.objects.create(
-                user=user,
-                package=package,
-                amount_invested=amount,
-                investment_date=timezone.now(),
-                earnings_calculated=False,
-                transaction=transaction_instance
-            )
-        except Exception as e:
-            logger.error(f"Error creating UserInvestment instance for user {user.username}: {e}")
-    else:
-        logger.warning(f"No investment package found for the transaction amount: {amount}")
-
-
-def match_transaction_to_package(amount):
-    """Match transaction to investment package."""
+        logger.info(f"Credited {credited} earnings for shard {shard}/{shards}.")
+    finally:
+        leases.release('earnings', shard, owner)
+
+
+def run_risk_scoring(owner, ttl):
+    """Score pending withdrawals for the admin review queue."""
+    from investments.risk import score_pending
+
+    if not leases.claim('risk', 0, owner, ttl):
+        logger.info("Risk scoring is already running elsewhere.")
+        return
     try:
-        return InvestmentPackage.objects.filter(
-            min_amount__lte=amount,
-            max_amount__gte=amount,
-            currency='USDT'
-        ).first()
-    except Exception as e:
-        logger.error(f"Error matching transaction to package: {e}")
-        return None
-
-
-def calculate_user_earnings():
-    """
-    Calculate earnings for user investments when they reach maturity and update user balances accordingly.
-    """
-    user_investments = UserInvestment.objects.filter(earnings_calculated=False)
-
-    for investment in user_investments:
-        maturity_date = investment.investment_date + timezone.timedelta(hours=investment.package.duration)
-        current_date = timezone.now()
-        if current_date >= maturity_date:
-            interest_rate = investment.package.interest_rate / 100
-            earnings = investment.amount_invested * interest_rate
-            update_user_balance(investment.user, earnings)
-            investment.earnings_calculated = True
-            investment.save()
-
-
-def main():
+        logger.info(f"Scored {score_pending()} pending withdrawals.")
+    finally:
+        leases.release('risk', 0, owner)
+
+
+def main(argv=None):
     """Main function."""
-    transactions = fetch_usdt_transactions(settings.USDT_WALLET_ADDRESS)
-    if transactions:
-        process_usdt_transactions(transactions, required_confirmations=25)
-        calculate_user_earnings()
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--job', choices=['ingest', 'earnings', 'risk', 'all'], default='all')
+    parser.add_argument('--shards', type=int, default=1, help='Number of earnings shards (by user id).')
+    parser.add_argument('--lease-seconds', type=int, default=300)
+    args = parser.parse_args(argv)
+
+    owner = leases.worker_id()
+    ttl = timedelta(seconds=args.lease_seconds)
+    if args.job in ('ingest', 'all'):
+        run_ingestion(owner, ttl)
+    if args.job in ('earnings', 'all'):
+        run_earnings(owner, ttl, args.shards)
+    if args.job in ('risk', 'all'):
+        run_risk_scoring(owner, ttl)
 
 
 if __name__ == "__main__":